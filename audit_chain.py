@@ -0,0 +1,139 @@
+"""
+AUDIT_CHAIN.PY
+Tamper-evident hash chain over call_history, shared by the GUI (DataManager) and the Discord Bot.
+Every history row stores the hash of the row before it (PrevHash) and its own hash (RowHash),
+so editing, inserting or deleting a row breaks the chain from that point on. The chain head
+lives in audit_head so it survives archival, and audit_checkpoints stores HMAC-signed heads
+so verification only has to re-hash the rows written since the last good checkpoint.
+"""
+import hashlib
+import hmac
+import sqlite3
+from datetime import datetime
+
+GENESIS = "0" * 64
+CHAIN_COLUMNS = "HistoryID, CallID, Timestamp, User, Action, Details, PrevHash, RowHash"
+
+def row_hash(prev_hash, call_id, timestamp, user, action, details):
+    """SHA-256 over length-prefixed fields, so no two different rows can encode the same."""
+    fields = (prev_hash, call_id, timestamp, user, action, details)
+    payload = "".join(f"{len(v)}:{v}" for v in ("" if f is None else str(f) for f in fields))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def sign_checkpoint(key, history_id, digest, created_at):
+    if not key: return ""
+    return hmac.new(key.encode("utf-8"), f"{history_id}:{digest}:{created_at}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+def _attached(conn, name):
+    return any(row[1] == name for row in conn.execute("PRAGMA database_list"))
+
+def ensure_schema(conn):
+    """Adds the chain columns/tables (main and, if attached, archive) and chains any legacy rows once."""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'call_history'").fetchone(): return # GUI hasn't built the schema yet
+    with conn:
+        for schema in ("main", "archive") if _attached(conn, "archive") else ("main",):
+            for column in ("PrevHash", "RowHash"):
+                try: conn.execute(f"ALTER TABLE {schema}.call_history ADD COLUMN {column} TEXT;")
+                except sqlite3.OperationalError: pass
+        conn.execute("CREATE TABLE IF NOT EXISTS audit_head (HeadID INTEGER PRIMARY KEY CHECK (HeadID = 1), HistoryID INTEGER, RowHash TEXT)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS audit_checkpoints (
+                CheckpointID INTEGER PRIMARY KEY AUTOINCREMENT,
+                HistoryID INTEGER, RowHash TEXT, CreatedAt TEXT, Signature TEXT
+            )
+        """)
+    if not conn.execute("SELECT 1 FROM audit_head").fetchone(): _backfill(conn)
+
+def _backfill(conn):
+    """First run on an existing database: chains every row already there, oldest first."""
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT 1 FROM audit_head").fetchone(): return # Another laptop won the race
+        prev, last_id = GENESIS, None
+        updates = []
+        for row in iter_history(conn):
+            digest = row_hash(prev, row[1], row[2], row[3], row[4], row[5])
+            updates.append((prev, digest, row[0]))
+            prev, last_id = digest, row[0]
+        for schema in ("main", "archive") if _attached(conn, "archive") else ("main",):
+            conn.executemany(f"UPDATE {schema}.call_history SET PrevHash = ?, RowHash = ? WHERE HistoryID = ?", updates)
+        conn.execute("INSERT INTO audit_head (HeadID, HistoryID, RowHash) VALUES (1, ?, ?)", (last_id, prev))
+
+def append_history(conn, call_id, timestamp, user, action, details=""):
+    """
+    Inserts one chained history row and advances the head. If the caller already has a
+    transaction open it must already hold the write lock (i.e. it has written something),
+    otherwise this takes one with BEGIN IMMEDIATE so two laptops can't fork the chain.
+    The caller commits.
+    """
+    if not conn.in_transaction: conn.execute("BEGIN IMMEDIATE")
+    head = conn.execute("SELECT RowHash FROM audit_head WHERE HeadID = 1").fetchone()
+    prev = head[0] if head and head[0] else GENESIS
+    digest = row_hash(prev, call_id, timestamp, user, action, details)
+    cursor = conn.execute("INSERT INTO call_history (CallID, Timestamp, User, Action, Details, PrevHash, RowHash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                          (call_id, timestamp, user, action, details, prev, digest))
+    conn.execute("INSERT OR REPLACE INTO audit_head (HeadID, HistoryID, RowHash) VALUES (1, ?, ?)", (cursor.lastrowid, digest))
+    return cursor.lastrowid
+
+def iter_history(conn, after_id=0, up_to_id=None, chunk_size=5000):
+    """
+    Streams history rows in HistoryID order across the hot table and the archive (if attached).
+    Reads in keyset chunks, each one statement, so the shared lock (which blocks every other
+    laptop's writes) is released between chunks and archival can't make a row vanish mid-chunk.
+    """
+    schemas = ("main", "archive") if _attached(conn, "archive") else ("main",)
+    query = " UNION ALL ".join(f"SELECT {CHAIN_COLUMNS} FROM {schema}.call_history WHERE HistoryID > :after AND HistoryID <= :bound" for schema in schemas)
+    query += " ORDER BY HistoryID LIMIT :chunk"
+    bound = up_to_id if up_to_id is not None else 2 ** 62
+    while True:
+        rows = conn.execute(query, {"after": after_id, "bound": bound, "chunk": chunk_size}).fetchall()
+        yield from rows
+        if len(rows) < chunk_size: return
+        after_id = rows[-1][0]
+
+def verify(conn, key="", full=False, write_checkpoint=True):
+    """
+    Re-hashes the chain and reports the first problem found. Incremental by default: starts
+    from the newest checkpoint whose signature and row still match. Returns a dict with
+    ok, checked, start_id, head_id and problem (None when ok).
+    """
+    result = {"ok": True, "checked": 0, "start_id": 0, "head_id": 0, "problem": None, "signed": bool(key)}
+    head = conn.execute("SELECT HistoryID, RowHash FROM audit_head WHERE HeadID = 1").fetchone()
+    if not head or head[0] is None: return result
+    head_id, head_hash = head
+    result["head_id"] = head_id
+
+    prev, start_id = GENESIS, 0
+    checkpoint = None if full else conn.execute("SELECT HistoryID, RowHash, CreatedAt, Signature FROM audit_checkpoints ORDER BY CheckpointID DESC LIMIT 1").fetchone()
+    if checkpoint:
+        cp_id, cp_hash, cp_created, cp_signature = checkpoint
+        if key and not hmac.compare_digest(sign_checkpoint(key, cp_id, cp_hash, cp_created), cp_signature or ""):
+            return dict(result, ok=False, problem=f"Checkpoint at HistoryID {cp_id} has an invalid signature.")
+        anchor = next(iter_history(conn, cp_id - 1, cp_id), None)
+        # Re-hashed from its own fields too, or the checkpointed row could be edited with its old RowHash kept
+        if not anchor or anchor[7] != cp_hash or row_hash(anchor[6], *anchor[1:6]) != cp_hash:
+            return dict(result, ok=False, problem=f"History row {cp_id} no longer matches its signed checkpoint.")
+        prev, start_id = cp_hash, cp_id
+    result["start_id"] = start_id
+
+    last_id = start_id
+    for row in iter_history(conn, start_id, head_id):
+        history_id, call_id, timestamp, user, action, details, prev_hash, stored = row
+        if stored is None:
+            return dict(result, ok=False, problem=f"History row {history_id} has no hash (written outside the dispatch software?).")
+        if prev_hash != prev:
+            return dict(result, ok=False, problem=f"Chain broken before history row {history_id}: a row was deleted or inserted.")
+        if row_hash(prev, call_id, timestamp, user, action, details) != stored:
+            return dict(result, ok=False, problem=f"History row {history_id} ({call_id}, {action}) was modified after it was written.")
+        prev, last_id = stored, history_id
+        result["checked"] += 1
+
+    if last_id != head_id or prev != head_hash:
+        return dict(result, ok=False, problem=f"History rows after {last_id} are missing (chain head is {head_id}).")
+
+    if write_checkpoint and head_id > start_id:
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with conn:
+            conn.execute("INSERT INTO audit_checkpoints (HistoryID, RowHash, CreatedAt, Signature) VALUES (?, ?, ?, ?)",
+                         (head_id, head_hash, created_at, sign_checkpoint(key, head_id, head_hash, created_at)))
+    return result
@@ -0,0 +1,80 @@
+"""
+AUTOCOMPLETE.PY
+Frequency-ranked prefix index for the Location and Caller fields.
+DataManager builds one per field from the calls table at startup and feeds it every call
+this laptop saves, so the entry boxes can offer "MAIN HALL B" after "ma" straight from
+memory, without a database query per keystroke.
+
+Keys live in one sorted list: a lookup is a bisect to the first key starting with the
+typed text, then a short walk while keys still match. Every word of a value is indexed
+as well (pointing back to the whole value), so "hall" also finds "Main Hall B".
+"""
+import bisect
+import heapq
+import re
+import threading
+from collections import Counter, defaultdict
+
+_SPACES = re.compile(r"\s+")
+
+def normalize(value):
+    """Trimmed, with inner runs of whitespace collapsed to one space."""
+    return _SPACES.sub(" ", str(value or "")).strip()
+
+class PrefixIndex:
+    def __init__(self, max_scan=500):
+        self.max_scan = max_scan # Cap on keys walked per lookup, so a one-letter prefix stays sub-millisecond
+        self._keys = [] # Sorted (search key, value key) pairs; value key is the casefolded value
+        self._counts = Counter() # value key -> times used
+        self._spellings = defaultdict(Counter) # value key -> Counter of the exact spellings typed
+        self._display = {} # value key -> most used spelling, shown as the suggestion
+        self._lock = threading.Lock() # Saves feed it from the DB thread while the UI thread reads it
+
+    def __len__(self):
+        return len(self._counts)
+
+    def add(self, value, count=1):
+        self.add_many([(value, count)])
+
+    def add_many(self, pairs):
+        """Counts (value, count) pairs. New keys are merged into the sorted list in one pass."""
+        new_keys = []
+        with self._lock:
+            for value, count in pairs:
+                display = normalize(value)
+                if not display or count <= 0: continue
+                key = display.casefold()
+                if key not in self._counts: new_keys.extend(self._search_keys(key))
+                self._counts[key] += count
+                spellings = self._spellings[key]
+                spellings[display] += count
+                if spellings[display] >= spellings[self._display.get(key, display)]: self._display[key] = display
+            if len(new_keys) < 16:
+                for entry in new_keys: bisect.insort(self._keys, entry)
+            elif new_keys:
+                self._keys = sorted(self._keys + new_keys)
+
+    @staticmethod
+    def _search_keys(key):
+        words = key.split(" ")
+        return sorted({(" ".join(words[i:]), key) for i in range(len(words))})
+
+    def suggest(self, prefix, limit=8):
+        """
+        Up to limit values starting with prefix (case-insensitive), values whose first word matches
+        ranked above ones where a later word does, then by how often they were used.
+        The text exactly as typed is left out; a different capitalisation of it is not.
+        Only the first max_scan matching keys are ranked, which matters only for one-letter prefixes of very large indexes.
+        """
+        typed = normalize(prefix)
+        needle = typed.casefold()
+        if not needle: return []
+        with self._lock:
+            matches = {}
+            start = bisect.bisect_left(self._keys, (needle,))
+            for search_key, key in self._keys[start:start + self.max_scan]:
+                if not search_key.startswith(needle): break
+                matches[key] = matches.get(key, False) or search_key == key
+            ranked = heapq.nsmallest(limit + 1, matches, key=lambda k: (not matches[k], -self._counts[k], k))
+            suggestions = [self._display[key] for key in ranked if self._display[key] != typed]
+        return suggestions[:limit]
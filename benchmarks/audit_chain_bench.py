@@ -0,0 +1,91 @@
+"""
+AUDIT_CHAIN_BENCH.PY
+Benchmarks the hash-chained audit log at scale (default: one million history rows).
+Measures the one-time backfill of an existing log, per-row append cost against a plain
+INSERT, a full verification, and the incremental check an export runs after a shift's
+worth of new rows since the last checkpoint.
+
+Example:
+    python benchmarks/audit_chain_bench.py --rows 1000000 --new-rows 5000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import audit_chain
+
+def timed(label, func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<42}{elapsed * 1000:>12.1f} ms")
+    return result, elapsed
+
+def build_legacy_log(conn, rows):
+    """An unchained call_history like the one on disk before the upgrade."""
+    conn.execute("""
+        CREATE TABLE call_history (
+            HistoryID INTEGER PRIMARY KEY AUTOINCREMENT,
+            CallID TEXT, Timestamp TEXT, User TEXT, Action TEXT, Details TEXT
+        )
+    """)
+    actions = ["Call Created", "Call Modified", "Thread Message", "Call Resolved"]
+    batch = ((f"DC26-{i // 4:05d}", f"2026-07-04 {(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d}", f"dispatcher{i % 7}",
+              actions[i % 4], "Location updated.; Description was updated." if i % 4 == 1 else "") for i in range(rows))
+    with conn:
+        conn.executemany("INSERT INTO call_history (CallID, Timestamp, User, Action, Details) VALUES (?, ?, ?, ?, ?)", batch)
+
+def main():
+    parser = argparse.ArgumentParser(description="Hash-chained audit log benchmark.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--new-rows", type=int, default=5000, help="Rows appended after the checkpoint (one busy shift)")
+    parser.add_argument("--key", default="benchmark-key")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="audit_bench_"), "audit.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=TRUNCATE;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    print(f"=== AUDIT CHAIN: {args.rows:,} rows, db={db_path} ===")
+
+    timed(f"build unchained log ({args.rows:,} rows)", build_legacy_log, conn, args.rows)
+    timed("one-time backfill (hash every row)", audit_chain.ensure_schema, conn)
+
+    result, full_seconds = timed("full verify", audit_chain.verify, conn, args.key, full=True)
+    assert result["ok"], result["problem"]
+    print(f"{'  -> rows per second':<42}{result['checked'] / full_seconds:>12,.0f}")
+
+    # Append cost, chained vs. the old plain INSERT, each row in its own transaction like the GUI/bot
+    n = min(args.new_rows, 2000)
+    def plain_inserts():
+        for i in range(n):
+            with conn:
+                conn.execute("INSERT INTO call_history (CallID, Timestamp, User, Action, Details) VALUES (?, ?, ?, ?, ?)",
+                             ("DC26-PLAIN", "2026-07-05 10:00:00", "bench", "Call Modified", "x"))
+    def chained_appends(count):
+        for i in range(count):
+            with conn:
+                audit_chain.append_history(conn, "DC26-NEW", "2026-07-05 10:00:00", "bench", "Thread Message", f"message {i}")
+    _, plain_seconds = timed(f"{n:,} plain INSERTs (old)", plain_inserts)
+    conn.execute("DELETE FROM call_history WHERE CallID = 'DC26-PLAIN'")
+    conn.commit()
+    _, chained_seconds = timed(f"{n:,} chained appends (new)", chained_appends, n)
+    print(f"{'  -> extra cost per write':<42}{(chained_seconds - plain_seconds) / n * 1e6:>12.1f} us")
+
+    timed("checkpoint (incremental verify)", audit_chain.verify, conn, args.key)
+    timed(f"append {args.new_rows:,} more rows", chained_appends, args.new_rows)
+    result, _ = timed(f"incremental verify ({args.new_rows:,} new rows)", audit_chain.verify, conn, args.key)
+    assert result["ok"] and result["checked"] == args.new_rows, result
+
+    conn.execute("UPDATE call_history SET Details = 'edited' WHERE HistoryID = ?", (args.rows // 2,))
+    conn.commit()
+    result, _ = timed("full verify after tampering", audit_chain.verify, conn, args.key, full=True, write_checkpoint=False)
+    print(f"  -> detected: {result['problem']}")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+LOAD_TEST.PY
+Multi-client contention benchmark for the shared dispatch database.
+Spawns N simulated dispatcher processes (each with its own DataManager, exactly like N
+laptops) plus an optional simulated Discord Bot, all working against ONE database file.
+Point --db at a file on the SMB share to measure real network behavior before an event.
+
+Reports throughput and p50/p95/p99 latency per operation, sqlite_retry lock-retry
+counts and failures.
+
+Examples:
+    python benchmarks/load_test.py --dispatchers 6 --duration 60 --bot
+    python benchmarks/load_test.py --db "Z:\\HQ\\loadtest.db" --dispatchers 10 --bot
+    python benchmarks/load_test.py --replay dispatch.db --speed 20 --dispatchers 4 --bot
+"""
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import zlib
+from collections import Counter, defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import audit_chain
+import data_manager
+from data_manager import DataManager, OPEN_CALL_FILTER
+
+LOCATIONS = ["Hall A", "Hall B", "Hall C", "Main Stage", "Artist Alley", "Dealers Room", "Lobby", "Loading Dock", "Panel Room 3", "Food Court"]
+CODES = ["No_Code", "No_Code", "Green", "Yellow", "Yellow", "Blue", "Red", "Brown", "Orange", "Purple", "Adam"]
+SOURCES = ["General", "Safety", "First Aid"]
+BOT_MESSAGES = ["On scene.", "Patient conscious and breathing.", "Vitals: HR 92, BP 130/85.", "Requesting ice pack.", "Transporting to First Aid.", "Clear."]
+
+# What the GUI's table refresh fetches (DispatchCallApp.query_columns)
+TABLE_COLUMNS = ["ReportID", "CallDate", "CallTime", "ResolutionStatus", "ResolutionTimestamp", "ResolvedBy", "Cancelled", "InputMedium",
+                 "Source", "Caller", "Location", "Code", "Description", "CreatedBy", "CreatedEpoch"]
+
+# Rough shape of a busy dispatcher: mostly polling/refreshing, occasional writes
+DEFAULT_MIX = {"add_call": 10, "modify_call": 10, "load_call": 10, "refresh": 40, "poll": 25, "history": 5}
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values: return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def random_call(rng):
+    return {
+        "InputMedium": "Radio", "Source": rng.choice(SOURCES), "Caller": f"UNIT{rng.randint(1, 40)}",
+        "Location": rng.choice(LOCATIONS), "Code": rng.choice(CODES),
+        "Description": f"Load test incident {rng.randint(1000, 9999)} reported near the {rng.choice(LOCATIONS)}.",
+        "ResolutionStatus": False, "ResolvedBy": "", "Cancelled": False,
+    }
+
+class Recorder:
+    """Collects per-operation latencies and failures inside one simulated client."""
+    def __init__(self, role):
+        self.role = role
+        self.latencies = defaultdict(list)
+        self.failures = Counter()
+
+    def timed(self, op, func, *args):
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+        except Exception as e:
+            self.failures[f"{op}: {type(e).__name__}: {e}"[:160]] += 1
+            return None
+        self.latencies[op].append(time.perf_counter() - start)
+        return result
+
+    def result(self, **extra):
+        return {"role": self.role, "latencies": dict(self.latencies), "failures": dict(self.failures),
+                "retries": dict(data_manager.RETRY_COUNTS), **extra}
+
+def wait_until(timestamp):
+    delay = timestamp - time.time()
+    if delay > 0: time.sleep(delay)
+
+# ==========================================
+# SIMULATED CLIENTS
+# ==========================================
+def dispatcher_worker(worker_id, db_path, start_at, duration, mix, think, seed, results):
+    """One laptop running the GUI's add/modify/refresh/history mix through DataManager."""
+    rng = random.Random(seed)
+    rec = Recorder(f"dispatcher{worker_id}")
+    manager = rec.timed("connect", DataManager, db_path)
+    if not manager:
+        results.put(rec.result())
+        return
+    user = f"loadtest{worker_id}"
+    my_calls = []
+    ops, weights = zip(*mix.items())
+
+    wait_until(start_at)
+    deadline = start_at + duration
+    while time.time() < deadline:
+        op = rng.choices(ops, weights)[0]
+        if op == "add_call":
+            report_id = rec.timed(op, manager.add_call, random_call(rng), user)
+            if report_id: my_calls.append(report_id)
+        elif op == "load_call" and my_calls:
+            rec.timed(op, manager.get_call_by_id, rng.choice(my_calls))
+        elif op == "modify_call" and my_calls:
+            report_id = rng.choice(my_calls)
+            row = manager.get_call_by_id(report_id)
+            if row:
+                updated = dict(row)
+                updated["Description"] = f"{updated['Description'][:200]} Update {rng.randint(1, 99)}."
+                if rng.random() < 0.3: updated["ResolutionStatus"], updated["ResolvedBy"] = True, user
+                rec.timed(op, manager.modify_call, report_id, updated, user)
+        elif op == "refresh":
+            rec.timed(op, manager.get_all_calls, "ReportID", "ASC", True, TABLE_COLUMNS)
+        elif op == "poll":
+            if rec.timed(op, manager.check_if_updated) == -1: rec.failures["poll: check_if_updated returned -1"] += 1
+        elif op == "history" and my_calls:
+            rec.timed(op, manager.get_history_for_call, rng.choice(my_calls))
+        if think: time.sleep(rng.uniform(0, think * 2))
+
+    manager.close()
+    results.put(rec.result())
+
+def bot_connect(db_path):
+    """Same connection settings as discord_bot.get_db_connection()."""
+    conn = sqlite3.connect(db_path, timeout=20.0)
+    conn.execute("PRAGMA journal_mode=TRUNCATE;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA busy_timeout=20000;")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def bot_log_message(conn, report_id, user_tag, content):
+    """The bot's on_message write: one hash-chained history row per Discord thread reply, committed immediately."""
+    with conn:
+        audit_chain.append_history(conn, report_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), user_tag, "Thread Message", content)
+
+def bot_worker(db_path, start_at, duration, rate, seed, results, id_map=None, events=None, speed=1.0):
+    """The Discord Bot mirroring responder thread replies into call_history."""
+    rng = random.Random(seed)
+    rec = Recorder("bot")
+    wait_until(start_at)
+
+    if events is not None:
+        # Replay: post each recorded thread message at its original offset, scaled by --speed
+        for offset, source_id, _, user, details in events:
+            wait_until(start_at + offset / speed)
+            report_id = id_map.get(source_id)
+            if not report_id:
+                rec.failures["bot: thread message for a call not (yet) replayed"] += 1
+                continue
+            conn = rec.timed("bot_connect", bot_connect, db_path) # A fresh connection per message, as the bot opens for every Discord event
+            if conn is None: continue
+            rec.timed("bot_insert", bot_log_message, conn, report_id, user, details)
+            conn.close()
+    else:
+        deadline = start_at + duration
+        while time.time() < deadline:
+            conn = rec.timed("bot_connect", bot_connect, db_path) # A fresh connection per message, as the bot opens for every Discord event
+            if conn is not None:
+                rows = rec.timed("bot_lookup", lambda: conn.execute(f"SELECT ReportID FROM calls WHERE {OPEN_CALL_FILTER} ORDER BY ID DESC LIMIT 20").fetchall())
+                if rows:
+                    rec.timed("bot_insert", bot_log_message, conn, rng.choice(rows)['ReportID'], f"Discord: Medic{rng.randint(1, 9)}", rng.choice(BOT_MESSAGES))
+                conn.close()
+            time.sleep(rng.expovariate(rate) if rate > 0 else 1)
+    results.put(rec.result())
+
+# ==========================================
+# EVENT REPLAY
+# ==========================================
+def load_replay(source_path):
+    """Reads a real event's calls and call_history timeline. Returns (calls, events) with events as offsets in seconds."""
+    conn = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    calls = {r['ReportID']: dict(r) for r in conn.execute("SELECT * FROM calls")}
+    events, first = [], None
+    for row in conn.execute("SELECT CallID, Timestamp, User, Action, Details FROM call_history ORDER BY Timestamp, HistoryID"):
+        try: ts = datetime.strptime(row['Timestamp'], "%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError): continue
+        first = first or ts
+        events.append(((ts - first).total_seconds(), row['CallID'], row['Action'], row['User'], row['Details'] or ""))
+    conn.close()
+    return calls, events
+
+def replay_worker(worker_id, db_path, start_at, events, calls, speed, results, id_map):
+    """Replays the GUI-side actions for the calls hashed to this laptop, at Nx speed."""
+    rec = Recorder(f"dispatcher{worker_id}")
+    manager = rec.timed("connect", DataManager, db_path)
+    if not manager:
+        results.put(rec.result())
+        return
+    lag = []
+    wait_until(start_at)
+    for offset, source_id, action, user, _ in events:
+        due = start_at + offset / speed
+        wait_until(due)
+        lag.append(max(0.0, time.time() - due))
+        source = calls.get(source_id)
+        if not source: continue
+
+        if action == "Call Created":
+            call = {k: source.get(k) or "" for k in ("InputMedium", "Source", "Caller", "Location", "Code", "Description")}
+            report_id = rec.timed("add_call", manager.add_call, call, user or f"replay{worker_id}")
+            if report_id: id_map[source_id] = report_id
+        elif action in ("Call Modified", "Call Resolved") and source_id in id_map:
+            report_id = id_map[source_id]
+            row = rec.timed("load_call", manager.get_call_by_id, report_id)
+            if not row: continue
+            updated = dict(row)
+            for k in ("InputMedium", "Source", "Caller", "Location", "Code", "Description", "Cancelled"):
+                if source.get(k) is not None: updated[k] = source[k]
+            if action == "Call Resolved": updated["ResolutionStatus"], updated["ResolvedBy"] = True, source.get("ResolvedBy") or user
+            rec.timed("modify_call", manager.modify_call, report_id, updated, user or f"replay{worker_id}")
+        rec.timed("refresh", manager.get_all_calls, "ReportID", "ASC", True, TABLE_COLUMNS) # Every GUI action ends with a table refresh
+    manager.close()
+    results.put(rec.result(schedule_lag=lag))
+
+# ==========================================
+# REPORTING
+# ==========================================
+def summarize(results, wall_seconds):
+    latencies, failures, retries, lag = defaultdict(list), Counter(), Counter(), []
+    for r in results:
+        for op, values in r["latencies"].items(): latencies[op].extend(values)
+        failures.update(r["failures"])
+        retries.update(r["retries"])
+        lag.extend(r.get("schedule_lag", []))
+
+    summary = {"wall_seconds": round(wall_seconds, 2), "operations": {}, "lock_retries": dict(retries), "failures": dict(failures)}
+    for op, values in sorted(latencies.items()):
+        values.sort()
+        summary["operations"][op] = {
+            "count": len(values), "ops_per_sec": round(len(values) / wall_seconds, 2) if wall_seconds else 0,
+            "p50_ms": round(percentile(values, 50) * 1000, 2), "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2), "max_ms": round(values[-1] * 1000, 2),
+        }
+    if lag:
+        lag.sort()
+        summary["replay_schedule_lag_ms"] = {"p50": round(percentile(lag, 50) * 1000, 1), "p99": round(percentile(lag, 99) * 1000, 1), "max": round(lag[-1] * 1000, 1)}
+    return summary
+
+def print_report(summary, title):
+    print(f"\n=== {title} ===")
+    print(f"{'operation':<14}{'count':>8}{'ops/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for op, s in summary["operations"].items():
+        print(f"{op:<14}{s['count']:>8}{s['ops_per_sec']:>9}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}")
+    retries = summary["lock_retries"]
+    print(f"\nLock retries (sqlite_retry): {', '.join(f'{k}={v}' for k, v in retries.items()) if retries else 'none'}")
+    if "replay_schedule_lag_ms" in summary: print(f"Replay schedule lag (ms): {summary['replay_schedule_lag_ms']}")
+    if summary["failures"]:
+        print(f"Failures ({sum(summary['failures'].values())}):")
+        for failure, count in sorted(summary["failures"].items(), key=lambda x: -x[1]): print(f"  {count:>5} x {failure}")
+    else:
+        print("Failures: none")
+
+# ==========================================
+# MAIN
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Multi-client contention benchmark for the shared dispatch database.")
+    parser.add_argument("--db", help="Database file to hammer (default: a fresh temp file). Never point this at the live event DB.")
+    parser.add_argument("--dispatchers", type=int, default=4, help="Number of simulated dispatcher laptops (processes)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run the synthetic mix")
+    parser.add_argument("--think", type=float, default=0.25, help="Mean think time between a dispatcher's actions, in seconds")
+    parser.add_argument("--seed-calls", type=int, default=200, help="Calls to pre-load so refreshes have realistic work")
+    parser.add_argument("--bot", action="store_true", help="Also run a simulated Discord Bot writing thread messages")
+    parser.add_argument("--bot-rate", type=float, default=2.0, help="Bot thread messages per second (synthetic mode)")
+    parser.add_argument("--replay", metavar="SOURCE_DB", help="Replay a real event's call_history timeline instead of the synthetic mix")
+    parser.add_argument("--speed", type=float, default=10.0, help="Replay speed multiplier (10 = ten times faster than the real event)")
+    parser.add_argument("--json", metavar="FILE", help="Also write the summary as JSON")
+    parser.add_argument("--random-seed", type=int, default=1)
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="dispatch_load_"), "loadtest.db")
+    if args.replay and os.path.abspath(args.replay) == os.path.abspath(db_path):
+        sys.exit("--replay source and --db target must be different files.")
+
+    # Build the schema and seed data once, so the workers don't all race to migrate it
+    seed_manager = DataManager(db_path)
+    rng = random.Random(args.random_seed)
+    for _ in range(args.seed_calls if not args.replay else 0): seed_manager.add_call(random_call(rng), "seed")
+    seed_manager.close()
+
+    ctx = mp.get_context("spawn") # Same start method on Windows and Linux
+    results = ctx.Queue()
+    start_at = time.time() + 2.0 + 0.3 * args.dispatchers # Let every process finish importing first
+    procs = []
+
+    if args.replay:
+        calls, events = load_replay(args.replay)
+        gui_events = [e for e in events if e[2] != "Thread Message"]
+        bot_events = [e for e in events if e[2] == "Thread Message"]
+        id_map = ctx.Manager().dict()
+        for i in range(args.dispatchers):
+            mine = [e for e in gui_events if zlib.crc32(str(e[1]).encode()) % args.dispatchers == i]
+            procs.append(ctx.Process(target=replay_worker, args=(i, db_path, start_at, mine, calls, args.speed, results, id_map)))
+        if args.bot:
+            procs.append(ctx.Process(target=bot_worker, args=(db_path, start_at, 0, 0, args.random_seed, results, id_map, bot_events, args.speed)))
+        title = f"REPLAY of {args.replay} at {args.speed}x: {len(events)} events, {args.dispatchers} dispatchers{' + bot' if args.bot else ''}"
+    else:
+        for i in range(args.dispatchers):
+            procs.append(ctx.Process(target=dispatcher_worker, args=(i, db_path, start_at, args.duration, DEFAULT_MIX, args.think, args.random_seed + i, results)))
+        if args.bot:
+            procs.append(ctx.Process(target=bot_worker, args=(db_path, start_at, args.duration, args.bot_rate, args.random_seed, results)))
+        title = f"LOAD TEST: {args.dispatchers} dispatchers{' + bot' if args.bot else ''}, {args.duration:g}s"
+
+    print(f"Target database: {db_path}")
+    for p in procs: p.start()
+    collected = [results.get() for _ in procs]
+    for p in procs: p.join()
+    wall = max(0.001, time.time() - start_at)
+
+    summary = summarize(collected, wall)
+    print_report(summary, title)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
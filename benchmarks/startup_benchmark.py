@@ -0,0 +1,134 @@
+"""
+STARTUP_BENCHMARK.PY
+Measures cold start phase by phase, each run in a fresh Python process.
+Compares when the dispatcher first sees rows on screen: from the local snapshot
+(new path) versus waiting for the database open + first get_all_calls (old path).
+
+The database is copied to a temp folder first (opening it can run schema upgrades),
+unless --no-copy is given. Run it from the dispatch laptop against the share to get
+real numbers.
+
+Examples:
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --db "Z:\\HQ\\dispatch.db" --runs 10 --no-copy
+"""
+import argparse
+import configparser
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def child(db_path, snapshot_path):
+    """One cold start, phase by phase. Prints a JSON dict of phase -> seconds."""
+    sys.path.insert(0, ROOT)
+    from startup import PhaseTimer
+    timer = PhaseTimer()
+    import tkinter
+    timer.mark("import_tkinter")
+    try:
+        import sv_ttk
+    except ImportError:
+        pass
+    timer.mark("import_sv_ttk")
+    import gui
+    timer.mark("import_gui")
+    from startup import load_snapshot
+    snapshot = load_snapshot(snapshot_path, db_path, max_age_hours=24 * 365) if snapshot_path else None
+    timer.mark("load_snapshot")
+    from data_manager import DataManager
+    manager = DataManager(db_path)
+    timer.mark("open_db")
+    rows = manager.get_all_calls("ReportID", "ASC", True)
+    timer.mark("first_query")
+    manager.close()
+
+    try:
+        root = tkinter.Tk()
+        root.withdraw()
+        root.update_idletasks()
+        timer.mark("tk_root")
+        root.destroy()
+    except tkinter.TclError:
+        pass # No display (CI / SSH); the tk_root phase is simply left out
+
+    phases = dict(timer.phases)
+    phases["snapshot_rows"] = len(snapshot["rows"]) if snapshot else 0
+    phases["live_rows"] = len(rows)
+    print(json.dumps(phases))
+
+def summarize(runs, key):
+    values = [r[key] for r in runs if key in r]
+    if not values: return None
+    return statistics.median(values) * 1000, min(values) * 1000, max(values) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark for the dispatch GUI.")
+    parser.add_argument("--db", help="Database to open (default: this event's database per [DATABASE] in config.ini)")
+    parser.add_argument("--snapshot", help="Startup snapshot file (default: [APPLICATION] snapshot_file)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--no-copy", action="store_true", help="Open --db in place instead of a temp copy")
+    parser.add_argument("--child", nargs=2, metavar=("DB", "SNAPSHOT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1] or None)
+        return
+
+    config = configparser.ConfigParser()
+    config.read(os.path.join(ROOT, "config.ini"))
+    sys.path.insert(0, ROOT)
+    import shards
+    db_path = args.db or os.path.join(ROOT, shards.live_path(config))
+    snapshot_path = args.snapshot or os.path.join(ROOT, config.get('APPLICATION', 'snapshot_file', fallback=os.path.join('cache', 'last_view.json')))
+    if not os.path.exists(snapshot_path): snapshot_path = ""
+
+    if not args.no_copy and os.path.exists(db_path):
+        temp_db = os.path.join(tempfile.mkdtemp(prefix="dispatch_startup_"), os.path.basename(db_path))
+        shutil.copy2(db_path, temp_db)
+        if snapshot_path: # The snapshot is keyed to the database path, so re-key it to the copy
+            with open(snapshot_path, encoding="utf-8") as f: from_snapshot = json.load(f)
+            from_snapshot["db"] = os.path.abspath(temp_db)
+            snapshot_path = os.path.join(os.path.dirname(temp_db), "last_view.json")
+            with open(snapshot_path, "w", encoding="utf-8") as f: json.dump(from_snapshot, f)
+        db_path = temp_db
+
+    runs = []
+    for i in range(args.runs):
+        started = time.perf_counter()
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", db_path, snapshot_path],
+                             capture_output=True, text=True, cwd=ROOT)
+        wall = time.perf_counter() - started
+        if out.returncode != 0:
+            sys.exit(f"Run {i + 1} failed:\n{out.stderr}")
+        phases = json.loads(out.stdout.strip().splitlines()[-1])
+        timed = sum(v for k, v in phases.items() if not k.endswith("_rows"))
+        phases["interpreter_start"] = wall - timed # Process spawn + interpreter boot (plus frozen-build unpacking when run as .exe)
+        runs.append(phases)
+
+    order = ["interpreter_start", "import_tkinter", "import_sv_ttk", "import_gui", "load_snapshot", "open_db", "first_query", "tk_root"]
+    print(f"\n=== STARTUP: {args.runs} cold runs, db={db_path} ===")
+    print(f"{'phase':<20}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for key in order:
+        stats = summarize(runs, key)
+        if stats: print(f"{key:<20}{stats[0]:>12.1f}{stats[1]:>10.1f}{stats[2]:>10.1f}")
+
+    # Time until rows are on screen. Old: everything serial, rows only after open_db + first_query.
+    # New: the database opens in the background, so the snapshot path only waits on imports + load_snapshot.
+    base = ["interpreter_start", "import_tkinter", "import_sv_ttk", "import_gui"]
+    old = statistics.median(sum(r.get(k, 0) for k in base + ["open_db", "first_query"]) for r in runs) * 1000
+    new = statistics.median(sum(r.get(k, 0) for k in base + ["load_snapshot"]) for r in runs) * 1000
+    print(f"\nRows on screen, waiting for the database (old path): {old:.1f} ms, {runs[0]['live_rows']} live rows")
+    if snapshot_path:
+        print(f"Rows on screen from the local snapshot (new path):   {new:.1f} ms, {runs[0]['snapshot_rows']} cached rows")
+    else:
+        print("No startup snapshot found yet; run the GUI once so it saves one.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+TABLE_QUERY_BENCH.PY
+Time and memory of the main table refresh, old path versus new, at 10k and 100k calls.
+Old: SELECT * as sqlite3.Row, then a dict and a value list per row on every refresh.
+New: only the table's columns as CallRecord tuples, formatted once and reused from the
+per-ReportID cache on later refreshes (the usual case: most rows didn't change).
+
+Runs the GUI's own row formatting (DispatchCallApp._format_table_row) without opening a
+window. Memory is the tracemalloc peak of one cold refresh (measured separately, since
+tracemalloc slows everything down), with the result held as the GUI holds it.
+
+Example:
+    python benchmarks/table_query_bench.py --calls 10000 100000 --refreshes 5
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_manager import DataManager
+from gui import DispatchCallApp
+
+# DispatchCallApp.columns (display order) and what the refresh fetches for it
+DISPLAY_KEYS = ["ReportID", "CallDate", "CallTime", "TimeOpen", "ResolutionStatus", "ResolutionTimestamp", "ResolvedBy", "Cancelled",
+                "InputMedium", "Source", "Caller", "Location", "Code", "Description", "CreatedBy"]
+TABLE_COLUMNS = [key for key in DISPLAY_KEYS if key != "TimeOpen"] + ["CreatedEpoch"]
+HIGH_PRIORITY = ["White / Mayday", "Silver", "Black", "Red", "Blue", "Adam"]
+CODES = ["No_Code", "Green", "Yellow", "Blue", "Red", "Brown", "Orange", "Purple", "Adam"]
+LOCATIONS = ["Hall A", "Hall B", "Main Stage", "Artist Alley", "Dealers Room", "Lobby", "Loading Dock", "Food Court"]
+
+def build_db(path, calls):
+    manager = DataManager(path)
+    rng = random.Random(calls)
+    now = datetime.now()
+    rows = []
+    for i in range(1, calls + 1):
+        resolved = rng.random() < 0.8
+        rows.append((f"DC26-{i:04d}", now.strftime("%Y-%m-%d"), now.strftime("%H:%M"), "", False, "",
+                     now.strftime("%Y-%m-%d %H:%M:%S") if resolved else "", resolved, "dispatcher1" if resolved else "",
+                     "Radio", "Safety", f"UNIT{rng.randint(1, 40)}", rng.choice(LOCATIONS), rng.choice(CODES),
+                     f"Incident {i} near the {rng.choice(LOCATIONS)}. " * rng.randint(1, 6), "dispatcher2", "dispatcher3",
+                     False, "", False, False, str(10 ** 17 + i), str(10 ** 17 + 7), int(now.timestamp()) - rng.randint(0, 36000)))
+    with manager.conn:
+        manager.conn.executemany("""
+            INSERT INTO calls (ReportID, CallDate, CallTime, AnsweredTimestamp, AnsweredStatus, AnsweredBy, ResolutionTimestamp,
+                ResolutionStatus, ResolvedBy, InputMedium, Source, Caller, Location, Code, Description, CreatedBy, ModifiedBy,
+                RedFlag, ReportNumber, Deleted, Cancelled, DiscordMessageID, DiscordChannelID, CreatedEpoch)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+    return manager
+
+def old_refresh(manager, app):
+    """Pre-projection path: every column, then a dict and a fresh value list for every row."""
+    table = []
+    for call_row in manager.get_all_calls("ReportID", "ASC", False):
+        call = dict(call_row)
+        is_res = str(call.get('ResolutionStatus', "False")).lower() in ('1', 'true')
+        is_canc = str(call.get('Cancelled', "False")).lower() in ('1', 'true')
+        call["TimeOpen"] = "Cancelled" if is_canc else "Closed" if is_res else f"{int((time.time() - call['CreatedEpoch']) / 60)} min"
+        values = []
+        for key in DISPLAY_KEYS:
+            if key in ("ResolutionStatus", "Cancelled"): values.append("True" if str(call.get(key)).lower() in ('1', 'true') else "False")
+            elif key == "TimeOpen": values.append(call.get(key))
+            else: values.append(app._sanitize_for_tkinter(call.get(key, "")))
+        table.append((call, values))
+    return table
+
+def new_refresh(manager, app, cache):
+    """Projection + CallRecord, formatting only rows that differ from the cached ones."""
+    table = {}
+    for call in manager.get_all_calls("ReportID", "ASC", False, TABLE_COLUMNS):
+        report_id = call['ReportID']
+        entry = cache.get(report_id)
+        if entry is None or entry[0] != call: entry = app._format_table_row(call, DISPLAY_KEYS)
+        table[report_id] = entry
+    return table
+
+def measure(func, cold_func, refreshes):
+    times = []
+    for _ in range(refreshes):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    held = cold_func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del held
+    return times, peak
+
+def timed_fetch(manager, columns):
+    started = time.perf_counter()
+    manager.get_all_calls("ReportID", "ASC", False, columns)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Main table query benchmark (projection + compact rows vs SELECT *).")
+    parser.add_argument("--calls", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--refreshes", type=int, default=5)
+    args = parser.parse_args()
+
+    # Just enough of the app for its row formatting to run without a Tk window
+    app = SimpleNamespace(high_priority_codes=HIGH_PRIORITY)
+    app._sanitize_for_tkinter = lambda text: DispatchCallApp._sanitize_for_tkinter(app, text)
+    app._format_table_row = lambda call, keys: DispatchCallApp._format_table_row(app, call, keys)
+
+    for calls in args.calls:
+        folder = tempfile.mkdtemp(prefix="table_bench_")
+        manager = build_db(os.path.join(folder, "dispatch.db"), calls)
+        print(f"\n=== MAIN TABLE REFRESH: {calls:,} calls, {args.refreshes} refreshes ===")
+        print(f"{'path':<34}{'first ms':>10}{'median ms':>11}{'peak MB':>10}")
+
+        times, peak = measure(lambda: old_refresh(manager, app), lambda: old_refresh(manager, app), args.refreshes)
+        print(f"{'SELECT * + dict per row (old)':<34}{times[0] * 1000:>10.1f}{statistics.median(times[1:] or times) * 1000:>11.1f}{peak / 2**20:>10.1f}")
+
+        cache = {}
+        def refresh():
+            nonlocal cache
+            cache = new_refresh(manager, app, cache)
+        times, peak = measure(refresh, lambda: new_refresh(manager, app, {}), args.refreshes)
+        print(f"{'projection + CallRecord (new)':<34}{times[0] * 1000:>10.1f}{statistics.median(times[1:] or times) * 1000:>11.1f}{peak / 2**20:>10.1f}")
+
+        fetch_old = min(timed_fetch(manager, None) for _ in range(3))
+        fetch_new = min(timed_fetch(manager, TABLE_COLUMNS) for _ in range(3))
+        print(f"{'  query only, SELECT *':<34}{fetch_old * 1000:>10.1f}")
+        print(f"{'  query only, projected':<34}{fetch_new * 1000:>10.1f}")
+        manager.close()
+
+if __name__ == "__main__":
+    main()
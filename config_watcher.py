@@ -0,0 +1,165 @@
+"""
+CONFIG_WATCHER.PY
+Hot-reloads config.ini for the GUI and the Discord Bot without a mid-shift restart.
+A background thread only stats the file (cheap, even over SMB). The file is read and
+hashed only when its mtime or size moves, and parsed and validated only when the
+hash actually changed. New settings are built off the UI thread and then handed
+over in one reference swap, so readers never see a half-applied config.
+"""
+import configparser
+import hashlib
+import os
+import threading
+from routing import RoutingTable
+
+VALID_ROLES = ("admin", "user")
+
+# Used when config.ini has no [DASHBOARD] section
+DEFAULT_DASHBOARD_CATEGORIES = {
+    "Active Med (Blue/Yellow)": ["Blue", "Yellow"],
+    "Active Security (Adam/Threats)": ["Adam", "Black", "White / Mayday", "Silver"],
+    "Active Fire/Hazmat (Red/Brown)": ["Red", "Brown"],
+}
+
+def read_config(path, preserve_case=True):
+    """Parses config.ini the same way the GUI does (keys keep their case)."""
+    config = configparser.ConfigParser()
+    if preserve_case: config.optionxform = str
+    with open(path, "r", encoding="utf-8-sig") as f:
+        config.read_string(f.read(), source=path)
+    return config
+
+class AppSettings:
+    """
+    Read-only snapshot of everything the GUI derives from config.ini.
+    strict=True (used for hot reloads) raises ValueError instead of silently
+    falling back, so a half-typed edit never replaces a working config.
+    """
+    def __init__(self, config, strict=False, logger=None):
+        problems = []
+
+        try:
+            refresh_seconds = config.getint('APPLICATION', 'auto_refresh_seconds', fallback=10)
+            if refresh_seconds < 1: raise ValueError
+        except ValueError:
+            problems.append("[APPLICATION] auto_refresh_seconds must be a whole number of seconds (1 or more)")
+            refresh_seconds = 10
+        self.auto_refresh_seconds = refresh_seconds
+
+        self.desc_to_code_map = {}
+        if config.has_section('CODES'):
+            for desc, value in config.items('CODES'):
+                code = value.split('|')[0].strip()
+                if not code: problems.append(f"[CODES] {desc} has no code before the '|'")
+                else: self.desc_to_code_map[desc.strip()] = code
+        if not self.desc_to_code_map:
+            self.desc_to_code_map = {"General Situations": "No_Code"}
+
+        self.source_options = {}
+        if config.has_section('SOURCES'):
+            for medium, sources in config.items('SOURCES'):
+                options = [s.strip() for s in sources.split(',') if s.strip()]
+                if not options: problems.append(f"[SOURCES] {medium} lists no sources")
+                self.source_options[medium.capitalize()] = options
+
+        try:
+            dashboard_seconds = config.getint('APPLICATION', 'dashboard_refresh_seconds', fallback=refresh_seconds)
+            if dashboard_seconds < 1: raise ValueError
+        except ValueError:
+            problems.append("[APPLICATION] dashboard_refresh_seconds must be a whole number of seconds (1 or more)")
+            dashboard_seconds = refresh_seconds
+        self.dashboard_refresh_seconds = dashboard_seconds
+
+        self.dashboard_categories = {}
+        if config.has_section('DASHBOARD'):
+            for label, codes in config.items('DASHBOARD'):
+                self.dashboard_categories[label.strip()] = [c.strip() for c in codes.split(',') if c.strip()]
+        else:
+            self.dashboard_categories = dict(DEFAULT_DASHBOARD_CATEGORIES)
+
+        self.users = {}
+        if config.has_section('USERS'):
+            for user, role in config.items('USERS'):
+                role = role.strip().lower()
+                if role not in VALID_ROLES: problems.append(f"[USERS] {user} has unknown role '{role}'")
+                self.users[user.strip().lower()] = role
+        if not self.users: problems.append("[USERS] missing in config.ini")
+
+        try:
+            self.routing = RoutingTable.from_config(config)
+        except ValueError as e:
+            problems.append(str(e))
+            self.routing = RoutingTable([])
+
+        if problems:
+            if strict: raise ValueError("; ".join(problems))
+            if logger:
+                for problem in problems: logger.warning(f"config.ini: {problem}")
+
+class ConfigWatcher:
+    """
+    Polls a config file and calls apply(build(parsed_config)) whenever its content changes.
+    build runs on the watcher thread and should raise ValueError to reject a bad file;
+    the previous settings then stay in force and on_error is told why.
+    """
+    def __init__(self, path, build, apply, interval=3.0, preserve_case=True, on_error=None):
+        self.path = path
+        self.build = build
+        self.apply = apply
+        self.interval = interval
+        self.preserve_case = preserve_case
+        self.on_error = on_error
+        self.reload_count = 0
+        self._signature = self._stat()
+        self._digest = self._hash()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _hash(self):
+        try:
+            with open(self.path, "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+
+    def check_now(self):
+        """Returns True if new settings were applied."""
+        signature = self._stat()
+        if signature is None or signature == self._signature: return False
+        self._signature = signature
+
+        digest = self._hash()
+        if digest is None or digest == self._digest: return False # Touched or re-saved without edits
+        self._digest = digest
+
+        try:
+            settings = self.build(read_config(self.path, self.preserve_case))
+        except (ValueError, OSError, configparser.Error) as e:
+            if self.on_error: self.on_error(e)
+            return False
+        self.reload_count += 1
+        self.apply(settings)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check_now()
+            except Exception as e:
+                if self.on_error: self.on_error(e)
+
+    def start(self):
+        if self._thread: return self
+        self._thread = threading.Thread(target=self._run, name="ConfigWatcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -5,10 +5,49 @@ Optimized heavily with SQLite PRAGMAs and a custom retry decorator
 to survive multi-computer concurrency over a spotty Windows SMB File Share.
 """
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 import time
+import threading
 from functools import wraps
+from collections import Counter
+import audit_chain
+import rollups
+import shards
+import offline_journal
+import autocomplete
+import duplicates
+
+# Shared "still open" predicate. Queries must repeat it verbatim so SQLite can use the partial index.
+OPEN_CALL_FILTER = "(ResolutionStatus = 0 OR ResolutionStatus IS NULL) AND (Cancelled = 0 OR Cancelled IS NULL) AND (Deleted = 0 OR Deleted IS NULL)"
+
+# Column order shared by the hot call_history table and its archive copy, so UNION ALL lines up
+HISTORY_COLUMNS = audit_chain.CHAIN_COLUMNS
+
+# Past events attached at once (each may bring its archive too); SQLite allows 10 attachments by default
+MAX_ATTACHED_SHARDS = 4
+# Shown for calls from earlier events (missing columns in very old files read as NULL)
+PAST_CALL_COLUMNS = ("ReportID", "CallDate", "CallTime", "Code", "Location", "Caller", "Description", "ResolutionStatus", "Cancelled", "CreatedBy")
+
+# Lock retries per decorated method (process-wide), so load tests and diagnostics can see contention
+RETRY_COUNTS = Counter()
+_lock_wait = threading.local()
+
+def lock_wait_seconds():
+    """Seconds the calling thread has spent queueing for the write lock, on 'locked' attempts and in retry sleeps so far."""
+    return getattr(_lock_wait, "seconds", 0.0)
+
+def begin_write(conn):
+    """
+    Takes the write lock up front with BEGIN IMMEDIATE. The statement does nothing else, so its
+    duration is the time spent in SQLite's busy handler queueing behind other laptops' writes,
+    and it is added to the calling thread's lock wait (success or not).
+    """
+    started = time.perf_counter()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+    finally:
+        _lock_wait.seconds = lock_wait_seconds() + time.perf_counter() - started
 
 def sqlite_retry(max_retries=5, delay=0.5):
     """Intercepts 'Database Locked' errors over SMB and retries silently."""
@@ -16,24 +55,99 @@ def sqlite_retry(max_retries=5, delay=0.5):
         @wraps(func)
         def wrapper(*args, **kwargs):
             for attempt in range(max_retries):
+                started, wait_before = time.perf_counter(), lock_wait_seconds()
                 try:
                     return func(*args, **kwargs)
                 except sqlite3.OperationalError as e:
                     if "locked" in str(e).lower() and attempt < max_retries - 1:
+                        RETRY_COUNTS[func.__name__] += 1
                         time.sleep(delay)
+                        # The whole failed attempt was spent waiting; replaces what begin_write already counted of it
+                        _lock_wait.seconds = wait_before + time.perf_counter() - started
                     else:
                         raise
         return wrapper
     return decorator
 
+# Fields a dispatcher can edit; compared to show what another laptop changed in a save conflict
+EDITABLE_FIELDS = ("InputMedium", "Source", "Caller", "Location", "Code", "Description", "Cancelled",
+                   "ResolutionStatus", "ResolvedBy", "AnsweredStatus", "AnsweredBy")
+
+# Free-text fields the entry form suggests past values for (see autocomplete.py)
+AUTOCOMPLETE_FIELDS = ("Location", "Caller")
+
+class CallConflictError(Exception):
+    """Raised by modify_call when another laptop saved the call after this dispatcher loaded it."""
+    def __init__(self, report_id, original, current):
+        self.report_id = report_id
+        self.original = original
+        self.current = current
+        self.changed_fields = [f for f in EDITABLE_FIELDS if str(original.get(f) or "") != str(current.get(f) or "")]
+        super().__init__(f"Call {report_id} was changed by {current.get('ModifiedBy') or 'another dispatcher'} while you were editing it.")
+
+class PossibleDuplicateError(Exception):
+    """Raised by add_call(allow_duplicates=False) when open calls look like the same incident. Nothing was written."""
+    def __init__(self, matches):
+        self.matches = matches
+        super().__init__("Possible duplicate of " + ", ".join(m["ReportID"] for m in matches))
+
+def _norm(value):
+    if isinstance(value, (bool, int)): return "true" if value else "false"
+    return "" if value is None else str(value).strip()
+
+def merge_edits(my_call, original, current):
+    """After a save conflict: the current row, with the fields this dispatcher actually edited (vs original) on top."""
+    merged = dict(current)
+    for field, value in my_call.items():
+        if _norm(value) != _norm(original.get(field)): merged[field] = value
+    return merged
+
+class CallRecord(tuple):
+    """
+    Compact, tuple-backed row for the main table (get_all_calls with columns=...).
+    Column names live once on a per-projection subclass instead of in every row, and it
+    reads like sqlite3.Row or a dict: record['Code'], record.get('Code'), dict(record).
+    """
+    __slots__ = ()
+    fields = {}
+    _classes = {}
+
+    @classmethod
+    def for_columns(cls, columns):
+        key = tuple(columns)
+        if key not in CallRecord._classes:
+            CallRecord._classes[key] = type("CallRecord", (CallRecord,), {"__slots__": (), "fields": {name: i for i, name in enumerate(key)}})
+        return CallRecord._classes[key]
+
+    def __getitem__(self, key):
+        if isinstance(key, str): return tuple.__getitem__(self, self.fields[key])
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        index = self.fields.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+
+    def keys(self): return list(self.fields)
+
+    def values(self): return tuple(self)
+
 class DataManager:
-    def __init__(self, db_filename):
+    def __init__(self, db_filename, archive_filename=None, audit_key="", past_shards=None, journal_filename=None, duplicate_window_minutes=duplicates.WINDOW_MINUTES):
         self.db_filename = db_filename
+        self.archive_filename = archive_filename
+        self.audit_key = audit_key # Signs audit checkpoints; lives in config.ini, never in the database
+        self.past_shards = past_shards or {} # shards.past_shards(): other events' files, attached read-only on demand
+        self._attached_shards = {} # key -> has archive, oldest attachment first
         # timeout=20.0 prevents "Database Locked" errors by forcing laptops to wait 
         # up to 20 seconds in line to write to the database over the network.
-        self.conn = sqlite3.connect(db_filename, check_same_thread=False, timeout=20.0)
+        # uri=True only so past shards can be attached read-only (file:...?mode=ro); plain paths open as before.
+        self.conn = sqlite3.connect(db_filename, check_same_thread=False, timeout=20.0, uri=True)
         self.conn.row_factory = sqlite3.Row
+        self.instrumentation = None # Set by instrumentation.Instrumentation.instrument() when [DIAGNOSTICS] is on
         self.call_id_prefix = f"DC{datetime.now().strftime('%y')}" # Generates DC24, DC25, etc.
+        # Local queue for call saves made while the share is unreachable (see offline_journal.py)
+        self.journal = offline_journal.OfflineJournal(journal_filename, db_filename, self.call_id_prefix) if journal_filename else None
+        self.duplicates = duplicates.DuplicateIndex(duplicate_window_minutes) # Open calls in the window, re-synced before each check
         
         # SQLite Network Optimization PRAGMAs
         with self.conn:
@@ -44,6 +158,11 @@ class DataManager:
             self.conn.execute("PRAGMA cache_size=-64000;")
             
         self._create_tables()
+        self._continue_legacy_numbering()
+        if archive_filename: self._attach_archive()
+        audit_chain.ensure_schema(self.conn)
+        if rollups.ensure_schema(self.conn): self.rebuild_rollups() # First run on an existing database
+        self._build_autocomplete()
 
     def _create_tables(self):
         """Builds the database schema on first boot."""
@@ -82,133 +201,597 @@ class DataManager:
             try: self.conn.execute("ALTER TABLE calls ADD COLUMN Cancelled BOOLEAN;")
             except sqlite3.OperationalError: pass
 
+            # Row version for optimistic concurrency: bumped by every modify_call
+            try: self.conn.execute("ALTER TABLE calls ADD COLUMN Version INTEGER DEFAULT 0;")
+            except sqlite3.OperationalError: pass
+
+            # Typed epoch timestamps (seconds). The TEXT date/time columns stay for CSV compatibility.
+            for column in ("CreatedEpoch", "AnsweredEpoch", "ResolvedEpoch"):
+                try: self.conn.execute(f"ALTER TABLE calls ADD COLUMN {column} INTEGER;")
+                except sqlite3.OperationalError: pass
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_created ON calls(CreatedEpoch)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_resolved ON calls(ResolvedEpoch)")
+
+            # Set on calls saved offline and replayed later, so a replay can never insert the same call twice
+            try: self.conn.execute("ALTER TABLE calls ADD COLUMN OfflineKey TEXT;")
+            except sqlite3.OperationalError: pass
+            self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_calls_offline_key ON calls(OfflineKey) WHERE OfflineKey IS NOT NULL")
+            self._backfill_epochs()
+
+            # Partial indexes keep the dashboard aggregates off a full table scan
+            self.conn.execute("DROP INDEX IF EXISTS idx_calls_open") # Superseded by the epoch-based index below
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_calls_open_sla ON calls(Code, CreatedEpoch) WHERE {OPEN_CALL_FILTER}")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_deleted ON calls(Deleted)")
+            
+            # History lookups per call (viewer, archival) no longer scan the whole audit log
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_call ON call_history(CallID, Timestamp)")
+
+    def _attach_archive(self):
+        """
+        Attaches the cold history partition as 'archive'. It holds call_history rows for calls
+        closed long ago, so the hot file every laptop hammers over SMB stays small.
+        HistoryIDs are copied unchanged, so the two partitions never overlap.
+        """
+        self.conn.execute("ATTACH DATABASE ? AS archive", (self.archive_filename,))
+        with self.conn:
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS archive.call_history (
+                    HistoryID INTEGER PRIMARY KEY,
+                    CallID TEXT, Timestamp TEXT, User TEXT, Action TEXT, Details TEXT,
+                    PrevHash TEXT, RowHash TEXT
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_history_call ON call_history(CallID, Timestamp)")
+
+    def _continue_legacy_numbering(self):
+        """
+        A new event shard created mid-year, while the pre-sharding database already holds this year's
+        calls, continues after their IDs so the same ReportID never names two different calls.
+        """
+        if shards.LEGACY not in self.past_shards: return
+        if self.conn.execute("SELECT 1 FROM sqlite_sequence WHERE name = 'calls'").fetchone(): return
+        schema, _ = self._attach_shard(shards.LEGACY)
+        last_id = self.conn.execute(f"SELECT MAX(ID) FROM {schema}.calls WHERE ReportID LIKE ?", (f"{self.call_id_prefix}-%",)).fetchone()[0]
+        if last_id:
+            with self.conn:
+                self.conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('calls', ?)", (last_id,))
+
+    def _backfill_epochs(self):
+        """
+        Converts legacy minute-resolution TEXT timestamps into epoch columns.
+        Also catches rows written by laptops still running an older version mid-event.
+        The 'utc' modifier tells SQLite the text is local time, matching datetime.now().
+        """
+        if not self.conn.execute("SELECT 1 FROM calls WHERE CreatedEpoch IS NULL LIMIT 1").fetchone(): return
+        self.conn.execute("""
+            UPDATE calls SET CreatedEpoch = CAST(strftime('%s', CallDate || ' ' || CallTime, 'utc') AS INTEGER)
+            WHERE CreatedEpoch IS NULL AND CallDate <> '' AND CallTime <> ''
+        """)
+        self.conn.execute("""
+            UPDATE calls SET AnsweredEpoch = CAST(strftime('%s', AnsweredTimestamp, 'utc') AS INTEGER)
+            WHERE AnsweredEpoch IS NULL AND AnsweredTimestamp <> ''
+        """)
+        self.conn.execute("""
+            UPDATE calls SET ResolvedEpoch = CAST(strftime('%s', ResolutionTimestamp, 'utc') AS INTEGER)
+            WHERE ResolvedEpoch IS NULL AND ResolutionTimestamp <> '' AND ResolutionStatus
+        """)
+
+    def _build_autocomplete(self):
+        """One GROUP BY per field at startup; after that the indexes only grow with this laptop's saves."""
+        self.autocomplete = {field: autocomplete.PrefixIndex() for field in AUTOCOMPLETE_FIELDS}
+        pending = self.journal.pending_calls() if self.journal else []
+        for field, index in self.autocomplete.items():
+            rows = self.conn.execute(f"SELECT {field}, COUNT(*) FROM calls WHERE (Deleted = 0 OR Deleted IS NULL) GROUP BY {field}").fetchall()
+            index.add_many([(row[0], row[1]) for row in rows] + [(call.get(field), 1) for call in pending])
+
+    def _remember_entries(self, call, original=None):
+        """Counts a saved call's Location and Caller. On a modify, only the fields that actually changed."""
+        for field, index in self.autocomplete.items():
+            if field in call and (original is None or _norm(call[field]) != _norm(original.get(field))): index.add(call[field])
+
+    def suggest(self, field, prefix, limit=8):
+        """Past values of field starting with prefix, most used first. Memory only, safe on the UI thread."""
+        index = self.autocomplete.get(field)
+        return index.suggest(prefix, limit) if index else []
+
+    def find_duplicates(self, call, limit=3):
+        """
+        Open calls from the last duplicate window that look like the same incident as call, best first.
+        One indexed query for the window's open calls; only new or edited ones are re-signed.
+        If the share is unreachable, or saves are already queued offline, the index is used as last
+        synced, plus the calls entered offline, so a queued save never waits on the share.
+        """
+        now_epoch = int(time.time())
+        if self.journal and self.journal.pending_count:
+            for pending in self.journal.pending_calls():
+                if pending.get("Cancelled") or pending.get("ResolutionStatus"): self.duplicates.remove(pending["ReportID"])
+                else: self.duplicates.add(pending["ReportID"], pending["Location"], pending["Description"], pending["Code"], pending["CreatedEpoch"])
+            return self.duplicates.find(call, now_epoch, limit)
+        try:
+            rows = self.conn.execute(f"""
+                SELECT ReportID, Location, Description, Code, CreatedEpoch FROM calls
+                WHERE CreatedEpoch >= ? AND {OPEN_CALL_FILTER}
+            """, (now_epoch - self.duplicates.window,)).fetchall()
+            self.duplicates.sync(rows)
+        except sqlite3.OperationalError as e:
+            if not offline_journal.is_connectivity_error(e): raise
+        return self.duplicates.find(call, now_epoch, limit)
+
     def check_if_updated(self):
         """
         Polled every 10 seconds by the Tkinter UI to check if another computer changed the DB.
-        Uses MAX(HistoryID) because it is immune to row deletions and race conditions.
+        Uses the AUTOINCREMENT high-water mark of call_history, which only ever grows: unlike
+        MAX(HistoryID) alone it doesn't drop when archival moves the newest rows out.
         """
         try:
             self.conn.commit() # Forces SQLite to clear cache and check the actual file
-            cursor = self.conn.execute("SELECT MAX(HistoryID) FROM call_history")
+            cursor = self.conn.execute("""
+                SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'call_history'), 0),
+                           COALESCE((SELECT MAX(HistoryID) FROM call_history), 0))
+            """)
             result = cursor.fetchone()[0]
             return result if result else 0
         except Exception:
             return -1
 
     def _log_history(self, call_id, user, action, details=""):
-        """Internal helper to write to the uneditable liability audit log."""
+        """Internal helper to write to the hash-chained liability audit log. Runs inside the caller's transaction."""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.conn.execute(
-            "INSERT INTO call_history (CallID, Timestamp, User, Action, Details) VALUES (?, ?, ?, ?, ?)",
-            (call_id, timestamp, user, action, details)
-        )
+        audit_chain.append_history(self.conn, call_id, timestamp, user, action, details)
+
+    @sqlite_retry()
+    def verify_audit_chain(self, full=False):
+        """
+        Checks the audit log hash chain (hot and archived rows). Incremental from the last
+        signed checkpoint unless full=True, and records a new checkpoint when it passes.
+        """
+        return audit_chain.verify(self.conn, self.audit_key, full=full)
 
-    def get_all_calls(self, sort_by="ReportID", sort_order="ASC", active_only=False):
-        valid_columns = ["ReportID", "CallDate", "Location", "Code", "ResolutionStatus", "Cancelled"]
+    def get_all_calls(self, sort_by="ReportID", sort_order="ASC", active_only=False, columns=None):
+        """
+        Without columns: every column as sqlite3.Row (CSV export). With columns: only those,
+        as compact CallRecord tuples, so the table refresh doesn't drag unused columns over SMB.
+        """
+        valid_columns = ["ReportID", "CallDate", "Location", "Code", "ResolutionStatus", "Cancelled", "CreatedEpoch"]
         if sort_by not in valid_columns: sort_by = "ReportID"
         sort_order = "DESC" if sort_order.upper() == "DESC" else "ASC"
         
-        query = "SELECT * FROM calls WHERE (Deleted = 0 OR Deleted IS NULL)"
+        if columns:
+            known = self._call_columns()
+            columns = [c for c in columns if c in known] # Names are interpolated, so only real columns get through
+        query = f"SELECT {', '.join(columns) if columns else '*'} FROM calls WHERE (Deleted = 0 OR Deleted IS NULL)"
         if active_only:
             query += " AND (ResolutionStatus = 0 OR ResolutionStatus IS NULL) AND (Cancelled = 0 OR Cancelled IS NULL)"
             
         query += f" ORDER BY {sort_by} {sort_order}"
-        cursor = self.conn.execute(query)
+        if not columns: return self.conn.execute(query).fetchall()
+        
+        cursor = self.conn.cursor()
+        cursor.row_factory = None # Plain tuples straight from C, wrapped once below
+        record = CallRecord.for_columns(columns)
+        return list(map(record, cursor.execute(query).fetchall()))
+
+    def _call_columns(self):
+        if not hasattr(self, '_call_column_names'):
+            self._call_column_names = {row[1] for row in self.conn.execute("PRAGMA table_info(calls)")}
+        return self._call_column_names
+
+    def get_dashboard_metrics(self, categories):
+        """
+        Computes the live dashboard counters with indexed aggregate SQL instead of looping over rows.
+        categories maps a dashboard label to the codes it counts, e.g. {"Active Med": ["Blue", "Yellow"]}.
+        Total volume always counts the whole shift, regardless of the table's "Active Calls Only" filter.
+        """
+        case_parts, params = [], []
+        for label, codes in categories.items():
+            if not codes: continue
+            case_parts.append(f"WHEN Code IN ({', '.join('?' * len(codes))}) THEN ?")
+            params.extend(codes)
+            params.append(label)
+        category_expr = f"CASE {' '.join(case_parts)} END" if case_parts else "NULL"
+        
+        cursor = self.conn.execute(f"""
+            SELECT {category_expr} AS Category, COUNT(*) AS OpenCount, MIN(CreatedEpoch) AS OldestOpen
+            FROM calls INDEXED BY idx_calls_open_sla WHERE {OPEN_CALL_FILTER} GROUP BY Category
+        """, params)
+        
+        metrics = {"categories": {label: 0 for label in categories}, "open_total": 0, "peak_sla_minutes": 0, "total_volume": 0}
+        oldest_open = None
+        for row in cursor.fetchall():
+            if row['Category'] is not None: metrics["categories"][row['Category']] = row['OpenCount']
+            metrics["open_total"] += row['OpenCount']
+            if row['OldestOpen'] and (oldest_open is None or row['OldestOpen'] < oldest_open): oldest_open = row['OldestOpen']
+        
+        if oldest_open:
+            metrics["peak_sla_minutes"] = max(0, int((time.time() - oldest_open) // 60))
+            
+        # Both counts are answered from idx_calls_deleted alone, never touching the table rows
+        metrics["total_volume"] = self.conn.execute("SELECT (SELECT COUNT(*) FROM calls) - (SELECT COUNT(*) FROM calls WHERE Deleted = 1)").fetchone()[0]
+        return metrics
+
+    def get_calls_in_range(self, start_epoch, end_epoch=None):
+        """Calls created in [start_epoch, end_epoch), e.g. "last 2 hours". Range-scans idx_calls_created."""
+        end_epoch = end_epoch if end_epoch is not None else int(time.time()) + 1
+        cursor = self.conn.execute(
+            "SELECT * FROM calls WHERE CreatedEpoch >= ? AND CreatedEpoch < ? AND (Deleted = 0 OR Deleted IS NULL) ORDER BY CreatedEpoch",
+            (int(start_epoch), int(end_epoch))
+        )
         return cursor.fetchall()
 
     def get_call_by_id(self, report_id):
+        if self.journal and offline_journal.is_provisional(report_id):
+            real_id = self.journal.resolve(report_id)
+            if real_id == report_id: # Still only in the offline journal
+                return next((call for call in self.journal.pending_calls() if call['ReportID'] == report_id), None)
+            report_id = real_id
         cursor = self.conn.execute("SELECT * FROM calls WHERE ReportID = ?", (report_id,))
         return cursor.fetchone()
 
-    def get_history_for_call(self, report_id):
-        cursor = self.conn.execute("SELECT * FROM call_history WHERE CallID = ? ORDER BY Timestamp DESC", (report_id,))
+    def get_pending_calls(self, columns, active_only=False):
+        """Calls saved offline and not yet on the share (provisional IDs), as CallRecords for the main table."""
+        if not self.journal or not self.journal.pending_count: return []
+        calls = self.journal.pending_calls()
+        if active_only: calls = [c for c in calls if not (c.get('ResolutionStatus') or c.get('Cancelled'))]
+        record = CallRecord.for_columns(columns)
+        return [record(tuple(call.get(column) for column in columns)) for call in calls]
+
+    def _attach_shard(self, key):
+        """
+        Attaches a past event's database (and its history archive, if any) read-only, on first use.
+        Returns (schema, archive schema or None). The least recently attached event is detached
+        when the limit is reached. Never called inside a transaction.
+        """
+        schema = f"shard_{key}"
+        if key in self._attached_shards:
+            self._attached_shards[key] = self._attached_shards.pop(key) # Most recently used last
+        else:
+            db_path, archive_path = self.past_shards[key]
+            while len(self._attached_shards) >= MAX_ATTACHED_SHARDS: self._detach_shard(next(iter(self._attached_shards)))
+            self.conn.execute(f"ATTACH DATABASE ? AS {schema}", (shards.readonly_uri(db_path),))
+            if archive_path: self.conn.execute(f"ATTACH DATABASE ? AS {schema}_archive", (shards.readonly_uri(archive_path),))
+            self._attached_shards[key] = bool(archive_path)
+        return schema, f"{schema}_archive" if self._attached_shards[key] else None
+
+    def _detach_shard(self, key):
+        has_archive = self._attached_shards.pop(key)
+        self.conn.execute(f"DETACH DATABASE shard_{key}")
+        if has_archive: self.conn.execute(f"DETACH DATABASE shard_{key}_archive")
+
+    def _select_list(self, schema, columns):
+        """Column list for a past shard's calls table, reading columns it predates as NULL."""
+        present = {row[1] for row in self.conn.execute(f"PRAGMA {schema}.table_info(calls)")}
+        return ", ".join(c if c in present else f"NULL AS {c}" for c in columns)
+
+    def _shard_for_call(self, report_id):
+        """Past shard key holding report_id, or None for the live database. The ReportID prefix names the event."""
+        prefix = str(report_id).split("-")[0]
+        if prefix != self.call_id_prefix and prefix in self.past_shards: return prefix
+        if shards.LEGACY not in self.past_shards: return None
+        if prefix == self.call_id_prefix and self.get_call_by_id(report_id): return None
+        return shards.LEGACY
+
+    def _history_source(self):
+        """call_history across the hot file and (when attached) the archive, for use in a FROM clause."""
+        if not self.archive_filename: return "main.call_history"
+        return f"(SELECT {HISTORY_COLUMNS} FROM main.call_history UNION ALL SELECT {HISTORY_COLUMNS} FROM archive.call_history)"
+
+    def get_history_for_call(self, report_id, limit=None, before_id=None):
+        """
+        Newest first. With a limit, returns one page; pass the oldest HistoryID already
+        shown as before_id for the next one (keyset, so deep pages cost the same as the first).
+        """
+        where, params = "CallID = ?", [report_id]
+        if before_id is not None:
+            where += " AND HistoryID < ?"
+            params.append(before_id)
+        paging = " LIMIT ?" if limit else ""
+        # Calls from a past event are read from that event's (read-only) files
+        past = self._shard_for_call(report_id)
+        schema, archive_schema = self._attach_shard(past) if past else ("main", "archive" if self.archive_filename else None)
+        if archive_schema:
+            cursor = self.conn.execute(f"""
+                SELECT {HISTORY_COLUMNS} FROM {schema}.call_history WHERE {where}
+                UNION ALL SELECT {HISTORY_COLUMNS} FROM {archive_schema}.call_history WHERE {where}
+                ORDER BY HistoryID DESC{paging}
+            """, params * 2 + ([limit] if limit else []))
+        else:
+            cursor = self.conn.execute(f"SELECT {HISTORY_COLUMNS} FROM {schema}.call_history WHERE {where} ORDER BY HistoryID DESC{paging}",
+                                       params + ([limit] if limit else []))
+        return cursor.fetchall()
+
+    def get_history_since(self, after_id, call_ids):
+        """New history rows for a set of calls (live tail), oldest first. New rows are always in the hot file."""
+        if not call_ids: return []
+        placeholders = ", ".join("?" * len(call_ids))
+        cursor = self.conn.execute(f"SELECT {HISTORY_COLUMNS} FROM main.call_history WHERE HistoryID > ? AND CallID IN ({placeholders}) ORDER BY HistoryID ASC",
+                                   (after_id, *call_ids))
         return cursor.fetchall()
 
+    def search_past_events(self, term, limit=200):
+        """
+        Calls from earlier events whose ID, code, location, caller or description contain term.
+        Each past event is attached read-only and searched in turn, newest event first.
+        """
+        like = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        results = []
+        for key in self.past_shards:
+            if len(results) >= limit: break
+            schema, _ = self._attach_shard(key)
+            results.extend(self.conn.execute(f"""
+                SELECT ?1 AS Event, {self._select_list(schema, PAST_CALL_COLUMNS)} FROM {schema}.calls
+                WHERE (Deleted = 0 OR Deleted IS NULL)
+                  AND (ReportID LIKE ?2 ESCAPE '\\' OR Code LIKE ?2 ESCAPE '\\' OR Location LIKE ?2 ESCAPE '\\'
+                       OR Caller LIKE ?2 ESCAPE '\\' OR Description LIKE ?2 ESCAPE '\\')
+                ORDER BY ID DESC LIMIT ?3
+            """, (key, like, limit - len(results))).fetchall())
+        return results
+
+    def get_event_summaries(self):
+        """Per-event, per-Code totals for this event and every past one (post-event comparison report)."""
+        rows = []
+        for event in [self.call_id_prefix] + list(self.past_shards):
+            schema = "main" if event == self.call_id_prefix else self._attach_shard(event)[0] # One at a time: attachments are limited
+            # Very old files have no epoch/Cancelled columns; those totals read as empty
+            calls = f"(SELECT Code, Deleted, {self._select_list(schema, ('ResolutionStatus', 'Cancelled', 'CreatedEpoch', 'ResolvedEpoch'))} FROM {schema}.calls)"
+            rows.extend(self.conn.execute(f"""
+                SELECT ? AS Event, Code, COUNT(*) AS Calls,
+                       SUM(CASE WHEN ResolutionStatus THEN 1 ELSE 0 END) AS Resolved,
+                       SUM(CASE WHEN Cancelled THEN 1 ELSE 0 END) AS Cancelled,
+                       ROUND(AVG(CASE WHEN ResolutionStatus AND ResolvedEpoch >= CreatedEpoch THEN (ResolvedEpoch - CreatedEpoch) / 60.0 END), 1) AS AvgResolveMinutes
+                FROM {calls} WHERE (Deleted = 0 OR Deleted IS NULL) GROUP BY Code ORDER BY Calls DESC
+            """, (event,)).fetchall())
+        return rows
+
     def get_full_audit_log(self):
-        """For Admin CSV Export only."""
-        cursor = self.conn.execute("SELECT * FROM call_history ORDER BY HistoryID ASC")
+        """For Admin CSV Export only. Covers both the hot and archived history."""
+        cursor = self.conn.execute(f"SELECT * FROM {self._history_source()} ORDER BY HistoryID ASC")
         return cursor.fetchall()
 
-    def get_passdown_notes(self):
-        cursor = self.conn.execute("SELECT * FROM passdown_notes ORDER BY Timestamp DESC LIMIT 50")
+    def get_passdown_notes(self, limit=50, before_id=None):
+        """Newest notes first. Pass the oldest NoteID already on screen as before_id to page further back."""
+        if before_id is None:
+            cursor = self.conn.execute("SELECT * FROM passdown_notes ORDER BY NoteID DESC LIMIT ?", (limit,))
+        else:
+            cursor = self.conn.execute("SELECT * FROM passdown_notes WHERE NoteID < ? ORDER BY NoteID DESC LIMIT ?", (before_id, limit))
+        return cursor.fetchall()
+
+    def get_passdown_notes_since(self, after_id, limit=500):
+        """Notes written after the newest one a window already shows (live tail), oldest first."""
+        cursor = self.conn.execute("SELECT * FROM passdown_notes WHERE NoteID > ? ORDER BY NoteID ASC LIMIT ?", (after_id, limit))
         return cursor.fetchall()
 
     @sqlite_retry()
     def add_passdown_note(self, user, note):
+        """Returns the saved note so the caller can show it without re-querying."""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         with self.conn:
-            self.conn.execute("INSERT INTO passdown_notes (Timestamp, User, Note) VALUES (?, ?, ?)", (timestamp, user, note))
+            begin_write(self.conn)
+            cursor = self.conn.execute("INSERT INTO passdown_notes (Timestamp, User, Note) VALUES (?, ?, ?)", (timestamp, user, note))
+        return {"NoteID": cursor.lastrowid, "Timestamp": timestamp, "User": user, "Note": note}
 
     @sqlite_retry()
-    def add_call(self, call, current_user):
-        """Creates a new incident and assigns a formatted DC-#### ID."""
+    def add_call(self, call, current_user, allow_duplicates=True):
+        """
+        Creates a new incident and assigns a formatted DC-#### ID.
+        With an offline journal, a call the share can't take (or one that would jump ahead of
+        earlier offline saves) is journaled instead and gets a provisional ID (DC26-P0001).
+        With allow_duplicates=False, raises PossibleDuplicateError instead if open calls look like
+        the same incident (see find_duplicates); save again with True once the dispatcher confirms.
+        """
+        if not allow_duplicates:
+            matches = self.find_duplicates(call)
+            if matches: raise PossibleDuplicateError(matches)
         now = datetime.now()
+        if self.journal and self.journal.pending_count:
+            report_id = self.journal.queue_add(call, current_user, now.strftime("%Y-%m-%d %H:%M:%S"))
+        else:
+            try:
+                report_id = self._insert_call(call, current_user, now)
+            except sqlite3.OperationalError as e:
+                if not (self.journal and offline_journal.is_connectivity_error(e)): raise
+                report_id = self.journal.queue_add(call, current_user, now.strftime("%Y-%m-%d %H:%M:%S"))
+        self._remember_entries(call) # Counted once here, not again when a journaled call replays
+        if not call.get('Cancelled'):
+            self.duplicates.add(report_id, call['Location'], call['Description'], call['Code'], int(now.timestamp()))
+        return report_id
+
+    def _insert_call(self, call, current_user, now, offline_key=None, provisional_id=None):
         with self.conn: 
+            begin_write(self.conn)
+            if offline_key:
+                existing = self.conn.execute("SELECT ReportID FROM calls WHERE OfflineKey = ?", (offline_key,)).fetchone()
+                if existing: return existing[0] # An earlier replay got this far before losing the share
             cursor = self.conn.cursor()
             cursor.execute("""
                 INSERT INTO calls (
                     CallDate, CallTime, AnsweredTimestamp, AnsweredStatus, AnsweredBy,
                     ResolutionTimestamp, ResolutionStatus, ResolvedBy, InputMedium, Source, 
                     Caller, Location, Code, Description, CreatedBy, ModifiedBy, RedFlag,
-                    ReportNumber, Deleted, Cancelled
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ReportNumber, Deleted, Cancelled, CreatedEpoch, OfflineKey
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 now.strftime("%Y-%m-%d"), now.strftime("%H:%M"), "", False, "", "", False, "",
                 call['InputMedium'], call['Source'], call['Caller'], call['Location'],
-                call['Code'], call['Description'], current_user, "", False, "", False, call.get('Cancelled', False)
+                call['Code'], call['Description'], current_user, "", False, "", False, call.get('Cancelled', False),
+                int(now.timestamp()), offline_key
             ))
             new_id = cursor.lastrowid
             report_id = f"{self.call_id_prefix}-{new_id:04d}"
             cursor.execute("UPDATE calls SET ReportID = ? WHERE ID = ?", (report_id, new_id))
-            self._log_history(report_id, current_user, "Call Created")
+            rollups.record_new_call(self.conn, int(now.timestamp()), call['Code'], call.get('Cancelled', False))
+            details = f"Entered offline at {now.strftime('%Y-%m-%d %H:%M:%S')} as {provisional_id}" if provisional_id else ""
+            self._log_history(report_id, current_user, "Call Created", details)
         return report_id
 
     @sqlite_retry()
-    def modify_call(self, report_id, updated_call, current_user):
-        """Updates a call and automatically logs exactly which fields the dispatcher changed."""
-        original_call_row = self.get_call_by_id(report_id)
-        if not original_call_row: raise ValueError("Call not found.")
-        
-        original_call = dict(original_call_row)
-        modification_details = []
-        now = datetime.now().strftime("%Y-%m-%d %H:%M")
-        
-        # Track what changed for the audit log
-        for field in ['InputMedium', 'Source', 'Caller', 'Location', 'Code', 'Cancelled']:
-            if str(original_call.get(field, '')) != str(updated_call.get(field, '')):
-                modification_details.append(f"{field} updated.")
-        
-        if original_call['Description'].strip() != updated_call['Description'].strip():
-            modification_details.append("Description was updated.")
-
-        is_newly_resolved = updated_call["ResolutionStatus"] and not original_call["ResolutionStatus"]
-        if is_newly_resolved:
-            updated_call["ResolutionTimestamp"] = now
-            self._log_history(report_id, current_user, "Call Resolved", f"Resolved by: {updated_call['ResolvedBy']}")
+    def modify_call(self, report_id, updated_call, current_user, original=None):
+        """
+        Updates a call and automatically logs exactly which fields the dispatcher changed.
+        original is the row the dispatcher loaded (including its Version). The save is then a single
+        conditional UPDATE with no re-read, and raises CallConflictError if another laptop saved the
+        call in the meantime. Without original, the row is read inside the write transaction.
+        With an offline journal, a save the share can't take is journaled and replayed later.
+        Returns True once saved to the share, or offline_journal.JOURNALED when queued for replay.
+        """
+        now_dt = datetime.now()
+        if self.journal:
+            report_id = self.journal.resolve(report_id)
+        if self.journal and self.journal.pending_count:
+            result = self.journal.queue_modify(report_id, updated_call, current_user, original, now_dt.strftime("%Y-%m-%d %H:%M:%S"))
         else:
-            if not updated_call["ResolutionStatus"] and original_call["ResolutionStatus"]:
-                updated_call["ResolvedBy"], updated_call["ResolutionTimestamp"] = "", ""
+            try:
+                result = self._update_call(report_id, updated_call, current_user, original, now_dt)
+            except sqlite3.OperationalError as e:
+                if not (self.journal and offline_journal.is_connectivity_error(e)): raise
+                result = self.journal.queue_modify(report_id, updated_call, current_user, original, now_dt.strftime("%Y-%m-%d %H:%M:%S"))
+        if original is not None: self._remember_entries(updated_call, original) # Without it there's nothing to tell what changed
+        return result
 
-        if modification_details:
-            self._log_history(report_id, current_user, "Call Modified", "; ".join(modification_details))
-        
-        updated_call['ModifiedBy'] = current_user
-        
+    def _update_call(self, report_id, updated_call, current_user, original, now_dt, note=""):
         with self.conn:
-            self.conn.execute("""
+            begin_write(self.conn)
+            if original is None:
+                original = self.get_call_by_id(report_id)
+                if not original: raise ValueError("Call not found.")
+            original_call = dict(original)
+            modification_details = []
+            now, now_epoch = now_dt.strftime("%Y-%m-%d %H:%M"), int(now_dt.timestamp())
+            
+            # Track what changed for the audit log
+            for field in ['InputMedium', 'Source', 'Caller', 'Location', 'Code', 'Cancelled']:
+                if str(original_call.get(field, '')) != str(updated_call.get(field, '')):
+                    modification_details.append(f"{field} updated.")
+            
+            if (original_call['Description'] or "").strip() != updated_call['Description'].strip():
+                modification_details.append("Description was updated.")
+
+            is_newly_resolved = updated_call["ResolutionStatus"] and not original_call["ResolutionStatus"]
+            resolved_epoch = original_call.get('ResolvedEpoch')
+            if is_newly_resolved:
+                updated_call["ResolutionTimestamp"] = now
+                resolved_epoch = now_epoch
+            else:
+                if not updated_call["ResolutionStatus"] and original_call["ResolutionStatus"]:
+                    updated_call["ResolvedBy"], updated_call["ResolutionTimestamp"] = "", ""
+                    resolved_epoch = None
+
+            # Answered state is optional in the payload; only stamp it on the transition
+            answered = updated_call.get("AnsweredStatus", original_call.get("AnsweredStatus"))
+            answered_by = updated_call.get("AnsweredBy", original_call.get("AnsweredBy"))
+            answered_ts, answered_epoch = original_call.get("AnsweredTimestamp"), original_call.get("AnsweredEpoch")
+            is_newly_answered = answered and not original_call.get("AnsweredStatus")
+            if is_newly_answered:
+                answered_ts, answered_epoch = now, now_epoch
+
+            updated_call['ModifiedBy'] = current_user
+            
+            # Only applies if nobody saved since original was read; the UPDATE also takes the write lock
+            cursor = self.conn.execute("""
                 UPDATE calls SET
                 InputMedium=?, Source=?, Caller=?, Location=?, Code=?, Description=?, Cancelled=?,
-                ResolutionStatus=?, ResolvedBy=?, ResolutionTimestamp=?, ModifiedBy=?
-                WHERE ReportID=?
+                ResolutionStatus=?, ResolvedBy=?, ResolutionTimestamp=?, ResolvedEpoch=?,
+                AnsweredStatus=?, AnsweredBy=?, AnsweredTimestamp=?, AnsweredEpoch=?, ModifiedBy=?,
+                Version=COALESCE(Version, 0) + 1
+                WHERE ReportID=? AND COALESCE(Version, 0)=?
             """, (
                 updated_call['InputMedium'], updated_call['Source'], updated_call['Caller'],
                 updated_call['Location'], updated_call['Code'], updated_call['Description'], updated_call.get('Cancelled', False),
                 updated_call['ResolutionStatus'], updated_call['ResolvedBy'], 
-                updated_call.get('ResolutionTimestamp', original_call['ResolutionTimestamp']),
-                updated_call['ModifiedBy'], report_id
+                updated_call.get('ResolutionTimestamp', original_call['ResolutionTimestamp']), resolved_epoch,
+                answered, answered_by, answered_ts, answered_epoch,
+                updated_call['ModifiedBy'], report_id, original_call.get('Version') or 0
             ))
+            if cursor.rowcount == 0:
+                current = self.get_call_by_id(report_id)
+                if not current: raise ValueError("Call not found.")
+                raise CallConflictError(report_id, original_call, dict(current)) # Rolls back; nothing was written
+            
+            # History rows and trend rollups commit together with the UPDATE, so neither records a change that didn't happen
+            rollups.record_change(self.conn, original_call, updated_call, now_epoch, answered_now=is_newly_answered)
+            if is_newly_resolved:
+                self._log_history(report_id, current_user, "Call Resolved", "; ".join([f"Resolved by: {updated_call['ResolvedBy']}"] + ([note] if note else [])))
+            if modification_details:
+                self._log_history(report_id, current_user, "Call Modified", "; ".join(modification_details + ([note] if note else [])))
         return True
 
+    def replay_journal(self, batch_size=50):
+        """
+        Pushes offline saves to the share, oldest first, until it fails again or the journal is empty.
+        Returns [(op, ReportID, call payload)] for what reached the share (e.g. for Discord pings).
+        Entries the share rejects for good (not a connectivity error) are parked as failed.
+        """
+        replayed = []
+        while self.journal and self.journal.pending_count:
+            for entry in self.journal.pending(batch_size):
+                entered = datetime.strptime(entry["EnteredAt"], "%Y-%m-%d %H:%M:%S")
+                try:
+                    if entry["Op"] == "add":
+                        report_id = self._insert_call(entry["Payload"], entry["User"], entered, entry["OfflineKey"], entry["ReportID"])
+                    else:
+                        report_id = entry["ReportID"] = self.journal.resolve(entry["ReportID"]) # Its add may have replayed earlier in this batch
+                        self._replay_modify(entry, entered)
+                except CallConflictError:
+                    return replayed # Saved again elsewhere mid-merge; merge afresh next attempt
+                except Exception as e:
+                    if offline_journal.is_connectivity_error(e) or "locked" in str(e).lower():
+                        return replayed # Still unreachable (or busy); next attempt resumes here
+                    self.journal.fail(entry, e)
+                    continue
+                self.journal.complete(entry, report_id)
+                replayed.append((entry["Op"], report_id, entry["Payload"]))
+        return replayed
+
+    def _replay_modify(self, entry, entered):
+        note = f"Entered offline at {entry['EnteredAt']}"
+        my_call, original = entry["Payload"], entry["Original"]
+        try:
+            return self._update_call(entry["ReportID"], dict(my_call), entry["User"], original, entered, note)
+        except CallConflictError as conflict:
+            # Saved on another laptop while this one was offline: the fields edited offline go on top of theirs
+            merged = merge_edits(my_call, conflict.original, conflict.current)
+            return self._update_call(entry["ReportID"], merged, entry["User"], conflict.current, entered, note)
+
+    def get_rollups(self, start_epoch, end_epoch=None, bucket_minutes=1, codes=None, by_code=False):
+        """Trend buckets from call_rollups (see rollups.query). Cost grows with minutes in range, not calls."""
+        end_epoch = end_epoch if end_epoch is not None else int(time.time()) + 60
+        return rollups.query(self.conn, start_epoch, end_epoch, bucket_minutes, codes, by_code)
+
+    @sqlite_retry()
+    def rebuild_rollups(self):
+        """Recomputes call_rollups from calls and the audit log. Returns the number of (minute, code) rows."""
+        return rollups.rebuild(self.conn, self._history_source())
+
+    @sqlite_retry()
+    def archive_closed_history(self, older_than_hours, batch_size=2000):
+        """
+        Moves the history of calls resolved more than older_than_hours ago (by ResolvedEpoch) into
+        the archive partition. Works in small batches so the write lock over SMB is only ever held
+        briefly. Returns the number of rows moved.
+        """
+        if not self.archive_filename: return 0
+        cutoff = int((datetime.now() - timedelta(hours=older_than_hours)).timestamp())
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (HistoryID INTEGER PRIMARY KEY)")
+        moved = 0
+        while True:
+            with self.conn:
+                begin_write(self.conn) # Take the write lock up front; no shared->reserved upgrade deadlock
+                self.conn.execute("DELETE FROM temp.archive_batch")
+                self.conn.execute("""
+                    INSERT INTO temp.archive_batch
+                    SELECT h.HistoryID FROM calls c JOIN main.call_history h ON h.CallID = c.ReportID
+                    WHERE c.ResolvedEpoch <= ? AND c.ResolutionStatus
+                    LIMIT ?
+                """, (cutoff, batch_size))
+                batch = self.conn.execute("SELECT COUNT(*) FROM temp.archive_batch").fetchone()[0]
+                if batch:
+                    self.conn.execute(f"""
+                        INSERT OR IGNORE INTO archive.call_history ({HISTORY_COLUMNS})
+                        SELECT {HISTORY_COLUMNS} FROM main.call_history WHERE HistoryID IN (SELECT HistoryID FROM temp.archive_batch)
+                    """)
+                    self.conn.execute("DELETE FROM main.call_history WHERE HistoryID IN (SELECT HistoryID FROM temp.archive_batch)")
+            moved += batch
+            if batch < batch_size: return moved
+
     def create_backup(self, backup_dir, max_backups):
         """Simple localized SQLite copy function."""
         if not os.path.exists(backup_dir): os.makedirs(backup_dir, exist_ok=True)
@@ -225,6 +808,7 @@ class DataManager:
             raise Exception(f"Failed to create backup: {e}")
 
     def close(self):
+        if self.journal: self.journal.close()
         if self.conn:
             self.conn.close()
             self.conn = None
\ No newline at end of file
@@ -1,8 +1,8 @@
 ﻿"""
 DISCORD_BOT.PY
 Companion bot for the HQ Dispatch System.
-Acts as a read-only notification pipeline, routing Medical/First Aid 
-alerts to Discord and silently logging field replies back to the local database.
+Acts as a read-only notification pipeline, routing alerts to Discord channels per the 
+[ROUTING] table (Medical/First Aid by default) and silently logging field replies back to the local database.
 """
 import discord
 from discord.ext import commands
@@ -13,20 +13,47 @@ import asyncio
 import configparser
 import os
 from datetime import datetime
+from collections import Counter, OrderedDict, deque
 import time
+from routing import RoutingTable
+from config_watcher import ConfigWatcher
+import instrumentation
+import audit_chain
+import metrics
+import shards
+from data_manager import OPEN_CALL_FILTER, begin_write as timed_begin_write
 
 # ==========================================
 # CONFIGURATION & SETUP
 # ==========================================
+CONFIG_PATH = 'config.ini'
 config = configparser.ConfigParser()
-config.read('config.ini')
+config.read(CONFIG_PATH)
 
 BOT_TOKEN = config.get('DISCORD', 'bot_token', fallback='')
-FIRST_AID_CHANNEL_ID = config.getint('DISCORD', 'first_aid_channel', fallback=0)
-DB_PATH = config.get('DATABASE', 'filename', fallback='dispatch.db')
+DB_PATH = shards.live_path(config) # Same event file the GUIs write (see [DATABASE] shard_by_event)
+HANDLE_CACHE_SIZE = config.getint('DISCORD', 'handle_cache_size', fallback=512)
+HANDLE_CACHE_TTL = config.getint('DISCORD', 'handle_cache_ttl_seconds', fallback=3600)
+# How often the open-call gauges on /metrics are re-read from the database (scrapes never query it)
+METRICS_DB_REFRESH = config.getint('DISCORD', 'metrics_db_refresh_seconds', fallback=15)
 
-# Strict routing: Bot will only broadcast these codes
-ALLOWED_DISCORD_CODES = ["Blue", "Yellow"]
+# Opt-in DB timing ([DIAGNOSTICS] enabled = true); summaries are printed to this console
+DB_TIMING = instrumentation.from_config(config, emit=lambda line: print(f"⏱️ [DB TIMING] {line}"))
+
+# Strict routing: Bot will only broadcast calls matching a [ROUTING] rule (Blue/Yellow to First Aid by default)
+ROUTING = RoutingTable.from_config(config)
+
+def _build_hot_settings(fresh):
+    """Runs on the config watcher thread. Raises ValueError to keep the current settings."""
+    if fresh.get('DISCORD', 'bot_token', fallback='') != BOT_TOKEN or shards.live_path(fresh) != DB_PATH:
+        print("⚠️ [CONFIG] bot_token / database filename changes only take effect after a restart.")
+    return RoutingTable.from_config(fresh), fresh.getint('DISCORD', 'handle_cache_size', fallback=512), fresh.getint('DISCORD', 'handle_cache_ttl_seconds', fallback=3600)
+
+def _apply_hot_settings(settings):
+    """Each setting is swapped in with a single assignment, so in-flight jobs see either old or new."""
+    global ROUTING
+    ROUTING, handle_cache.max_size, handle_cache.ttl_seconds = settings
+    print(f"🔁 [CONFIG] Reloaded config.ini: {ROUTING.rule_count} routing rule(s) active.")
 
 # Enable necessary intents (requires Message Content intent in Discord Dev Portal)
 intents = discord.Intents.default()
@@ -39,6 +66,7 @@ bot = commands.Bot(command_prefix="!", intents=intents)
 def get_db_connection():
     """Returns a dictionary-like cursor for SQLite with retry logic for SMB networks."""
     retries = 5
+    started = time.perf_counter()
     while retries > 0:
         try:
             # timeout=20.0 allows it to wait in line if the GUI is currently writing
@@ -50,12 +78,175 @@ def get_db_connection():
             conn.execute("PRAGMA busy_timeout=20000;")
             
             conn.row_factory = sqlite3.Row
+            DB_CONNECT_SECONDS.observe(time.perf_counter() - started)
             return conn
         except sqlite3.OperationalError:
             retries -= 1
             time.sleep(0.5)
+    DB_CONNECT_FAILURES.inc()
     raise Exception("Database Locked: Could not connect after multiple retries.")
 
+def begin_write(conn, op):
+    """Takes the write lock up front (BEGIN IMMEDIATE) so time spent queueing behind the GUIs is measured on its own."""
+    with DB_LOCK_WAIT.time(op):
+        timed_begin_write(conn) # Also counted as lock wait in the enclosing db_span
+
+def db_span(op):
+    """Times one block of bot DB work when [DIAGNOSTICS] is on; a shared no-op otherwise."""
+    return DB_TIMING.span(op) if DB_TIMING else instrumentation.NULL_SPAN
+
+def ensure_bot_tables():
+    """Creates the bot's own bookkeeping table: one row per Discord thread opened for a ticket."""
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS discord_threads (ThreadID TEXT PRIMARY KEY, ChannelID TEXT, ReportID TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_discord_threads_report ON discord_threads(ReportID)")
+        audit_chain.ensure_schema(conn) # Field replies join the same hash-chained audit log as the GUI
+    finally:
+        conn.close()
+
+def get_call_threads(conn, call_data):
+    """Returns [(channel_id, thread_id), ...] for a ticket, primary thread first."""
+    rows = conn.execute("SELECT ChannelID, ThreadID FROM discord_threads WHERE ReportID = ? ORDER BY rowid", (call_data['ReportID'],)).fetchall()
+    threads = [(int(r['ChannelID']), int(r['ThreadID'])) for r in rows]
+    if not threads and call_data['DiscordMessageID']:
+        threads = [(int(call_data['DiscordChannelID']), int(call_data['DiscordMessageID']))] # Tickets routed before multi-channel support
+    return threads
+
+# ==========================================
+# HEALTH METRICS (/metrics)
+# ==========================================
+# Everything here is in memory and only rendered on scrape; the open-call gauges are
+# refreshed from the database every METRICS_DB_REFRESH seconds by open_calls_refresher.
+API_CALLS = Counter()
+API_ERRORS = Counter()
+STARTED_AT = time.time()
+SYNC_PROGRESS = {"running": 0, "threads_total": 0, "threads_done": 0, "recovered": 0, "last_completed": None}
+OPEN_CALLS = {"count": None, "oldest_epoch": None, "refreshed": None}
+MESSAGES_RECENT = metrics.RecentRate(60)
+
+METRICS = []
+IPC_REQUESTS = metrics.Counter(METRICS, "dispatch_ipc_requests_total", "GUI pings and other requests handled by the IPC server.", ("endpoint", "status"))
+IPC_LATENCY = metrics.Histogram(METRICS, "dispatch_ipc_request_seconds", "Time to answer an IPC request.", ("endpoint",))
+metrics.Counter(METRICS, "dispatch_discord_api_calls_total", "Discord REST calls made, by call.", ("call",), function=lambda: dict(API_CALLS))
+metrics.Counter(METRICS, "dispatch_discord_api_errors_total", "Discord REST calls that failed, by call.", ("call",), function=lambda: dict(API_ERRORS))
+metrics.Gauge(METRICS, "dispatch_queue_depth", "Outgoing Discord jobs waiting, by kind.", ("kind",),
+              function=lambda: {"dispatch": work_queue.pending_dispatches, "update": work_queue.pending_updates})
+metrics.Counter(METRICS, "dispatch_queue_jobs_total", "Outgoing Discord jobs finished, by result.", ("result",),
+                function=lambda: {"completed": work_queue.completed, "failed": work_queue.failed, "coalesced": work_queue.coalesced,
+                                  "retried": work_queue.retried})
+DB_CONNECT_SECONDS = metrics.Histogram(METRICS, "dispatch_db_connect_seconds", "Time to open a database connection (including retries).")
+DB_CONNECT_FAILURES = metrics.Counter(METRICS, "dispatch_db_connect_failures_total", "Database connections given up on after all retries.")
+DB_LOCK_WAIT = metrics.Histogram(METRICS, "dispatch_db_lock_wait_seconds", "Time waiting for the database write lock, by operation.", ("op",))
+metrics.Gauge(METRICS, "dispatch_sync_running", "1 while offline message recovery is running.", function=lambda: SYNC_PROGRESS["running"])
+metrics.Gauge(METRICS, "dispatch_sync_threads", "Threads in the current/last offline sync, by state.", ("state",),
+              function=lambda: {"total": SYNC_PROGRESS["threads_total"], "done": SYNC_PROGRESS["threads_done"]})
+metrics.Counter(METRICS, "dispatch_sync_messages_recovered_total", "Messages recovered by offline sync.", function=lambda: SYNC_PROGRESS["recovered"])
+metrics.Gauge(METRICS, "dispatch_sync_last_completed_timestamp_seconds", "When offline sync last finished (Unix time).", function=lambda: SYNC_PROGRESS["last_completed"])
+MESSAGES_LOGGED = metrics.Counter(METRICS, "dispatch_messages_logged_total", "Field replies logged to call history.")
+metrics.Gauge(METRICS, "dispatch_messages_logged_last_minute", "Field replies logged in the last 60 seconds.", function=MESSAGES_RECENT.count)
+metrics.Gauge(METRICS, "dispatch_open_calls", "Open (unresolved, uncancelled) calls.", function=lambda: OPEN_CALLS["count"])
+metrics.Gauge(METRICS, "dispatch_oldest_open_call_age_seconds", "Age of the oldest open call.",
+              function=lambda: max(0.0, time.time() - OPEN_CALLS["oldest_epoch"]) if OPEN_CALLS["oldest_epoch"] else (0 if OPEN_CALLS["count"] == 0 else None))
+metrics.Gauge(METRICS, "dispatch_open_calls_refreshed_timestamp_seconds", "When the open-call gauges were last read from the database.", function=lambda: OPEN_CALLS["refreshed"])
+metrics.Gauge(METRICS, "dispatch_bot_uptime_seconds", "Seconds since the bot started.", function=lambda: time.time() - STARTED_AT)
+
+def read_open_calls():
+    """Runs in a worker thread: one aggregate over the open-call partial index."""
+    conn = get_db_connection()
+    try:
+        with db_span("bot.open_calls"):
+            row = conn.execute(f"SELECT COUNT(*), MIN(CreatedEpoch) FROM calls WHERE {OPEN_CALL_FILTER}").fetchone()
+    finally:
+        conn.close()
+    OPEN_CALLS.update(count=row[0], oldest_epoch=row[1], refreshed=time.time())
+
+async def open_calls_refresher():
+    while True:
+        try: await asyncio.to_thread(read_open_calls)
+        except Exception as e: print(f"⚠️ [METRICS] Could not refresh open-call gauges: {e}")
+        await asyncio.sleep(METRICS_DB_REFRESH)
+
+# ==========================================
+# DISCORD HANDLE CACHE
+# ==========================================
+
+async def discord_api(name, awaitable):
+    """Awaits a single Discord REST call and counts it (and any failure) by endpoint name."""
+    API_CALLS[name] += 1
+    try:
+        return await awaitable
+    except Exception:
+        API_ERRORS[name] += 1
+        raise
+
+class HandleCache:
+    """
+    LRU cache with a TTL for Discord channel, thread and parent-message objects,
+    keyed by the DiscordChannelID / DiscordMessageID stored in the calls table.
+    discord.py's own cache forgets archived threads and never keeps messages,
+    so without this every ticket update costs three or four REST lookups.
+    """
+    def __init__(self, max_size=512, ttl_seconds=3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict() # (kind, id) -> (expires_at, handle)
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def get(self, kind, object_id):
+        key = (kind, int(object_id))
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits[kind] += 1
+            return entry[1]
+        if entry: del self._entries[key]
+        self.misses[kind] += 1
+        return None
+
+    def put(self, kind, object_id, handle):
+        if handle is None: return
+        key = (kind, int(object_id))
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, handle)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, kind, object_id):
+        self._entries.pop((kind, int(object_id)), None)
+
+    def stats(self):
+        return {kind: {"hits": self.hits[kind], "misses": self.misses[kind]} for kind in ("channel", "thread", "message")}
+
+    def stats_line(self):
+        return ", ".join(f"{kind} {s['hits']} hit / {s['misses']} miss" for kind, s in self.stats().items()) + f" ({len(self._entries)} cached)"
+
+handle_cache = HandleCache(HANDLE_CACHE_SIZE, HANDLE_CACHE_TTL)
+
+async def resolve_channel(channel_id):
+    channel = handle_cache.get("channel", channel_id)
+    if not channel:
+        channel = bot.get_channel(channel_id) or await discord_api("fetch_channel", bot.fetch_channel(channel_id))
+        handle_cache.put("channel", channel_id, channel)
+    return channel
+
+async def resolve_thread(channel, thread_id):
+    thread = handle_cache.get("thread", thread_id)
+    if not thread:
+        thread = channel.get_thread(thread_id) or await discord_api("fetch_thread", channel.fetch_thread(thread_id))
+        handle_cache.put("thread", thread_id, thread)
+    return thread
+
+async def resolve_parent_message(channel, message_id):
+    """The thread shares its ID with the Dispatch Card message it was opened from."""
+    message = handle_cache.get("message", message_id)
+    if not message:
+        message = await discord_api("fetch_message", channel.fetch_message(message_id))
+        handle_cache.put("message", message_id, message)
+    return message
+
 # ==========================================
 # OFFLINE MESSAGE SYNCHRONIZATION
 # ==========================================
@@ -64,24 +255,30 @@ async def sync_offline_messages():
     print("🔄 [SYNC] Checking active threads for missed messages...")
     conn = get_db_connection()
     try:
-        # Fetch all unresolved and uncancelled calls that have a Discord Thread attached
-        cursor = conn.execute("SELECT ReportID, DiscordMessageID, DiscordChannelID FROM calls WHERE (ResolutionStatus = 0 OR ResolutionStatus IS NULL) AND (Cancelled = 0 OR Cancelled IS NULL) AND DiscordMessageID IS NOT NULL")
-        active_calls = cursor.fetchall()
+        # Fetch every Discord Thread attached to an unresolved and uncancelled call
+        open_filter = "(c.ResolutionStatus = 0 OR c.ResolutionStatus IS NULL) AND (c.Cancelled = 0 OR c.Cancelled IS NULL)"
+        with db_span("bot.sync_threads") as span:
+            cursor = conn.execute(f"""
+                SELECT c.ReportID, t.ThreadID, t.ChannelID FROM calls c JOIN discord_threads t ON t.ReportID = c.ReportID WHERE {open_filter}
+                UNION
+                SELECT c.ReportID, c.DiscordMessageID, c.DiscordChannelID FROM calls c WHERE {open_filter} AND c.DiscordMessageID IS NOT NULL
+            """)
+            active_threads = span.record_rows(cursor.fetchall())
+        SYNC_PROGRESS.update(running=1, threads_total=len(active_threads), threads_done=0)
 
-        for row in active_calls:
+        for row in active_threads:
             report_id = row['ReportID']
-            thread_id = int(row['DiscordMessageID'])
-            channel_id = int(row['DiscordChannelID'])
+            thread_id = int(row['ThreadID'])
+            channel_id = int(row['ChannelID'])
 
             try:
-                # Fetch the channel and thread from the Discord API
-                channel = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
-                thread = channel.get_thread(thread_id)
-                if not thread:
-                    try: thread = await channel.fetch_thread(thread_id)
-                    except: continue # Thread might be deleted or inaccessible
+                # Fetch the channel and thread (cached, falling back to the Discord API)
+                channel = await resolve_channel(channel_id)
+                try: thread = await resolve_thread(channel, thread_id)
+                except: continue # Thread might be deleted or inaccessible
 
                 # Read the last 50 messages in the thread (oldest to newest)
+                API_CALLS["thread.history"] += 1
                 async for message in thread.history(limit=50, oldest_first=True):
                     if message.author.bot: continue
 
@@ -92,19 +289,23 @@ async def sync_offline_messages():
                     user_tag = f"Discord: {message.author.display_name}"
 
                     # Deduplication check: Verify if this exact message is already in the database
-                    check_cursor = conn.execute("SELECT 1 FROM call_history WHERE CallID = ? AND User = ? AND Details = ?", (report_id, user_tag, content))
+                    with db_span("bot.sync_check"):
+                        already_logged = conn.execute("SELECT 1 FROM call_history WHERE CallID = ? AND User = ? AND Details = ?", (report_id, user_tag, content)).fetchone()
                     
-                    if not check_cursor.fetchone():
+                    if not already_logged:
                         # Use Discord's official timestamp so the timeline remains chronologically accurate
                         original_time = message.created_at.strftime("%Y-%m-%d %H:%M:%S")
                         
-                        conn.execute("INSERT INTO call_history (CallID, Timestamp, User, Action, Details) VALUES (?, ?, ?, ?, ?)",
-                                     (report_id, original_time, user_tag, "Thread Message", content))
-                        conn.commit()
+                        with db_span("bot.sync_insert"), conn:
+                            begin_write(conn, "sync_insert")
+                            audit_chain.append_history(conn, report_id, original_time, user_tag, "Thread Message", content)
+                        SYNC_PROGRESS["recovered"] += 1
                         print(f"🔄 [SYNCED] Recovered missed message from {message.author.display_name} for {report_id}.")
 
             except Exception as e:
                 print(f"⚠️ [SYNC ERROR] Failed to sync {report_id}: {e}")
+            finally:
+                SYNC_PROGRESS["threads_done"] += 1
                 
     except sqlite3.OperationalError as e:
         print(f"🚨 [CRITICAL DB ERROR] Could not sync offline messages: {e}")
@@ -112,7 +313,9 @@ async def sync_offline_messages():
         print(f"🚨 [UNEXPECTED ERROR] {e}")
     finally:
         conn.close()
+        SYNC_PROGRESS.update(running=0, last_completed=time.time())
     print("✅ [SYNC] Offline message recovery complete.")
+    print(f"📦 [CACHE] {handle_cache.stats_line()}")
 
 # ==========================================
 # DISCORD EVENTS
@@ -127,7 +330,7 @@ async def on_ready():
     # Trigger the offline message recovery
     await sync_offline_messages()
     
-    print("🚨 BOT IS FULLY ONLINE AND ROUTING EXCLUSIVELY TO FIRST AID.")
+    print(f"🚨 BOT IS FULLY ONLINE AND ROUTING VIA {ROUTING.rule_count} RULE(S).")
 
 @bot.event
 async def on_message(message):
@@ -140,8 +343,9 @@ async def on_message(message):
     conn = get_db_connection()
     try:
         # Check if this thread belongs to an active dispatch ticket
-        cursor = conn.execute("SELECT ReportID FROM calls WHERE DiscordMessageID = ?", (str(message.channel.id),))
-        row = cursor.fetchone()
+        thread_id = str(message.channel.id)
+        with db_span("bot.thread_lookup") as span:
+            row = span.record_rows(conn.execute("SELECT ReportID FROM calls WHERE DiscordMessageID = ? UNION ALL SELECT ReportID FROM discord_threads WHERE ThreadID = ? LIMIT 1", (thread_id, thread_id)).fetchone())
         
         if row:
             report_id = row['ReportID']
@@ -152,15 +356,227 @@ async def on_message(message):
             user_tag = f"Discord: {message.author.display_name}"
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
-            conn.execute("INSERT INTO call_history (CallID, Timestamp, User, Action, Details) VALUES (?, ?, ?, ?, ?)",
-                         (report_id, timestamp, user_tag, "Thread Message", content))
-            conn.commit()
+            with db_span("bot.log_message"), conn:
+                begin_write(conn, "log_message")
+                audit_chain.append_history(conn, report_id, timestamp, user_tag, "Thread Message", content)
+            MESSAGES_LOGGED.inc()
+            MESSAGES_RECENT.mark()
             print(f"📥 [LOGGED] Message from {message.author.display_name} saved to ticket {report_id}")
     except Exception as e:
         print(f"⚠️ [DB ERROR] Failed to log Discord message: {e}")
     finally:
         conn.close()
 
+# ==========================================
+# OUTGOING DISCORD WORK QUEUE
+# ==========================================
+class DiscordWorkQueue:
+    """
+    Funnels every outgoing Discord job through one worker so the bot never bursts the rate limit.
+    New dispatches always jump ahead of updates, and repeated updates for the same ticket
+    collapse into one pending job. Jobs only carry the ReportID; the worker re-reads the row
+    when it runs, so the collapsed job always posts the newest state.
+    A failed job is put back after a growing delay; after JOB_ATTEMPTS tries it is dropped
+    and listed in recent_failures, which /queue shows.
+    """
+    JOB_ATTEMPTS = 4
+    RETRY_DELAYS = (5, 30, 120) # Seconds before the 2nd, 3rd and 4th try
+
+    def __init__(self):
+        self._dispatches = deque()
+        self._updates = OrderedDict()
+        self._wakeup = None # Created lazily so it binds to the running event loop
+        self._attempts = {} # (kind, report_id) -> tries that failed so far
+        self.recent_failures = deque(maxlen=20) # Jobs given up on, newest last
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    def __len__(self):
+        return len(self._dispatches) + len(self._updates)
+
+    @property
+    def pending_dispatches(self): return len(self._dispatches)
+
+    @property
+    def pending_updates(self): return len(self._updates)
+
+    def _notify(self):
+        if self._wakeup is None: self._wakeup = asyncio.Event()
+        self._wakeup.set()
+
+    def put_dispatch(self, report_id):
+        if report_id in self._dispatches:
+            self.coalesced += 1
+            return
+        # A pending update is redundant: the dispatch card is built from the latest row anyway
+        if self._updates.pop(report_id, None):
+            self.coalesced += 1
+        self._dispatches.append(report_id)
+        self._notify()
+
+    def put_update(self, report_id):
+        if report_id in self._updates or report_id in self._dispatches:
+            self.coalesced += 1
+            return
+        self._updates[report_id] = True
+        self._notify()
+
+    async def get(self):
+        """Waits for the next job. Returns a (kind, report_id) tuple."""
+        while not len(self):
+            if self._wakeup is None: self._wakeup = asyncio.Event()
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        if self._dispatches:
+            return "dispatch", self._dispatches.popleft()
+        report_id, _ = self._updates.popitem(last=False)
+        return "update", report_id
+
+    def succeeded(self, kind, report_id):
+        self._attempts.pop((kind, report_id), None)
+        self.completed += 1
+
+    def retry_or_drop(self, kind, report_id, error):
+        """Re-queues a failed job after its backoff delay. Returns False once it has used all its tries."""
+        tries = self._attempts.get((kind, report_id), 0) + 1
+        if tries >= self.JOB_ATTEMPTS:
+            self._attempts.pop((kind, report_id), None)
+            self.failed += 1
+            self.recent_failures.append({"kind": kind, "report_id": report_id, "tries": tries, "error": str(error)[:200],
+                                         "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+            return False
+        self._attempts[(kind, report_id)] = tries
+        self.retried += 1
+        put = self.put_dispatch if kind == "dispatch" else self.put_update
+        asyncio.get_running_loop().call_later(self.RETRY_DELAYS[tries - 1], put, report_id)
+        return True
+
+work_queue = DiscordWorkQueue()
+
+# Cards and threads a failed dispatch already posted, by ReportID then channel, so its retry picks up where it stopped
+dispatch_progress = {}
+
+def store_thread(conn, report_id, channel_id, thread_id):
+    """Records one routed channel's thread the moment it exists; the ticket's first becomes its primary thread."""
+    with db_span("bot.store_threads"), conn:
+        begin_write(conn, "store_threads")
+        conn.execute("UPDATE calls SET DiscordMessageID = ?, DiscordChannelID = ? WHERE ReportID = ? AND COALESCE(DiscordMessageID, '') = ''",
+                     (str(thread_id), str(channel_id), report_id))
+        conn.execute("INSERT OR REPLACE INTO discord_threads (ThreadID, ChannelID, ReportID) VALUES (?, ?, ?)",
+                     (str(thread_id), str(channel_id), report_id))
+
+async def process_dispatch(report_id):
+    """
+    Posts the Dispatch Card for a new call in every routed channel and opens a thread under each.
+    Channels that already have the ticket's thread are skipped, and a card or thread posted by a
+    failed try is reused, so a retried dispatch never posts the same card twice.
+    """
+    conn = get_db_connection()
+    try:
+        with db_span("bot.load_call") as span:
+            call_data = span.record_rows(conn.execute("SELECT * FROM calls WHERE ReportID = ?", (report_id,)).fetchone())
+            done = {channel_id for channel_id, _ in get_call_threads(conn, call_data)} if call_data else set()
+        if not call_data: return
+        
+        # Verify a routing rule matches before posting anything
+        channel_ids = ROUTING.channels_for(call_data['Code'], call_data['Source'], call_data['InputMedium'])
+        if not channel_ids:
+            print(f"⏭️ [IGNORED] {report_id}: No routing rule matches code {call_data['Code']}.")
+            return
+        pending = [channel_id for channel_id in channel_ids if channel_id not in done]
+        if not pending:
+            dispatch_progress.pop(report_id, None)
+            print(f"⏭️ [IGNORED] {report_id} already has a Discord thread.")
+            return
+            
+        embed = create_dispatch_embed(dict(call_data))
+        thread_name = f"Ticket {report_id} - {call_data['Location'][:50]}"
+        progress = dispatch_progress.setdefault(report_id, {})
+        failed = 0
+        for channel_id in pending:
+            posted = progress.setdefault(channel_id, {})
+            try:
+                if "message" not in posted:
+                    channel = await resolve_channel(channel_id)
+                    posted["message"] = await discord_api("channel.send", channel.send(embed=embed))
+                message = posted["message"]
+                
+                # Create dedicated thread
+                if "thread" not in posted:
+                    posted["thread"] = await discord_api("message.create_thread", message.create_thread(name=thread_name, auto_archive_duration=1440))
+                thread = posted["thread"]
+                handle_cache.put("thread", thread.id, thread)
+                handle_cache.put("message", thread.id, message)
+                store_thread(conn, report_id, channel_id, thread.id)
+                del progress[channel_id]
+            except Exception as e:
+                failed += 1
+                print(f"⚠️ [ROUTING] Could not post {report_id} to channel {channel_id}: {e}")
+        if failed: raise RuntimeError(f"{failed} of {len(pending)} routed channel(s) did not take the dispatch.")
+        dispatch_progress.pop(report_id, None)
+        print(f"📤 [DISPATCHED] {report_id} routed to {len(done) + len(pending)} Discord channel(s).")
+    finally:
+        conn.close()
+
+async def process_update(report_id):
+    """Re-colors the parent Dispatch Cards and posts the update (or closure) inside every thread."""
+    conn = get_db_connection()
+    try:
+        with db_span("bot.load_call") as span:
+            call_data = span.record_rows(conn.execute("SELECT * FROM calls WHERE ReportID = ?", (report_id,)).fetchone())
+            threads = get_call_threads(conn, call_data) if call_data else []
+    finally:
+        conn.close()
+        
+    if not threads:
+        print(f"⏭️ [IGNORED] {report_id}: No active Discord thread for this call.")
+        return
+        
+    is_closed = str(call_data['ResolutionStatus']).lower() in ('1', 'true') or str(call_data['Cancelled']).lower() in ('1', 'true')
+    updated_embed = create_dispatch_embed(dict(call_data), is_closed=is_closed, is_update=not is_closed)
+    
+    for channel_id, thread_id in threads:
+        channel = await resolve_channel(channel_id)
+        thread = await resolve_thread(channel, thread_id)
+        if not thread: raise RuntimeError("Thread not found.")
+        
+        # Fetch and edit the original parent message to change the color visually in the main channel
+        try:
+            original_message = await resolve_parent_message(channel, thread_id)
+            edited = await discord_api("message.edit", original_message.edit(embed=updated_embed))
+            handle_cache.put("message", thread_id, edited)
+        except discord.NotFound:
+            handle_cache.invalidate("message", thread_id)
+            print(f"⚠️ Could not find original parent message for {report_id} to edit.")
+
+        # Manage the internal thread notifications
+        if is_closed:
+            embed = discord.Embed(title=f"✅ TICKET {report_id} CLOSED", color=discord.Color.green())
+            await discord_api("thread.send", thread.send(embed=embed))
+            handle_cache.put("thread", thread_id, await discord_api("thread.edit", thread.edit(archived=True, locked=True)))
+        else:
+            embed = discord.Embed(title=f"🔄 UPDATE: TICKET {report_id}", description=call_data['Description'], color=discord.Color.orange())
+            await discord_api("thread.send", thread.send(embed=embed))
+    print(f"📝 [UPDATED] {report_id} pushed to {len(threads)} Discord thread(s).")
+
+async def discord_worker():
+    """Drains the work queue one job at a time for the lifetime of the bot."""
+    await bot.wait_until_ready()
+    while True:
+        kind, report_id = await work_queue.get()
+        try:
+            if kind == "dispatch": await process_dispatch(report_id)
+            else: await process_update(report_id)
+            work_queue.succeeded(kind, report_id)
+            if work_queue.completed % 25 == 0: print(f"📦 [CACHE] {handle_cache.stats_line()}")
+        except Exception as e:
+            if work_queue.retry_or_drop(kind, report_id, e):
+                print(f"⚠️ [QUEUE ERROR] {kind.capitalize()} for {report_id} failed, will retry: {e}")
+            else:
+                print(f"⚠️ [QUEUE ERROR] {kind.capitalize()} for {report_id} gave up after {work_queue.JOB_ATTEMPTS} tries: {e}")
+
 # ==========================================
 # IPC WEB SERVER (RECEIVES PINGS FROM GUI)
 # ==========================================
@@ -190,93 +606,72 @@ def create_dispatch_embed(call_data, is_closed=False, is_update=False):
     return embed
 
 async def handle_dispatch(request):
-    """Triggered by the GUI when a new call is added."""
+    """Triggered by the GUI when a new call is added. Queues the post and returns immediately."""
     data = await request.json()
     report_id = data.get('report_id')
+    if not report_id: return web.Response(status=400, text="Missing report_id.")
     
-    conn = get_db_connection()
-    try:
-        cursor = conn.execute("SELECT * FROM calls WHERE ReportID = ?", (report_id,))
-        call_data = cursor.fetchone()
-        
-        # Verify it's a valid Medical code before routing
-        if not call_data or call_data['Code'] not in ALLOWED_DISCORD_CODES:
-            return web.Response(text="Ignored: Code not in Allowed Discord Codes.")
-            
-        channel = bot.get_channel(FIRST_AID_CHANNEL_ID)
-        if not channel: return web.Response(status=500, text="First Aid channel not found.")
-        
-        embed = create_dispatch_embed(dict(call_data))
-        message = await channel.send(embed=embed)
-        
-        # Create dedicated thread
-        thread_name = f"Ticket {report_id} - {call_data['Location'][:50]}"
-        thread = await message.create_thread(name=thread_name, auto_archive_duration=1440)
-        
-        # Save Thread ID back to local database
-        conn.execute("UPDATE calls SET DiscordMessageID = ?, DiscordChannelID = ? WHERE ReportID = ?",
-                     (str(thread.id), str(channel.id), report_id))
-        conn.commit()
-        
-        return web.Response(text="Dispatch successfully routed to Discord.")
-    except Exception as e:
-        print(f"⚠️ IPC Error (Dispatch): {e}")
-        return web.Response(status=500, text=str(e))
-    finally:
-        conn.close()
+    # Newer GUIs send the call's routing fields, so unrouted codes never cost a DB round trip
+    if 'code' in data and not ROUTING.channels_for(data['code'], data.get('source'), data.get('medium')):
+        return web.Response(text="Ignored: No routing rule matches this call.")
+    
+    work_queue.put_dispatch(report_id)
+    return web.Response(status=202, text=f"Dispatch queued ({len(work_queue)} pending).")
 
 async def handle_update(request):
-    """Triggered by the GUI when an existing call is modified."""
+    """Triggered by the GUI when an existing call is modified. Rapid re-saves collapse into one job."""
     data = await request.json()
     report_id = data.get('report_id')
+    if not report_id: return web.Response(status=400, text="Missing report_id.")
     
-    conn = get_db_connection()
-    try:
-        cursor = conn.execute("SELECT * FROM calls WHERE ReportID = ?", (report_id,))
-        call_data = cursor.fetchone()
-        
-        if not call_data or not call_data['DiscordMessageID']:
-            return web.Response(text="Ignored: No active Discord thread for this call.")
-            
-        thread_id = int(call_data['DiscordMessageID'])
-        channel_id = int(call_data['DiscordChannelID'])
-        
-        channel = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
-        thread = channel.get_thread(thread_id) or await channel.fetch_thread(thread_id)
-        
-        if not thread: return web.Response(status=404, text="Thread not found.")
-        
-        is_closed = str(call_data['ResolutionStatus']).lower() in ('1', 'true', '1') or str(call_data['Cancelled']).lower() in ('1', 'true', '1')
-        
-        # Fetch and edit the original parent message to change the color visually in the main channel
-        try:
-            original_message = await channel.fetch_message(thread_id)
-            updated_embed = create_dispatch_embed(dict(call_data), is_closed=is_closed, is_update=not is_closed)
-            await original_message.edit(embed=updated_embed)
-        except discord.NotFound:
-            print(f"⚠️ Could not find original parent message for {report_id} to edit.")
+    work_queue.put_update(report_id)
+    return web.Response(status=202, text=f"Update queued ({len(work_queue)} pending).")
 
-        # Manage the internal thread notifications
-        if is_closed:
-            embed = discord.Embed(title=f"✅ TICKET {report_id} CLOSED", color=discord.Color.green())
-            await thread.send(embed=embed)
-            await thread.edit(archived=True, locked=True)
-        else:
-            embed = discord.Embed(title=f"🔄 UPDATE: TICKET {report_id}", description=call_data['Description'], color=discord.Color.orange())
-            await thread.send(embed=embed)
-            
-        return web.Response(text="Update successfully pushed to Discord thread.")
-    except Exception as e:
-        print(f"⚠️ IPC Error (Update): {e}")
-        return web.Response(status=500, text=str(e))
+async def handle_queue_stats(request):
+    """Exposes queue depth and Discord API usage so dispatchers can see if the bot is falling behind."""
+    return web.json_response({
+        "queue_depth": len(work_queue),
+        "pending_dispatches": work_queue.pending_dispatches,
+        "pending_updates": work_queue.pending_updates,
+        "coalesced_updates": work_queue.coalesced,
+        "completed_jobs": work_queue.completed,
+        "retried_jobs": work_queue.retried,
+        "failed_jobs": work_queue.failed,
+        "recent_failures": list(work_queue.recent_failures),
+        "api_calls": dict(API_CALLS),
+        "api_errors": dict(API_ERRORS),
+        "handle_cache": handle_cache.stats(),
+    })
+
+async def handle_metrics(request):
+    """Prometheus text format; rendered from in-memory values, never a DB query per scrape."""
+    return web.Response(body=metrics.render(METRICS).encode("utf-8"), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+@web.middleware
+async def ipc_metrics_middleware(request, handler):
+    """Counts and times every IPC request by route (unknown paths share one label)."""
+    resource = request.match_info.route.resource
+    endpoint = resource.canonical if resource else "unmatched"
+    status = 500
+    started = time.perf_counter()
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
     finally:
-        conn.close()
+        IPC_REQUESTS.inc(endpoint, str(status))
+        IPC_LATENCY.observe(time.perf_counter() - started, endpoint)
 
 async def start_ipc_server():
     """Starts the local web server to listen for GUI pings."""
-    app = web.Application()
+    app = web.Application(middlewares=[ipc_metrics_middleware])
     app.router.add_post('/dispatch', handle_dispatch)
     app.router.add_post('/update', handle_update)
+    app.router.add_get('/queue', handle_queue_stats)
+    app.router.add_get('/metrics', handle_metrics)
     
     runner = web.AppRunner(app)
     await runner.setup()
@@ -288,8 +683,13 @@ async def start_ipc_server():
 # MAIN EXECUTION
 # ==========================================
 async def main():
+    ensure_bot_tables()
+    ConfigWatcher(CONFIG_PATH, _build_hot_settings, _apply_hot_settings, preserve_case=False,
+                  on_error=lambda e: print(f"⚠️ [CONFIG] Kept previous settings, config.ini is invalid: {e}")).start()
     async with bot:
         bot.loop.create_task(start_ipc_server())
+        bot.loop.create_task(discord_worker())
+        bot.loop.create_task(open_calls_refresher())
         await bot.start(BOT_TOKEN)
 
 if __name__ == "__main__":
@@ -7,16 +7,17 @@ Features an expanded Admin-only live operational dashboard.
 """
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog, scrolledtext
-from data_manager import DataManager
+from config_watcher import AppSettings, ConfigWatcher
 from datetime import datetime
 import os
 import sys
 import logging
 import configparser
-import csv
 import json
-import urllib.request
-from concurrent.futures import ThreadPoolExecutor
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from startup import load_snapshot, save_snapshot
 
 # Modern UI Theme
 try:
@@ -48,23 +49,124 @@ class ToolTip:
         if self.tooltip: self.tooltip.destroy()
         self.tooltip = None
 
-class ScrolledTextHandler(logging.Handler):
-    """Routes standard Python logging directly into the Tkinter UI window."""
-    def __init__(self, text_widget):
+class SuggestionList:
+    """
+    Drop-down of suggestions under an Entry, refilled from source(text) on every keystroke.
+    Up/Down pick a suggestion, Tab or Return takes it (Tab then moves on as usual), Escape closes it.
+    """
+    IGNORED_KEYS = {"Up", "Down", "Return", "KP_Enter", "Tab", "Escape", "Shift_L", "Shift_R", "Control_L", "Control_R", "Alt_L", "Alt_R"}
+
+    def __init__(self, entry, variable, source, max_items=8):
+        self.entry = entry
+        self.variable = variable
+        self.source = source
+        self.max_items = max_items
+        self.popup = None
+        self.listbox = None
+        entry.bind("<KeyRelease>", self.on_key_release, add="+")
+        entry.bind("<Down>", lambda e: self.move(1), add="+")
+        entry.bind("<Up>", lambda e: self.move(-1), add="+")
+        entry.bind("<Tab>", self.accept, add="+")
+        entry.bind("<Return>", self.accept, add="+")
+        entry.bind("<Escape>", lambda e: self.hide(), add="+")
+        entry.bind("<FocusOut>", lambda e: entry.after(150, self._hide_if_unfocused), add="+")
+
+    def on_key_release(self, event):
+        if event.keysym in self.IGNORED_KEYS: return
+        suggestions = self.source(self.variable.get())
+        if suggestions: self.show(suggestions)
+        else: self.hide()
+
+    def show(self, suggestions):
+        if not self.popup:
+            self.popup = tk.Toplevel(self.entry)
+            self.popup.wm_overrideredirect(True)
+            colors = {"background": "#1e1e1e", "foreground": "white"} if HAS_SV_TTK else {}
+            self.listbox = tk.Listbox(self.popup, activestyle="none", exportselection=False, borderwidth=1, relief="solid", **colors)
+            self.listbox.pack(fill="both", expand=True)
+            self.listbox.bind("<ButtonRelease-1>", self._on_click)
+        self.listbox.delete(0, tk.END)
+        for value in suggestions[:self.max_items]: self.listbox.insert(tk.END, value)
+        self.listbox.config(height=min(len(suggestions), self.max_items))
+        self.popup.wm_geometry(f"{self.entry.winfo_width()}x{self.listbox.winfo_reqheight()}+{self.entry.winfo_rootx()}+{self.entry.winfo_rooty() + self.entry.winfo_height()}")
+        self.popup.lift()
+
+    def hide(self):
+        if self.popup: self.popup.destroy()
+        self.popup = None
+        self.listbox = None
+
+    def move(self, step):
+        if not self.popup: return
+        current = self.listbox.curselection()
+        index = max(0, min(self.listbox.size() - 1, (current[0] + step) if current else (0 if step > 0 else self.listbox.size() - 1)))
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(index)
+        self.listbox.see(index)
+        return "break"
+
+    def accept(self, event=None):
+        if not self.popup or not self.listbox.curselection(): return
+        self.variable.set(self.listbox.get(self.listbox.curselection()[0]))
+        self.entry.icursor(tk.END)
+        self.hide()
+        if event is not None and event.keysym in ("Return", "KP_Enter"): return "break"
+
+    def _on_click(self, event):
+        self.accept()
+        self.entry.focus_set()
+
+    def _hide_if_unfocused(self):
+        if self.popup and self.entry.focus_get() not in (self.entry, self.listbox): self.hide()
+
+class UILogBuffer(logging.Handler):
+    """
+    Collects log lines for the UI log area from any thread. emit() never touches Tk: it only
+    appends to a bounded deque, which the GUI drains in batches from one after() tick.
+    """
+    def __init__(self, max_lines=1000):
         super().__init__()
-        self.text_widget = text_widget
+        self.pending = deque(maxlen=max_lines) # Lines past the cap would be trimmed off the widget anyway
     def emit(self, record):
-        msg = self.format(record)
-        self.text_widget.configure(state="normal")
-        self.text_widget.insert(tk.END, msg + "\n")
-        self.text_widget.configure(state="disabled")
-        self.text_widget.see(tk.END)
+        try: self.pending.append(self.format(record))
+        except Exception: self.handleError(record)
+    def drain(self):
+        lines = []
+        while self.pending:
+            try: lines.append(self.pending.popleft())
+            except IndexError: break
+        return lines
+
+def _report_id_sort_key(report_id):
+    """DC26-0042 sorts by number (DC26-9999 before DC26-10000); provisional DC26-P0001 IDs after the real ones."""
+    prefix, _, number = str(report_id).partition("-")
+    provisional = number.startswith("P")
+    digits = number[1:] if provisional else number
+    return (prefix, provisional, int(digits) if digits.isdigit() else 0, number)
+
+# Main table columns in display order: field -> (heading, width)
+CALL_TABLE_COLUMNS = {
+    "ReportID": ("Call ID", 80), "CallDate": ("Date", 80), "CallTime": ("Time", 60), "TimeOpen": ("Time Open", 80),
+    "ResolutionStatus": ("Resolved?", 70), "ResolutionTimestamp": ("Resolved At", 120), "ResolvedBy": ("Resolved By", 100),
+    "Cancelled": ("Cancelled?", 70),
+    "InputMedium": ("Medium", 100), "Source": ("Source", 100), "Caller": ("Caller", 100),
+    "Location": ("Location", 120), "Code": ("Code", 150), "Description": ("Description", 300),
+    "CreatedBy": ("Created By", 100)
+}
+# What the table refresh fetches: the shown columns plus the SLA timer's epoch (TimeOpen is computed)
+CALL_TABLE_QUERY_COLUMNS = [col for col in CALL_TABLE_COLUMNS if col != "TimeOpen"] + ["CreatedEpoch"]
 
 class DispatchCallApp:
-    def __init__(self, root, logger, data_manager):
+    def __init__(self, root, logger, data_manager, startup_timer=None):
         self.root = root
         self.logger = logger
-        self.manager = data_manager
+        self.startup_timer = startup_timer
+        # main.py hands over a Future while the database is still opening over SMB; until it resolves
+        # the table shows the local snapshot and every DB action waits
+        self.manager = None if isinstance(data_manager, Future) else data_manager
+        self._manager_future = data_manager if isinstance(data_manager, Future) else None
+        self.showing_snapshot = False
+        self._last_snapshot_save = 0.0
         
         # Database executor prevents UI freezing during local network writes
         self.executor = ThreadPoolExecutor(max_workers=1)
@@ -75,11 +177,20 @@ class DispatchCallApp:
         self.is_first_load = True
         self.last_update_count = -1
         self.last_redraw_time = datetime.now()
+        self.passdown_window = None
+        # Main table bookkeeping, so refreshes only touch Treeview rows that actually changed
+        self._table_row_cache = {}
+        self._table_item_ids = {}
+        self._table_shown = {}
+        self._table_order = []
+        self._table_calls = None # Last fetched result set; sorting and search re-render it without a query
+        self.history_viewers = {} # ReportID -> open history window, all tailed by one shared poll
         
         # Triggers SLA Overrides
         self.high_priority_codes = ["White / Mayday", "Silver", "Black", "Red", "Blue", "Adam"]
         
-        self.root.title("HQ Dispatch Center V5.4")
+        self.base_title = "HQ Dispatch Center V5.4"
+        self.root.title(self.base_title)
         self.root.resizable(True, True)
         
         if HAS_SV_TTK:
@@ -93,14 +204,18 @@ class DispatchCallApp:
         self.current_user_role = None
         self.is_dirty = False
         self.is_loading_data = False
+        self.loaded_call = None # Row (with Version) the dispatcher is editing, so saves can detect conflicts
         
+        self._mark_startup("gui_init")
         if not self.ensure_user_logged_in():
             self.root.destroy()
             return
+        self._mark_startup("login")
             
         self._build_main_ui()
         self.apply_theme_colors() 
         self.root.deiconify()
+        self._mark_startup("show_window")
 
     # ==========================================
     # HARDWARE & THEME CONTROLS
@@ -143,8 +258,7 @@ class DispatchCallApp:
     # UI CONSTRUCTION
     # ==========================================
     def _build_main_ui(self):
-        self.sort_column = "ReportID"
-        self.sort_direction = "ASC"
+        self.sort_keys = [("ReportID", False)] # (column, descending), most significant first
         self.input_medium_var = tk.StringVar(value="Radio")
         self.source_var = tk.StringVar()
         self.caller_var = tk.StringVar()
@@ -171,36 +285,138 @@ class DispatchCallApp:
         self._setup_keyboard_shortcuts()
         self._setup_dirty_tracking()
         
-        self.update_table()
-        self.start_auto_refresh()
+        self._mark_startup("build_ui")
+        self.start_config_watcher()
+        
+        if self.manager: self._on_manager_ready()
+        else:
+            self._show_cached_snapshot()
+            self._manager_future.add_done_callback(lambda future: self.root.after(0, self._on_manager_opened, future))
         
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.root.bind("<Button-1>", self._on_click_outside)
 
+    # ==========================================
+    # COLD START
+    # ==========================================
+    def _mark_startup(self, phase):
+        if self.startup_timer: self.startup_timer.mark(phase)
+
+    def _show_cached_snapshot(self):
+        """Paints the last table this laptop saw, clearly marked stale, while the database opens."""
+        self._set_ui_busy(True)
+        self.status_var.set("Connecting to the dispatch database...")
+        import shards # Lazy, like every DB-side module: main.py is importing data_manager on the DBOpen thread meanwhile
+        snapshot = load_snapshot(self.snapshot_file, shards.live_path(self.config))
+        if not snapshot or snapshot['active_only'] != self.active_only_var.get(): return
+        
+        self.showing_snapshot = True
+        self._on_update_table_data_fetched(True, snapshot['rows'], 'preserve', None, False, None, None, False)
+        saved_at = datetime.fromtimestamp(snapshot['saved_epoch']).strftime('%H:%M')
+        self.root.title(f"{self.base_title}  [CACHED VIEW FROM {saved_at} - CONNECTING...]")
+        self.status_var.set(f"Showing cached calls from {saved_at} (stale). Connecting to the dispatch database...")
+        self._mark_startup("snapshot_render")
+
+    def _on_manager_opened(self, future):
+        try:
+            self.manager = future.result()
+        except Exception as e:
+            self.logger.critical(f"Could not open the dispatch database: {e}", exc_info=True)
+            messagebox.showerror("Database Error", f"Could not open the dispatch database:\n{e}")
+            self.root.destroy()
+            return
+        self._mark_startup("db_open_wait")
+        self._on_manager_ready()
+
+    def _on_manager_ready(self):
+        self.update_table()
+        self.start_auto_refresh()
+        self._dashboard_refresh_task()
+        self.start_history_archival()
+        self.start_audit_checkpoints()
+        if self.manager.journal:
+            self._refresh_offline_status() # Saves left over from the last session replay too
+            self.start_offline_replay()
+        if self.config.getboolean('WALLBOARD', 'publish', fallback=True):
+            import wallboard
+            self.wallboard_publisher = wallboard.Publisher(wallboard.snapshot_path(self.config), self.config.getint('WALLBOARD', 'publish_seconds', fallback=10))
+            self.start_wallboard_publishing()
+
+    def _save_snapshot_throttled(self, all_calls):
+        """Keeps the local cold-start snapshot at most ~30s old, written off the UI thread."""
+        if time.monotonic() - self._last_snapshot_save < 30: return
+        self._last_snapshot_save = time.monotonic()
+        rows = [dict(row) for row in all_calls]
+        self.ipc_executor.submit(self._write_snapshot, self.manager.db_filename, self.active_only_var.get(), rows)
+
+    def _write_snapshot(self, db_file, active_only, rows):
+        try: save_snapshot(self.snapshot_file, db_file, active_only, rows)
+        except Exception as e: self.logger.warning(f"Could not save the startup snapshot: {e}")
+
     def load_config(self):
         self.config.read('config.ini')
-        self.auto_refresh_interval_ms = self.config.getint('APPLICATION', 'auto_refresh_seconds', fallback=10) * 1000
         self.auto_scroll_var = tk.BooleanVar(value=self.config.getboolean('APPLICATION', 'auto_scroll_to_latest', fallback=True))
+        self.snapshot_file = self.config.get('APPLICATION', 'snapshot_file', fallback=os.path.join('cache', 'last_view.json'))
+        self._apply_settings(AppSettings(self.config, logger=self.logger))
+
+    def _apply_settings(self, settings):
+        """Swaps in a new config snapshot. Runs on the Tk thread, both at boot and on hot reload."""
+        self.settings = settings
+        self.auto_refresh_interval_ms = settings.auto_refresh_seconds * 1000
+        self.desc_to_code_map = settings.desc_to_code_map
+        self.source_options = settings.source_options
+        self.users = settings.users
+        # Same compiled table the Discord Bot uses, so unrouted codes never trigger an IPC ping
+        self.routing = settings.routing
+
+    def start_config_watcher(self):
+        interval = self.config.getfloat('APPLICATION', 'config_check_seconds', fallback=3)
+        self.config_watcher = ConfigWatcher(
+            'config.ini', lambda cfg: AppSettings(cfg, strict=True),
+            lambda settings: self.root.after(0, self._on_config_reloaded, settings),
+            interval=interval, on_error=lambda e: self.logger.error(f"config.ini change rejected, keeping current settings: {e}")
+        ).start()
+
+    def _on_config_reloaded(self, settings):
+        categories_changed = settings.dashboard_categories != self.settings.dashboard_categories
+        self._apply_settings(settings)
+        if categories_changed: self._build_dashboard_categories()
         
-        self.desc_to_code_map = {}
-        if self.config.has_section('CODES'):
-            for desc, value in self.config.items('CODES'):
-                self.desc_to_code_map[desc.strip()] = value.split('|')[0].strip()
-        else:
-            self.desc_to_code_map = {"General Situations": "No_Code"}
+        # Refresh the dropdowns in place without touching whatever the dispatcher is typing
+        self.input_medium_cb['values'] = list(self.source_options.keys())
+        self.code_cb['values'] = list(self.desc_to_code_map.keys())
+        self.source_cb['values'] = self.source_options.get(self.input_medium_var.get(), [])
+        self.update_code_description()
 
-        self.source_options = {}
-        if self.config.has_section('SOURCES'):
-            for medium, sources in self.config.items('SOURCES'):
-                self.source_options[medium.capitalize()] = [s.strip() for s in sources.split(',')]
+        if self.current_user in self.users:
+            self.current_user_role = self.users[self.current_user]
+            self.status_var.set(f"User: {self.current_user} ({self.current_user_role})")
+            self._apply_permissions()
+        else:
+            self.logger.warning(f"User '{self.current_user}' was removed from [USERS]; they stay logged in until 'Change User'.")
+        self.logger.info("config.ini reloaded: codes, sources, users, dashboard and refresh intervals updated.")
 
     def setup_logging_handler(self):
-        gui_handler = ScrolledTextHandler(self.log_area)
-        gui_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-        self.logger.addHandler(gui_handler)
+        self.log_area_lines = max(50, self.config.getint('APPLICATION', 'log_area_lines', fallback=1000))
+        self.gui_log_handler = UILogBuffer(self.log_area_lines)
+        self.gui_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        self.logger.addHandler(self.gui_log_handler)
+        self._drain_log_buffer()
+
+    def _drain_log_buffer(self):
+        """Moves buffered log lines into the log area in one insert, keeping only the newest log_area_lines."""
+        lines = self.gui_log_handler.drain()
+        if lines:
+            self.log_area.configure(state="normal")
+            self.log_area.insert(tk.END, "\n".join(lines) + "\n")
+            excess = int(self.log_area.index("end-1c").split(".")[0]) - 1 - self.log_area_lines
+            if excess > 0: self.log_area.delete("1.0", f"{excess + 1}.0")
+            self.log_area.configure(state="disabled")
+            self.log_area.see(tk.END)
+        self._log_drain_job = self.root.after(250, self._drain_log_buffer)
 
     def ensure_user_logged_in(self):
-        users = dict(self.config.items('USERS')) if self.config.has_section('USERS') else {}
+        users = self.users
         if not users:
             messagebox.showerror("Error", "[USERS] missing in config.ini")
             return False
@@ -221,10 +437,14 @@ class DispatchCallApp:
         if self.current_user_role == 'admin': 
             self.history_button.grid()
             self.file_menu.entryconfig("Export Complete Audit Log", state="normal")
+            self.file_menu.entryconfig("Verify Audit Log (Full Check)", state="normal")
+            self.file_menu.entryconfig("Export Hourly Trends to CSV", state="normal")
             self.dashboard_frame.grid()
         else: 
             self.history_button.grid_remove()
             self.file_menu.entryconfig("Export Complete Audit Log", state="disabled")
+            self.file_menu.entryconfig("Verify Audit Log (Full Check)", state="disabled")
+            self.file_menu.entryconfig("Export Hourly Trends to CSV", state="disabled")
             self.dashboard_frame.grid_remove()
         
     def _setup_keyboard_shortcuts(self):
@@ -250,26 +470,59 @@ class DispatchCallApp:
         self.dashboard_frame = ttk.LabelFrame(self.root, text="HQ Operational Dashboard (Admin)")
         self.dashboard_frame.grid(row=0, column=0, columnspan=2, sticky="ew", padx=10, pady=5)
         
-        # Define StringVars for all metrics
-        self.open_first_aid_var = tk.StringVar(value="Active Med (Blue/Yellow): 0")
-        self.open_security_var = tk.StringVar(value="Active Security (Adam/Threats): 0")
-        self.open_fire_var = tk.StringVar(value="Active Fire/Hazmat (Red/Brown): 0")
+        # Define StringVars for the fixed metrics (category counters come from [DASHBOARD])
         self.peak_sla_var = tk.StringVar(value="Peak SLA: 0 min")
         self.total_volume_var = tk.StringVar(value="Total Shift Volume: 0")
-        
-        # Row 0: Critical Incident Counters (Highlighted in Red)
-        ttk.Label(self.dashboard_frame, textvariable=self.open_first_aid_var, font=("TkDefaultFont", 10, "bold"), foreground="#C00000").grid(row=0, column=0, padx=15, pady=2, sticky="w")
-        ttk.Label(self.dashboard_frame, textvariable=self.open_security_var, font=("TkDefaultFont", 10, "bold"), foreground="#C00000").grid(row=0, column=1, padx=15, pady=2, sticky="w")
-        ttk.Label(self.dashboard_frame, textvariable=self.open_fire_var, font=("TkDefaultFont", 10, "bold"), foreground="#C00000").grid(row=0, column=2, padx=15, pady=2, sticky="w")
+        self.category_labels = []
+        self._build_dashboard_categories()
         
         # Row 1: General SLA & Volume Metrics
         ttk.Label(self.dashboard_frame, textvariable=self.peak_sla_var, font=("TkDefaultFont", 10, "bold")).grid(row=1, column=0, padx=15, pady=2, sticky="w")
         ttk.Label(self.dashboard_frame, textvariable=self.total_volume_var, font=("TkDefaultFont", 10, "bold")).grid(row=1, column=1, padx=15, pady=2, sticky="w")
 
+    def _build_dashboard_categories(self):
+        """Row 0: Critical Incident Counters (Highlighted in Red), one per [DASHBOARD] category."""
+        for label in self.category_labels: label.destroy()
+        self.category_labels = []
+        self.category_vars = {}
+        for column, category in enumerate(self.settings.dashboard_categories):
+            var = tk.StringVar(value=f"{category}: 0")
+            label = ttk.Label(self.dashboard_frame, textvariable=var, font=("TkDefaultFont", 10, "bold"), foreground="#C00000")
+            label.grid(row=0, column=column, padx=15, pady=2, sticky="w")
+            self.category_vars[category] = var
+            self.category_labels.append(label)
+
+    def start_dashboard_refresh(self):
+        """Dashboard counters poll on their own timer with one cheap aggregate query, independent of the table."""
+        self._dashboard_job = self.root.after(self.settings.dashboard_refresh_seconds * 1000, self._dashboard_refresh_task)
+
+    def _dashboard_refresh_task(self):
+        if self.current_user_role == 'admin': self.executor.submit(self._fetch_dashboard_metrics)
+        else: self.start_dashboard_refresh()
+
+    def _fetch_dashboard_metrics(self):
+        try:
+            metrics = self.manager.get_dashboard_metrics(self.settings.dashboard_categories)
+            self.root.after(0, self._on_dashboard_metrics, metrics)
+        except Exception as e:
+            self.logger.error(f"Dashboard refresh failed: {e}")
+        finally:
+            self.start_dashboard_refresh()
+
+    def _on_dashboard_metrics(self, metrics):
+        for category, var in self.category_vars.items():
+            var.set(f"{category}: {metrics['categories'].get(category, 0)}")
+        self.peak_sla_var.set(f"Peak SLA: {metrics['peak_sla_minutes']} min")
+        self.total_volume_var.set(f"Total Shift Volume: {metrics['total_volume']}")
+
     def create_status_bar(self):
         self.status_var = tk.StringVar(value="Ready")
         status_bar = ttk.Label(self.root, textvariable=self.status_var, relief=tk.SUNKEN, anchor="w")
-        status_bar.grid(row=6, column=0, columnspan=2, sticky="ew")
+        status_bar.grid(row=6, column=0, sticky="ew")
+        # Calls saved to the local offline journal that haven't reached the shared database yet
+        self.offline_var = tk.StringVar(value="")
+        self.offline_label = ttk.Label(self.root, textvariable=self.offline_var, relief=tk.SUNKEN, anchor="e", foreground="#d9534f")
+        self.offline_label.grid(row=6, column=1, sticky="ew")
 
     def create_log_area(self):
         self.log_area = scrolledtext.ScrolledText(self.root, height=5, state="disabled")
@@ -286,6 +539,10 @@ class DispatchCallApp:
         self.file_menu.add_command(label="Change User", command=self.change_user)
         self.file_menu.add_command(label="Export Report to CSV", command=self.export_report)
         self.file_menu.add_command(label="Export Complete Audit Log", command=self.export_audit_log)
+        self.file_menu.add_command(label="Verify Audit Log (Full Check)", command=self.verify_audit_log_full)
+        self.file_menu.add_command(label="Export Hourly Trends to CSV", command=self.export_trends)
+        self.file_menu.add_command(label="Search Past Events", command=self.open_past_events)
+        self.file_menu.add_command(label="Diagnostics", command=self.open_diagnostics)
         self.file_menu.add_separator()
         self.file_menu.add_command(label="Exit", command=self.on_close)
         menubar.add_cascade(label="File", menu=self.file_menu)
@@ -297,9 +554,9 @@ class DispatchCallApp:
         uniform_width = 30
         
         ttk.Label(fields_frame, text="Input Medium:").grid(row=0, column=0, padx=5, pady=2, sticky="w")
-        input_medium_cb = ttk.Combobox(fields_frame, textvariable=self.input_medium_var, state="readonly", values=list(self.source_options.keys()), width=uniform_width)
-        input_medium_cb.grid(row=0, column=1, padx=5, pady=2, sticky="w")
-        input_medium_cb.bind("<<ComboboxSelected>>", self.update_source_options)
+        self.input_medium_cb = ttk.Combobox(fields_frame, textvariable=self.input_medium_var, state="readonly", values=list(self.source_options.keys()), width=uniform_width)
+        self.input_medium_cb.grid(row=0, column=1, padx=5, pady=2, sticky="w")
+        self.input_medium_cb.bind("<<ComboboxSelected>>", self.update_source_options)
         
         ttk.Label(fields_frame, text="Source:").grid(row=0, column=2, padx=5, pady=2, sticky="w")
         self.source_cb = ttk.Combobox(fields_frame, textvariable=self.source_var, state="readonly", width=uniform_width)
@@ -307,16 +564,22 @@ class DispatchCallApp:
         self.update_source_options()
         
         ttk.Label(fields_frame, text="Caller ID:").grid(row=1, column=0, padx=5, pady=2, sticky="w")
-        ttk.Entry(fields_frame, textvariable=self.caller_var, width=uniform_width+3).grid(row=1, column=1, padx=5, pady=2, sticky="w")
+        caller_entry = ttk.Entry(fields_frame, textvariable=self.caller_var, width=uniform_width+3)
+        caller_entry.grid(row=1, column=1, padx=5, pady=2, sticky="w")
         
         ttk.Label(fields_frame, text="Location:").grid(row=2, column=0, padx=5, pady=2, sticky="w")
-        ttk.Entry(fields_frame, textvariable=self.location_var, width=uniform_width+3).grid(row=2, column=1, padx=5, pady=2, sticky="w")
+        location_entry = ttk.Entry(fields_frame, textvariable=self.location_var, width=uniform_width+3)
+        location_entry.grid(row=2, column=1, padx=5, pady=2, sticky="w")
+
+        # Past values from DataManager's in-memory prefix index: no query per keystroke
+        self.caller_suggestions = SuggestionList(caller_entry, self.caller_var, lambda text: self._suggest("Caller", text))
+        self.location_suggestions = SuggestionList(location_entry, self.location_var, lambda text: self._suggest("Location", text))
         
         all_descriptions = list(self.desc_to_code_map.keys())
         ttk.Label(fields_frame, text="Situation:").grid(row=3, column=0, padx=5, pady=2, sticky="w")
-        code_cb = ttk.Combobox(fields_frame, textvariable=self.code_var, state="readonly", values=all_descriptions, width=uniform_width)
-        code_cb.grid(row=3, column=1, padx=5, pady=2, sticky="w")
-        code_cb.bind("<<ComboboxSelected>>", self.update_code_description)
+        self.code_cb = ttk.Combobox(fields_frame, textvariable=self.code_var, state="readonly", values=all_descriptions, width=uniform_width)
+        self.code_cb.grid(row=3, column=1, padx=5, pady=2, sticky="w")
+        self.code_cb.bind("<<ComboboxSelected>>", self.update_code_description)
         
         if all_descriptions: self.code_var.set(all_descriptions[0])
 
@@ -345,6 +608,9 @@ class DispatchCallApp:
 
         self.update_code_description()
 
+    def _suggest(self, field, text):
+        return self.manager.suggest(field, text) if self.manager else [] # Nothing to offer until the database has opened
+
     def update_code_description(self, event=None):
         self.code_description_var.set(self.desc_to_code_map.get(self.code_var.get(), "N/A"))
 
@@ -375,14 +641,8 @@ class DispatchCallApp:
         self.auto_scroll_var.set(False)
 
     def create_table(self):
-        self.columns = {
-            "ReportID": ("Call ID", 80), "CallDate": ("Date", 80), "CallTime": ("Time", 60), "TimeOpen": ("Time Open", 80),
-            "ResolutionStatus": ("Resolved?", 70), "ResolutionTimestamp": ("Resolved At", 120), "ResolvedBy": ("Resolved By", 100),
-            "Cancelled": ("Cancelled?", 70),
-            "InputMedium": ("Medium", 100), "Source": ("Source", 100), "Caller": ("Caller", 100),
-            "Location": ("Location", 120), "Code": ("Code", 150), "Description": ("Description", 300),
-            "CreatedBy": ("Created By", 100)
-        }
+        self.columns = dict(CALL_TABLE_COLUMNS)
+        self.query_columns = list(CALL_TABLE_QUERY_COLUMNS)
         
         table_frame = ttk.Frame(self.root)
         table_frame.grid(row=3, column=0, columnspan=2, sticky="nsew", padx=10, pady=10)
@@ -393,6 +653,8 @@ class DispatchCallApp:
         for col, (heading, width) in self.columns.items():
             self.table.heading(col, text=heading, command=lambda _col=col: self.sort_table(_col))
             self.table.column(col, width=width, anchor="w" if col == "Description" else "center")
+        self.table.bind("<Shift-Button-1>", self._on_shift_header_click)
+        self._show_sort_headings()
         
         self.scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.table.yview)
         self.table.configure(yscrollcommand=self.scrollbar.set)
@@ -405,11 +667,33 @@ class DispatchCallApp:
         self.table.grid(row=0, column=0, sticky="nsew")
         self.scrollbar.grid(row=0, column=1, sticky="ns")
 
-    def sort_table(self, col):
-        if col == "TimeOpen": col = "CallTime"
-        if self.sort_column == col: self.sort_direction = "DESC" if self.sort_direction == "ASC" else "ASC"
-        else: self.sort_column, self.sort_direction = col, "ASC"
-        self.update_table(update_behavior='preserve')
+    def sort_table(self, col, add=False):
+        """
+        Header click sorts by col (clicking it again reverses it); Shift+click adds col as a further
+        sort column, or reverses it if it's already one. Re-sorts the rows on hand, never the database.
+        """
+        if add:
+            if col in dict(self.sort_keys): self.sort_keys = [(c, not d if c == col else d) for c, d in self.sort_keys]
+            else: self.sort_keys.append((col, False))
+        else:
+            primary, descending = self.sort_keys[0]
+            self.sort_keys = [(col, not descending if primary == col else False)]
+        self._show_sort_headings()
+        if self._table_calls is None: return
+        self._render_table_rows(self._table_calls)
+        if self.table.selection(): self.table.see(self.table.selection()[0])
+
+    def _on_shift_header_click(self, event):
+        if self.table.identify_region(event.x, event.y) != "heading": return
+        column = self.table.identify_column(event.x) # '#3' -> third displayed column
+        self.sort_table(list(self.columns)[int(column[1:]) - 1], add=True)
+        return "break"
+
+    def _show_sort_headings(self):
+        arrows = {col: ("▼" if descending else "▲") + (str(rank) if len(self.sort_keys) > 1 else "")
+                  for rank, (col, descending) in enumerate(self.sort_keys, start=1)}
+        for col, (heading, _) in self.columns.items():
+            self.table.heading(col, text=f"{heading} {arrows[col]}" if col in arrows else heading)
 
     def create_search_bar(self):
         search_frame = ttk.Frame(self.root)
@@ -461,14 +745,25 @@ class DispatchCallApp:
                 result = target(*args)
                 if self.root.winfo_exists(): self.root.after(0, callback, True, result)
             except Exception as e:
-                if self.root.winfo_exists(): self.root.after(0, callback, False, str(e))
+                # The exception itself is passed on so callbacks can react to specific errors (e.g. save conflicts)
+                if self.root.winfo_exists(): self.root.after(0, callback, False, e)
             finally:
                 if self.root.winfo_exists(): self.root.after(0, self._set_ui_busy, False)
         self.executor.submit(worker)
 
-    def _signal_discord_bot(self, endpoint, report_id, source=""):
+    def _run_in_background(self, target, callback, *args):
+        """Like _run_in_thread, but for quiet reads (polls, lazy paging) that shouldn't grey out the action buttons."""
+        def worker():
+            try: result, success = target(*args), True
+            except Exception as e: result, success = e, False
+            if self.root.winfo_exists(): self.root.after(0, callback, success, result)
+        self.executor.submit(worker)
+
+    def _signal_discord_bot(self, endpoint, report_id, source="", code=None, medium=""):
         """Sends a lightweight HTTP POST to the Discord Bot to wake it up."""
+        import urllib.request # Lazy: pulls in http.client/ssl, only needed once a call is routed
         payload = {"report_id": report_id, "source": source}
+        if code is not None: payload.update(code=code, medium=medium)
         try:
             req = urllib.request.Request(f"http://localhost:8080/{endpoint}", data=json.dumps(payload).encode('utf-8'), headers={'Content-Type': 'application/json'})
             with urllib.request.urlopen(req, timeout=1.5): pass
@@ -489,24 +784,51 @@ class DispatchCallApp:
             "ResolutionStatus": self.resolution_status_var.get(), "ResolvedBy": self.resolved_by_var.get().strip(),
             "Cancelled": self.cancelled_status_var.get()
         }
-        self._run_in_thread(self.manager.add_call, self._on_add_call_complete, call_data, self.current_user)
-
-    def _on_add_call_complete(self, success, new_report_id):
+        callback = lambda success, res: self._on_add_call_complete(success, res, call_data)
+        # With warnings on, add_call first checks open calls for the same incident and raises PossibleDuplicateError
+        allow_duplicates = not self.config.getboolean('DUPLICATES', 'warn', fallback=True)
+        self._run_in_thread(self.manager.add_call, callback, call_data, self.current_user, allow_duplicates)
+
+    def _on_add_call_complete(self, success, new_report_id, call_data):
+        import offline_journal
+        from data_manager import PossibleDuplicateError
         if success:
-            self.logger.info(f"Call added: {new_report_id}")
+            offline = offline_journal.is_provisional(new_report_id)
+            self.logger.info(f"Call added: {new_report_id}" + (" (saved offline; it will reach the shared database when it answers again)" if offline else ""))
             self.is_dirty = False
             
-            # Send IPC ping asynchronously via dedicated ThreadPool
-            if self.input_medium_var.get().strip() != "Social Media":
-                self.ipc_executor.submit(self._signal_discord_bot, "dispatch", new_report_id, self.source_var.get().strip())
+            # Send IPC ping asynchronously via dedicated ThreadPool, only if a routing rule can match.
+            # Offline calls are announced once they replay and have their real ID.
+            if not offline and self.routing.channels_for(call_data['Code'], call_data['Source'], call_data['InputMedium']):
+                self.ipc_executor.submit(self._signal_discord_bot, "dispatch", new_report_id, call_data['Source'],
+                                         call_data['Code'], call_data['InputMedium'])
             
             self.known_calls.add(new_report_id)
-            self.last_update_count = self.manager.check_if_updated()
+            if not offline: self.last_update_count = self.manager.check_if_updated()
+            self._refresh_offline_status()
             self.update_table(update_behavior='focus', target_id=new_report_id, was_added=True)
+        elif isinstance(new_report_id, PossibleDuplicateError):
+            self._confirm_possible_duplicate(new_report_id, call_data)
         else:
             messagebox.showerror("Database Error", f"Failed to add call: {new_report_id}")
             self.primary_action_button.config(state="normal")
 
+    def _confirm_possible_duplicate(self, error, call_data):
+        """Nothing was saved yet. Yes adds the call anyway; No keeps the form so it can be changed or cleared."""
+        now = time.time()
+        lines = []
+        for match in error.matches:
+            minutes = int((now - match["CreatedEpoch"]) // 60) if match["CreatedEpoch"] else 0
+            description = (match["Description"] or "").replace("\n", " ")
+            lines.append(f"  {match['ReportID']}  {match['Location']}  ({match['Code'] or 'no code'}, {minutes} min ago)\n     {description[:70]}")
+        if messagebox.askyesno("Possible Duplicate Call", "This looks like an incident that is already open:\n\n" + "\n".join(lines) +
+                               "\n\nYes: add it as a new call anyway.\nNo: don't add it (your entry stays in the form)."):
+            callback = lambda success, res: self._on_add_call_complete(success, res, call_data)
+            self._run_in_thread(self.manager.add_call, callback, call_data, self.current_user, True)
+        else:
+            self.logger.info(f"New call not added: possible duplicate of {', '.join(m['ReportID'] for m in error.matches)}")
+            self.primary_action_button.config(state="normal")
+
     def modify_call(self):
         if not self.table.selection(): return
         if not self._validate_fields(): return
@@ -523,22 +845,48 @@ class DispatchCallApp:
             "Cancelled": self.cancelled_status_var.get()
         }
         
-        callback = lambda success, res: self._on_modify_call_complete(success, res, report_id)
-        self._run_in_thread(self.manager.modify_call, callback, report_id, updated_call, self.current_user)
-
-    def _on_modify_call_complete(self, success, result_or_error, report_id):
+        # Passing the row we loaded lets the save be one conditional UPDATE, with no re-read over SMB
+        original = self.loaded_call if self.loaded_call and self.loaded_call.get("ReportID") == report_id else None
+        callback = lambda success, res: self._on_modify_call_complete(success, res, report_id, updated_call, original)
+        self._run_in_thread(self.manager.modify_call, callback, report_id, dict(updated_call), self.current_user, original)
+
+    def _on_modify_call_complete(self, success, result_or_error, report_id, updated_call=None, original=None):
+        import offline_journal
+        from data_manager import CallConflictError
         if success:
             self.is_dirty = False
-            self.last_update_count = self.manager.check_if_updated()
+            journaled = result_or_error == offline_journal.JOURNALED # Saved offline; the bot hears about it on replay
+            if not journaled: self.last_update_count = self.manager.check_if_updated()
             self.update_table(clear_fields=True)
-            self.ipc_executor.submit(self._signal_discord_bot, "update", report_id)
+            if not journaled: self.ipc_executor.submit(self._signal_discord_bot, "update", report_id)
+            self._refresh_offline_status()
+        elif isinstance(result_or_error, CallConflictError):
+            self._resolve_save_conflict(result_or_error, updated_call, original)
+            self.primary_action_button.config(state="normal")
         else:
             messagebox.showerror("Database Error", f"Failed to modify call: {result_or_error}")
             self.primary_action_button.config(state="normal")
 
+    def _resolve_save_conflict(self, conflict, my_call, original):
+        """Another laptop saved first. Show what they changed, then merge or reload; nothing was written."""
+        current = conflict.current
+        lines = [f"  {field}: '{original.get(field) or ''}' -> '{current.get(field) or ''}'" for field in conflict.changed_fields]
+        keep_mine = messagebox.askyesno(
+            "Call Changed on Another Laptop",
+            f"{conflict}\n\nThey changed:\n" + ("\n".join(lines) or "  (no visible fields)") +
+            "\n\nYour edits were NOT saved.\n\nYes: keep your edits on top of their changes (review, then save again).\nNo: discard your edits and load their version."
+        )
+        # Fields this dispatcher actually edited win; everything else takes the other laptop's value
+        from data_manager import merge_edits
+        merged = merge_edits(my_call, original, current) if keep_mine else dict(current)
+        self._on_load_selected_fetched(True, merged)
+        self.loaded_call = current # Saving again now overwrites their version knowingly
+        self.is_dirty = keep_mine
+
     def load_selected_call(self, event):
         if self.is_dirty and not messagebox.askyesno("Unsaved Changes", "Discard unsaved changes?"): return "break"
         if not self.table.selection(): return
+        if not self.manager: return # Cached snapshot rows are read-only until the database is open
         
         self.primary_action_button.config(text="SAVE MODIFICATION", command=self.modify_call, style="Bold.TButton")
         item = self.table.item(self.table.selection()[0])
@@ -553,6 +901,7 @@ class DispatchCallApp:
             if not success or not full_call: return
             
             call = dict(full_call)
+            self.loaded_call = call
             self.input_medium_var.set(call.get("InputMedium", ""))
             self.update_source_options()
             self.source_var.set(call.get("Source", ""))
@@ -596,6 +945,7 @@ class DispatchCallApp:
 
             self.update_code_description()
             self.primary_action_button.config(text="ADD CALL", command=self.add_call, style="Bold.TButton")
+            self.loaded_call = None
         finally: self.is_loading_data = False
         self.is_dirty = False
 
@@ -611,15 +961,62 @@ class DispatchCallApp:
     def export_report(self):
         filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title="Export Dispatch Calls")
         if not filename: return
-        self._run_in_thread(self.manager.get_all_calls, lambda s, r: self._on_export_data_fetched(s, r, filename), self.sort_column, self.sort_direction)
+        column, descending = self.sort_keys[0] # The database orders by the primary sort column where it can
+        self._run_in_thread(self.manager.get_all_calls, lambda s, r: self._on_export_data_fetched(s, r, filename), column, "DESC" if descending else "ASC")
 
     def export_audit_log(self):
         filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title="Export Audit Log")
         if not filename: return
-        self._run_in_thread(self.manager.get_full_audit_log, lambda s, r: self._on_export_data_fetched(s, r, filename))
+        self._run_in_thread(self._fetch_verified_audit_log, lambda s, r: self._on_audit_export_fetched(s, r, filename))
+
+    def _fetch_verified_audit_log(self):
+        """DB thread: incremental tamper check from the last signed checkpoint, then the full log (hot + archive)."""
+        return self.manager.verify_audit_chain(), self.manager.get_full_audit_log()
+
+    def _on_audit_export_fetched(self, success, result, filename):
+        if not success:
+            messagebox.showerror("Export Error", f"Could not read the audit log: {result}")
+            return
+        verification, rows = result
+        if not self._report_audit_verification(verification): 
+            messagebox.showwarning("Audit Log Integrity", f"The audit log failed its tamper check:\n{verification['problem']}\n\nThe export will still be written so the evidence is preserved.")
+        self._on_export_data_fetched(True, rows, filename)
+
+    def export_trends(self):
+        """Per-hour, per-code volume, backlog and response times for the whole event, read from the rollup table."""
+        filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title="Export Hourly Trends")
+        if not filename: return
+        self._run_in_thread(self.manager.get_rollups, lambda s, r: self._on_trends_fetched(s, r, filename), 0, None, 60, None, True)
+
+    def _on_trends_fetched(self, success, buckets, filename):
+        if not success:
+            messagebox.showerror("Export Error", f"Could not read the trend rollups: {buckets}")
+            return
+        if not buckets:
+            messagebox.showinfo("Export Hourly Trends", "No calls have been recorded yet.")
+            return
+        rows = [{"Hour": datetime.fromtimestamp(b.pop("Bucket")).strftime("%Y-%m-%d %H:00"), **b} for b in buckets]
+        self._on_export_data_fetched(True, rows, filename)
+
+    def verify_audit_log_full(self):
+        self._run_in_thread(self.manager.verify_audit_chain, self._on_full_verification, True)
+
+    def _on_full_verification(self, success, result):
+        if not success: messagebox.showerror("Audit Log Integrity", f"Verification could not run: {result}")
+        elif self._report_audit_verification(result): messagebox.showinfo("Audit Log Integrity", f"All {result['checked']} audit log entries are intact.")
+        else: messagebox.showwarning("Audit Log Integrity", f"The audit log failed its tamper check:\n{result['problem']}")
+
+    def _report_audit_verification(self, verification):
+        if verification['ok']:
+            self.logger.info(f"Audit log verified: {verification['checked']} entries checked from HistoryID {verification['start_id']}.")
+            if not verification['signed']: self.logger.warning("Audit checkpoints are unsigned: set signing_key under [AUDIT] in config.ini.")
+        else:
+            self.logger.critical(f"AUDIT LOG TAMPER CHECK FAILED: {verification['problem']}")
+        return verification['ok']
 
     def _on_export_data_fetched(self, success, rows, filename):
         if not success or not rows: return
+        import csv
         try:
             with open(filename, "w", newline="", encoding="utf-8") as file:
                 writer = csv.DictWriter(file, fieldnames=rows[0].keys())
@@ -642,123 +1039,146 @@ class DispatchCallApp:
 
     def update_table(self, update_behavior='preserve', target_id=None, was_added=False, clear_fields=False):
         """Fetches fresh data and calculates dynamic SLA colors."""
+        if not self.manager: return # Still opening; the stale snapshot stays up until then
         pre_selection_id = self.table.item(self.table.selection()[0])['values'][0] if self.table.selection() else None
         pre_refresh_yview = self.table.yview()
         
-        # Pass the active_only_var to the database manager
-        self._run_in_thread(self.manager.get_all_calls, 
+        # Pass the active_only_var to the database manager. The row cache is read here, on the Tk thread:
+        # each refresh builds a new dict and swaps it in, so the one handed over never changes underneath
+        self._run_in_thread(self._fetch_table_calls, 
                             lambda s, r: self._on_update_table_data_fetched(s, r, update_behavior, target_id, was_added, pre_selection_id, pre_refresh_yview, clear_fields), 
-                            self.sort_column, self.sort_direction, self.active_only_var.get())
+                            "ReportID", "ASC", self.active_only_var.get(), self.query_columns, self._table_row_cache)
         
-    def _on_update_table_data_fetched(self, success, all_calls, update_behavior, target_id, was_added, pre_selection_id, pre_refresh_yview, clear_fields):
-        if not success: return
-
-        # Map currently displayed items to patch RAM leak
-        existing_items = self.table.get_children()
-        item_id_map = {}
-        for item in existing_items:
-            vals = self.table.item(item, 'values')
-            if vals: item_id_map[vals[0]] = item
-
+    def _fetch_table_calls(self, sort_by, sort_order, active_only, columns, shown_rows):
+        """
+        DB thread: the shared table plus this laptop's offline saves (provisional IDs) not yet replayed.
+        shown_rows is the table's row cache as of the refresh request, used when the share is unreachable.
+        """
+        import offline_journal
+        try:
+            calls = self.manager.get_all_calls(sort_by, sort_order, active_only, columns)
+        except Exception as e:
+            if not (self.manager.journal and offline_journal.is_connectivity_error(e)): raise
+            # Share unreachable: keep what the table last showed, so the offline calls can join it
+            calls = [entry[0] for report_id, entry in shown_rows.items() if not offline_journal.is_provisional(report_id)]
+        return calls + self.manager.get_pending_calls(columns, active_only)
+
+    def _format_table_row(self, call, display_keys):
+        """
+        Everything about a table row that doesn't depend on the clock, cached per ReportID:
+        (fetched row, display values, status/tag, opened epoch, lowercase search text, sort keys).
+        Sort keys line up with display_keys, so a header click only compares precomputed values.
+        """
+        is_res = str(call.get('ResolutionStatus', "False")).lower() in ('1', 'true')
+        is_canc = str(call.get('Cancelled', "False")).lower() in ('1', 'true')
+        code = call.get('Code', "") or ""
+        if is_canc: status = "cancelled"
+        elif is_res: status = "resolved"
+        elif code in self.high_priority_codes: status = "high_priority"
+        else: status = "nocode" if not code or code.lower() == "no_code" else "hascode"
+        
+        opened_epoch = call.get('CreatedEpoch')
+        if opened_epoch is None:
+            try: opened_epoch = datetime.strptime(f"{call['CallDate']} {call['CallTime']}", "%Y-%m-%d %H:%M").timestamp()
+            except (KeyError, TypeError, ValueError): opened_epoch = None
+        
+        values = []
+        for key in display_keys:
+            if key in ("ResolutionStatus", "Cancelled"):
+                values.append("True" if str(call.get(key)).lower() in ('1', 'true') else "False")
+            elif key == "TimeOpen":
+                values.append("Cancelled" if is_canc else "Closed" if is_res else "")
+            else:
+                values.append(self._sanitize_for_tkinter(call.get(key, "")))
+        search_text = "\x00".join(str(v).lower() for v in call.values())
+        
+        sort_keys = []
+        for key, value in zip(display_keys, values):
+            if key == "ReportID": sort_keys.append(_report_id_sort_key(call.get(key)))
+            elif key == "TimeOpen": sort_keys.append((is_res or is_canc, -(opened_epoch or 0))) # Open calls by age, closed ones after
+            elif key in ("ResolutionStatus", "Cancelled"): sort_keys.append(value == "True")
+            else: sort_keys.append(value.casefold())
+        return call, tuple(values), status, opened_epoch, search_text, tuple(sort_keys)
+
+    def _render_table_rows(self, all_calls):
+        """
+        Filters, sorts and syncs the Treeview with a fetched result set. Touches only rows whose
+        values or position changed. Needs no database, so header clicks and searches reuse it.
+        """
         filter_text = self.search_var.get().lower().strip()
         display_keys = list(self.columns.keys())
+        time_open_index = display_keys.index("TimeOpen")
         
-        current_report_ids = set()
         now = datetime.now()
+        now_epoch = now.timestamp()
         
-        # --- NEW DASHBOARD TRACKING VARIABLES ---
-        active_first_aid = 0
-        active_security = 0
-        active_fire = 0
-        peak_sla = 0
-        valid_calls_count = 0
-
-        # Iterate and update in-place instead of destroying nodes
-        for index, call_row in enumerate(all_calls):
-            call = dict(call_row)
-            if call.get('Deleted'): continue
-            
-            valid_calls_count += 1
+        # Rows whose fetched values are unchanged since the last refresh reuse their formatted values
+        row_cache = {}
+        rows = []
+        for call in all_calls:
             report_id = call.get('ReportID')
-            
-            is_res = str(call.get('ResolutionStatus', "False")).lower() in ('1', 'true')
-            is_canc = str(call.get('Cancelled', "False")).lower() in ('1', 'true')
-            is_hp = call.get('Code', "") in self.high_priority_codes
-            
-            # SLA CALCULATIONS
-            try:
-                call_dt = datetime.strptime(f"{call['CallDate']} {call['CallTime']}", "%Y-%m-%d %H:%M")
-                minutes_open = (now - call_dt).total_seconds() / 60
-            except:
-                minutes_open = 0
-                
-            # --- NEW OPERATIONAL DASHBOARD ANALYTICS ---
-            if not is_res and not is_canc:
-                peak_sla = max(peak_sla, minutes_open)
-                db_code = call.get('Code', "")
-                
-                # Sort open calls into their respective buckets
-                if db_code in ["Blue", "Yellow"]:
-                    active_first_aid += 1
-                elif db_code in ["Adam", "Black", "White / Mayday", "Silver"]:
-                    active_security += 1
-                elif db_code in ["Red", "Brown"]:
-                    active_fire += 1
+            entry = self._table_row_cache.get(report_id)
+            if entry is None or entry[0] != call: entry = self._format_table_row(call, display_keys)
+            row_cache[report_id] = entry
+            _, values, status, opened_epoch, search_text, sort_keys = entry
             
             # Search Filter Check
-            if filter_text and not any(filter_text in str(v).lower() for v in call.values()): 
-                continue
-                
-            current_report_ids.add(report_id)
+            if filter_text and filter_text not in search_text: continue
             
-            tags = []
-            if is_canc:
-                tags.append("cancelled")
-                call["TimeOpen"] = "Cancelled"
-            elif is_res:
-                tags.append("resolved")
-                call["TimeOpen"] = "Closed"
+            if status == "cancelled": tags = ("cancelled",)
+            elif status == "resolved": tags = ("resolved",)
             else:
-                call["TimeOpen"] = f"{int(minutes_open)} min"
-                if minutes_open >= 30: tags.append("sla_critical")
-                elif is_hp: tags.append("high_priority")
-                else:
-                    db_code = call.get('Code', "")
-                    tags.append("nocode" if not db_code or db_code.lower() == "no_code" else "hascode")
-            
-            values = []
-            for key in display_keys:
-                if key in ("ResolutionStatus", "Cancelled"):
-                    values.append("True" if str(call.get(key)).lower() in ('1', 'true') else "False")
-                elif key == "TimeOpen":
-                    values.append(call.get(key))
-                else:
-                    values.append(self._sanitize_for_tkinter(call.get(key, "")))
-            
-            # Update existing row or insert new one cleanly
+                # SLA CALCULATIONS (epoch column; legacy rows fall back to the parsed TEXT pair)
+                minutes_open = (now_epoch - opened_epoch) / 60 if opened_epoch is not None else 0
+                values = values[:time_open_index] + (f"{int(minutes_open)} min",) + values[time_open_index + 1:]
+                if minutes_open >= 30: tags = ("sla_critical",)
+                else: tags = (status,)
+            rows.append((report_id, values, tags, sort_keys))
+        self._table_row_cache = row_cache
+        
+        # Stable sorts, least significant column first, give the multi-column order
+        for column, descending in reversed(self.sort_keys):
+            index = display_keys.index(column)
+            rows.sort(key=lambda row: row[3][index], reverse=descending)
+        
+        # Update existing rows in place (only the ones that changed), insert new ones, drop the rest
+        item_id_map = self._table_item_ids
+        order = [row[0] for row in rows]
+        order_changed = order != self._table_order
+        current_report_ids = set(order)
+        for index, (report_id, values, tags, _) in enumerate(rows):
             if report_id in item_id_map:
                 tree_id = item_id_map[report_id]
-                self.table.item(tree_id, values=values, tags=tags)
-                self.table.move(tree_id, "", index) # Enforce sorting order
+                if self._table_shown.get(report_id) != (values, tags): self.table.item(tree_id, values=values, tags=tags)
+                if order_changed: self.table.move(tree_id, "", index) # Enforce sorting order
             else:
                 tree_id = self.table.insert("", index, values=values, tags=tags)
                 item_id_map[report_id] = tree_id
+            self._table_shown[report_id] = (values, tags)
 
         # Clean up rows that were resolved/deleted and no longer belong in the view
-        for rep_id, tree_id in item_id_map.items():
-            if rep_id not in current_report_ids:
-                self.table.delete(tree_id)
-
+        for rep_id in [r for r in item_id_map if r not in current_report_ids]:
+            self.table.delete(item_id_map.pop(rep_id))
+            self._table_shown.pop(rep_id, None)
+        self._table_order = order
         self.known_calls = current_report_ids
-        
-        # --- UPDATE DASHBOARD WIDGETS ---
-        self.open_first_aid_var.set(f"Active Med (Blue/Yellow): {active_first_aid}")
-        self.open_security_var.set(f"Active Security (Adam/Threats): {active_security}")
-        self.open_fire_var.set(f"Active Fire/Hazmat (Red/Brown): {active_fire}")
-        self.peak_sla_var.set(f"Peak SLA: {int(peak_sla)} min")
-        self.total_volume_var.set(f"Total Shift Volume: {valid_calls_count}")
+
+    def _on_update_table_data_fetched(self, success, all_calls, update_behavior, target_id, was_added, pre_selection_id, pre_refresh_yview, clear_fields):
+        if not success: return
+        self._table_calls = all_calls
+        self._render_table_rows(all_calls)
+        item_id_map = self._table_item_ids
         
         self.is_first_load = False
+        if self.manager:
+            if self.showing_snapshot:
+                self.showing_snapshot = False
+                self.root.title(self.base_title)
+            if self.startup_timer:
+                self._mark_startup("first_live_table")
+                self.logger.info(f"Startup phases: {self.startup_timer.summary()}")
+                self.startup_timer = None # Boot is over
+            self._save_snapshot_throttled(all_calls)
 
         if update_behavior == 'focus' and target_id and target_id in item_id_map:
             self.table.selection_set(item_id_map[target_id])
@@ -779,7 +1199,10 @@ class DispatchCallApp:
         if clear_fields and not self.is_dirty: self.clear_input_fields()
         self.table.bind("<<TreeviewSelect>>", self.load_selected_call)
 
-    def on_search(self, event=None): self.update_table(update_behavior='preserve')
+    def on_search(self, event=None):
+        """Filters the rows on hand as the dispatcher types; the next refresh brings in anything new."""
+        if self._table_calls is None: return
+        self._render_table_rows(self._table_calls)
 
     def start_auto_refresh(self):
         """Continuous poller to check the database for updates from other laptops."""
@@ -806,59 +1229,450 @@ class DispatchCallApp:
         finally:
             self.start_auto_refresh()
 
+    def start_history_archival(self):
+        """Periodically moves history of long-closed calls into the archive file, keeping the shared hot file small."""
+        if not self.manager.archive_filename: return
+        minutes = self.config.getfloat('ARCHIVE', 'check_minutes', fallback=30)
+        self._archive_job = self.root.after(int(minutes * 60000), self._archive_task)
+
+    def _archive_task(self):
+        self.executor.submit(self._archive_closed_history)
+
+    def _archive_closed_history(self):
+        try:
+            moved = self.manager.archive_closed_history(self.config.getfloat('ARCHIVE', 'archive_after_hours', fallback=6))
+            if moved: self.logger.info(f"Archived {moved} history row(s) of closed calls.")
+        except Exception as e:
+            self.logger.error(f"History archival failed: {e}")
+        finally:
+            self.start_history_archival()
+
+    def start_offline_replay(self):
+        """While offline saves are queued, retries sending them to the shared database every few seconds."""
+        seconds = self.config.getfloat('OFFLINE', 'replay_seconds', fallback=5)
+        self._offline_replay_job = self.root.after(int(seconds * 1000), self._offline_replay_task)
+
+    def _offline_replay_task(self):
+        if self.manager.journal.pending_count: self.executor.submit(self._replay_offline_journal)
+        else: self.start_offline_replay()
+
+    def _replay_offline_journal(self):
+        try:
+            replayed = self.manager.replay_journal()
+            if replayed and self.root.winfo_exists(): self.root.after(0, self._on_offline_replayed, replayed)
+        except Exception as e:
+            self.logger.error(f"Offline journal replay failed: {e}")
+        finally:
+            self.start_offline_replay()
+
+    def _on_offline_replayed(self, replayed):
+        for op, report_id, call in replayed:
+            if op == "add":
+                self.logger.info(f"Offline call reached the shared database as {report_id}.")
+                if self.routing.channels_for(call['Code'], call['Source'], call['InputMedium']):
+                    self.ipc_executor.submit(self._signal_discord_bot, "dispatch", report_id, call['Source'], call['Code'], call['InputMedium'])
+            else:
+                self.ipc_executor.submit(self._signal_discord_bot, "update", report_id)
+        self._refresh_offline_status()
+        self.update_table(update_behavior='preserve')
+
+    def _refresh_offline_status(self):
+        journal = self.manager.journal if self.manager else None
+        if not journal: return
+        parts = []
+        if journal.pending_count: parts.append(f"OFFLINE: {journal.pending_count} save(s) waiting for the shared database")
+        if journal.failed_count: parts.append(f"{journal.failed_count} offline save(s) rejected, see logs")
+        self.offline_var.set("  |  ".join(parts))
+
+    def start_audit_checkpoints(self):
+        """Periodically verifies new audit rows and records a signed checkpoint, keeping export-time checks short."""
+        minutes = self.config.getfloat('AUDIT', 'checkpoint_minutes', fallback=15)
+        self._audit_job = self.root.after(int(minutes * 60000), self._audit_checkpoint_task)
+
+    def _audit_checkpoint_task(self):
+        self.executor.submit(self._write_audit_checkpoint)
+
+    def _write_audit_checkpoint(self):
+        try:
+            verification = self.manager.verify_audit_chain()
+            if not verification['ok']: self.logger.critical(f"AUDIT LOG TAMPER CHECK FAILED: {verification['problem']}")
+        except Exception as e:
+            self.logger.error(f"Audit checkpoint failed: {e}")
+        finally:
+            self.start_audit_checkpoints()
+
+    def start_wallboard_publishing(self):
+        """Offers to publish the wallboard snapshot each interval; only one laptop actually writes it (see wallboard.py)."""
+        self._wallboard_job = self.root.after(self.wallboard_publisher.next_delay_ms(), self._wallboard_task)
+
+    def _wallboard_task(self):
+        self.executor.submit(self._publish_wallboard)
+
+    def _publish_wallboard(self):
+        try:
+            self.wallboard_publisher.publish_if_due(self.manager, self.settings.dashboard_categories, self.high_priority_codes)
+        except Exception as e:
+            self.logger.warning(f"Wallboard snapshot publish failed: {e}")
+        finally:
+            self.start_wallboard_publishing()
+
     def open_passdown_notes(self):
-        self._run_in_thread(self.manager.get_passdown_notes, self._on_passdown_fetched)
+        """
+        Opens straight away and fills in from the executor: the newest page first, older pages
+        as the dispatcher scrolls back (keyset on NoteID), and notes from other laptops live.
+        """
+        if self.passdown_window and self.passdown_window.winfo_exists():
+            self.passdown_window.deiconify()
+            self.passdown_window.lift()
+            return
         
-    def _on_passdown_fetched(self, success, notes):
         pd_win = tk.Toplevel(self.root)
+        self.passdown_window = pd_win
         pd_win.title("Shift Passdown Notes")
         pd_win.geometry("600x400")
         
-        note_display = scrolledtext.ScrolledText(pd_win, width=70, height=15, state="normal")
+        note_display = scrolledtext.ScrolledText(pd_win, width=70, height=15, state="disabled")
         note_display.pack(padx=10, pady=10, fill='both', expand=True)
         
-        if notes:
-            for n in reversed(notes):
-                note_display.insert(tk.END, f"[{n['Timestamp']}] {n['User']}:\n{n['Note']}\n{'-'*50}\n")
-        note_display.configure(state="disabled")
-        note_display.see(tk.END)
-        
         input_frame = ttk.Frame(pd_win)
         input_frame.pack(fill='x', padx=10, pady=(0, 10))
         
         new_note = ttk.Entry(input_frame)
         new_note.pack(side="left", fill='x', expand=True, padx=(0, 5))
+        add_button = ttk.Button(input_frame, text="Add Note")
+        add_button.pack(side="right")
+        
+        page_size = 50
+        state = {"oldest": None, "newest": 0, "shown": set(), "loading_older": True, "exhausted": False, "tail_job": None}
+        
+        def format_note(n):
+            return f"[{n['Timestamp']}] {n['User']}:\n{n['Note']}\n{'-'*50}\n"
+        
+        def track(notes):
+            fresh = [n for n in notes if n['NoteID'] not in state["shown"]]
+            for n in fresh:
+                state["shown"].add(n['NoteID'])
+                state["newest"] = max(state["newest"], n['NoteID'])
+                state["oldest"] = n['NoteID'] if state["oldest"] is None else min(state["oldest"], n['NoteID'])
+            return fresh
         
-        def save_note():
+        def append_notes(notes):
+            """Adds notes at the bottom, following them only if the dispatcher was already at the bottom."""
+            fresh = track(notes)
+            if not fresh: return
+            at_bottom = note_display.yview()[1] >= 0.999
+            note_display.configure(state="normal")
+            note_display.insert(tk.END, "".join(format_note(n) for n in fresh))
+            note_display.configure(state="disabled")
+            if at_bottom: note_display.see(tk.END)
+        
+        def prepend_notes(page):
+            """Adds an older page (newest first, as queried) above what's shown, keeping the view where it was."""
+            fresh = track(page)
+            if not fresh: return
+            text = "".join(format_note(n) for n in reversed(fresh))
+            top_line = int(note_display.index("@0,0").split(".")[0])
+            note_display.configure(state="normal")
+            note_display.insert("1.0", text)
+            note_display.configure(state="disabled")
+            note_display.yview(f"{top_line + text.count(chr(10))}.0")
+        
+        def on_first_page(success, page):
+            if not pd_win.winfo_exists(): return
+            state["loading_older"] = False
+            if not success:
+                self.logger.error(f"Failed to load passdown notes: {page}")
+                return
+            state["exhausted"] = len(page) < page_size
+            append_notes(list(reversed(page)))
+            note_display.see(tk.END)
+            schedule_tail()
+        
+        def on_older_page(success, page):
+            if not pd_win.winfo_exists(): return
+            state["loading_older"] = False
+            if not success:
+                self.logger.error(f"Failed to load older passdown notes: {page}")
+                return
+            state["exhausted"] = len(page) < page_size
+            prepend_notes(page)
+        
+        def load_older():
+            if state["loading_older"] or state["exhausted"] or state["oldest"] is None: return
+            state["loading_older"] = True
+            self._run_in_background(self.manager.get_passdown_notes, on_older_page, page_size, state["oldest"])
+        
+        def on_scroll(first, last):
+            note_display.vbar.set(first, last)
+            if float(first) <= 0.0: load_older()
+        note_display.configure(yscrollcommand=on_scroll)
+        
+        def schedule_tail():
+            state["tail_job"] = self.root.after(self.auto_refresh_interval_ms, poll_tail)
+        
+        def poll_tail():
+            if pd_win.winfo_exists():
+                self._run_in_background(self.manager.get_passdown_notes_since, on_tail, state["newest"])
+        
+        def on_tail(success, notes):
+            if not pd_win.winfo_exists(): return
+            if success: append_notes(notes)
+            else: self.logger.warning(f"Passdown live update failed: {notes}")
+            schedule_tail()
+        
+        def on_saved(success, note):
+            if not pd_win.winfo_exists(): return
+            add_button.config(state="normal")
+            if not success:
+                messagebox.showerror("Database Error", f"Could not save the note.\n\nError: {note}", parent=pd_win)
+                return
+            new_note.delete(0, tk.END)
+            append_notes([note])
+            note_display.see(tk.END)
+        
+        def save_note(event=None):
             val = new_note.get().strip()
-            if val:
-                self.manager.add_passdown_note(self.current_user, val)
-                pd_win.destroy()
-                self.open_passdown_notes() # Refresh instantly
-                
-        ttk.Button(input_frame, text="Add Note", command=save_note).pack(side="right")
-
-    def view_call_history(self):
-        if not self.table.selection(): return
-        report_id = self.table.item(self.table.selection()[0])["values"][0]
-        self._run_in_thread(self.manager.get_history_for_call, lambda s, r: self._on_history_fetched(s, r, report_id), report_id)
-
-    def _on_history_fetched(self, success, records, report_id):
+            if val and str(add_button.cget("state")) != "disabled":
+                add_button.config(state="disabled")
+                self._run_in_thread(self.manager.add_passdown_note, on_saved, self.current_user, val)
+        add_button.config(command=save_note)
+        new_note.bind("<Return>", save_note)
+        
+        def on_destroy(event):
+            if event.widget is pd_win and state["tail_job"]: self.root.after_cancel(state["tail_job"])
+        pd_win.bind("<Destroy>", on_destroy)
+        
+        self._run_in_background(self.manager.get_passdown_notes, on_first_page, page_size)
+
+    def view_call_history(self, report_id=None):
+        """
+        Newest page first, older pages fetched when scrolled to the bottom, and new rows
+        tailed by HistoryID. Every open history window is served by the same poll.
+        Defaults to the selected call; calls from past events are read from their own shard.
+        """
+        if report_id is None:
+            if not self.table.selection(): return
+            report_id = self.table.item(self.table.selection()[0])["values"][0]
+        existing = self.history_viewers.get(report_id)
+        if existing and existing["window"].winfo_exists():
+            existing["window"].deiconify()
+            existing["window"].lift()
+            return
+        
         history_window = tk.Toplevel(self.root)
         history_window.title(f"History for Call {report_id}")
-        history_text = scrolledtext.ScrolledText(history_window, width=80, height=20, state="normal")
+        history_text = scrolledtext.ScrolledText(history_window, width=80, height=20, state="disabled")
         history_text.pack(padx=10, pady=10, expand=True, fill='both')
-        if not success or not records: history_text.insert(tk.END, "No history found.")
+        
+        page_size = 100
+        viewer = {"window": history_window, "newest": None, "oldest": None, "shown": set(), "loading_older": True, "exhausted": False}
+        self.history_viewers[report_id] = viewer
+        
+        def format_record(record):
+            details = f" | Details: {record['Details']}" if record['Details'] else ""
+            return f"[{record['Timestamp']}] User: {record['User']} | Action: {record['Action']}{details}\n"
+        
+        def track(records):
+            fresh = [r for r in records if r['HistoryID'] not in viewer["shown"]]
+            for r in fresh:
+                viewer["shown"].add(r['HistoryID'])
+                viewer["newest"] = max(viewer["newest"] or 0, r['HistoryID'])
+                viewer["oldest"] = r['HistoryID'] if viewer["oldest"] is None else min(viewer["oldest"], r['HistoryID'])
+            return fresh
+        
+        def add_newer(records):
+            """New rows go on top (oldest-first input); the view stays put unless already at the top."""
+            fresh = track(records)
+            if not fresh: return
+            at_top = history_text.yview()[0] <= 0.0
+            text = "".join(format_record(r) for r in reversed(fresh))
+            top_line = int(history_text.index("@0,0").split(".")[0])
+            history_text.configure(state="normal")
+            if history_text.get("1.0", "1.end") == "No history found.": history_text.delete("1.0", "2.0")
+            history_text.insert("1.0", text)
+            history_text.configure(state="disabled")
+            if not at_top: history_text.yview(f"{top_line + text.count(chr(10))}.0")
+        
+        def add_older(page):
+            fresh = track(page)
+            if not fresh: return
+            history_text.configure(state="normal")
+            history_text.insert(tk.END, "".join(format_record(r) for r in fresh))
+            history_text.configure(state="disabled")
+        
+        def on_first_page(success, result):
+            if not history_window.winfo_exists(): return
+            viewer["loading_older"] = False
+            if not success:
+                self.logger.error(f"Failed to load history for {report_id}: {result}")
+                history_text.configure(state="normal")
+                history_text.insert(tk.END, "No history found.")
+                history_text.configure(state="disabled")
+                return
+            head_id, page = result
+            viewer["exhausted"] = len(page) < page_size
+            add_older(page)
+            if not page:
+                history_text.configure(state="normal")
+                history_text.insert(tk.END, "No history found.")
+                history_text.configure(state="disabled")
+            viewer["newest"] = max(viewer["newest"] or 0, head_id) # Tail from the head at open, not from this call's last row
+            self._start_history_tail()
+        
+        def on_older_page(success, page):
+            if not history_window.winfo_exists(): return
+            viewer["loading_older"] = False
+            if not success:
+                self.logger.error(f"Failed to load older history for {report_id}: {page}")
+                return
+            viewer["exhausted"] = len(page) < page_size
+            add_older(page)
+        
+        def on_scroll(first, last):
+            history_text.vbar.set(first, last)
+            if float(last) >= 1.0 and not (viewer["loading_older"] or viewer["exhausted"] or viewer["oldest"] is None):
+                viewer["loading_older"] = True
+                self._run_in_background(self.manager.get_history_for_call, on_older_page, report_id, page_size, viewer["oldest"])
+        history_text.configure(yscrollcommand=on_scroll)
+        
+        def on_destroy(event):
+            if event.widget is history_window and self.history_viewers.get(report_id) is viewer: del self.history_viewers[report_id]
+        history_window.bind("<Destroy>", on_destroy)
+        viewer["add_newer"] = add_newer
+        
+        def first_page():
+            head_id = self.manager.check_if_updated() # Read before the page, so nothing written in between is missed
+            return head_id, self.manager.get_history_for_call(report_id, page_size)
+        self._run_in_background(first_page, on_first_page)
+
+    def _start_history_tail(self):
+        """One poll for every open history window; it stops itself once the last one closes."""
+        if getattr(self, '_history_tail_job', None) is None:
+            self._history_tail_job = self.root.after(self.auto_refresh_interval_ms, self._history_tail_task)
+
+    def _history_tail_task(self):
+        self._history_tail_job = None
+        viewers = {rid: v for rid, v in self.history_viewers.items() if v["window"].winfo_exists() and v["newest"] is not None}
+        if not viewers:
+            if self.history_viewers: self._start_history_tail() # Windows still loading their first page
+            return
+        after_id = min(v["newest"] for v in viewers.values())
+        self._run_in_background(self.manager.get_history_since, lambda s, r: self._on_history_tail(s, r, viewers), after_id, list(viewers))
+
+    def _on_history_tail(self, success, records, viewers):
+        if not success: self.logger.warning(f"History live update failed: {records}")
         else:
-            for record in records:
-                details = f" | Details: {record['Details']}" if record['Details'] else ""
-                history_text.insert(tk.END, f"[{record['Timestamp']}] User: {record['User']} | Action: {record['Action']}{details}\n")
-        history_text.configure(state="disabled")
+            by_call = {}
+            for record in records: by_call.setdefault(record['CallID'], []).append(record)
+            for report_id, viewer in viewers.items():
+                if not viewer["window"].winfo_exists(): continue
+                if report_id in by_call: viewer["add_newer"](by_call[report_id])
+                # Every polled call is complete up to the newest row returned, so all of them can move their cursor
+                if records: viewer["newest"] = max(viewer["newest"], records[-1]['HistoryID'])
+        if self.history_viewers: self._start_history_tail()
+
+    def open_past_events(self):
+        """Searches earlier events' databases (attached read-only) and exports a per-event comparison."""
+        if not self.manager: return
+        if not self.manager.past_shards:
+            messagebox.showinfo("Past Events", "No earlier events found. Set shard_by_event = true under [DATABASE] in config.ini to keep each event in its own file.")
+            return
+        past_win = tk.Toplevel(self.root)
+        past_win.title("Search Past Events")
+        past_win.geometry("1100x450")
+
+        search_frame = ttk.Frame(past_win)
+        search_frame.pack(fill='x', padx=10, pady=(10, 0))
+        term_var = tk.StringVar()
+        term_entry = ttk.Entry(search_frame, textvariable=term_var, width=40)
+        term_entry.pack(side='left')
+        term_entry.focus_set()
+        status_var = tk.StringVar(value=f"Events on file: {', '.join(self.manager.past_shards)}")
+
+        columns = {"Event": ("Event", 70), "ReportID": ("Call ID", 90), "CallDate": ("Date", 90), "CallTime": ("Time", 60), "Code": ("Code", 130),
+                   "Location": ("Location", 150), "Caller": ("Caller", 110), "Description": ("Description", 400)}
+        results = ttk.Treeview(past_win, columns=list(columns), show="headings")
+        for col, (heading, width) in columns.items():
+            results.heading(col, text=heading)
+            results.column(col, width=width, anchor="w" if col == "Description" else "center")
+        results.pack(fill='both', expand=True, padx=10, pady=10)
+        ttk.Label(past_win, textvariable=status_var).pack(anchor="w", padx=10, pady=(0, 10))
+
+        def on_results(success, rows):
+            if not past_win.winfo_exists(): return
+            if not success:
+                status_var.set(f"Search failed: {rows}")
+                return
+            results.delete(*results.get_children())
+            for row in rows: results.insert("", tk.END, values=[self._sanitize_for_tkinter(row[col] or "") for col in columns])
+            status_var.set(f"{len(rows)} matching call(s)." + ("  Double-click a call for its history." if self.current_user_role == 'admin' else ""))
+
+        def search(event=None):
+            term = term_var.get().strip()
+            if term: self._run_in_thread(self.manager.search_past_events, on_results, term)
+
+        def on_double_click(event):
+            if self.current_user_role == 'admin' and results.selection():
+                self.view_call_history(results.item(results.selection()[0])["values"][1])
+
+        def export_summary():
+            filename = filedialog.asksaveasfilename(parent=past_win, defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title="Export Event Comparison")
+            if filename: self._run_in_thread(self.manager.get_event_summaries, lambda s, r: self._on_export_data_fetched(s, r, filename))
+
+        term_entry.bind("<Return>", search)
+        results.bind("<Double-1>", on_double_click)
+        ttk.Button(search_frame, text="Search", command=search).pack(side='left', padx=5)
+        ttk.Button(search_frame, text="Export Event Comparison to CSV", command=export_summary).pack(side='right')
+
+    def open_diagnostics(self):
+        """Live DB timing percentiles from the opt-in instrumentation layer."""
+        timing = getattr(self.manager, "instrumentation", None)
+        diag_win = tk.Toplevel(self.root)
+        diag_win.title("Diagnostics - Database Timing")
+        diag_win.geometry("950x350")
+        if not timing:
+            ttk.Label(diag_win, text="DB timing is off. Set 'enabled = true' under [DIAGNOSTICS] in config.ini and restart.", padding=20).pack()
+            return
+        from data_manager import RETRY_COUNTS
+        
+        columns = ("Operation", "Calls", "Errors", "p50 ms", "p95 ms", "p99 ms", "Max ms", "Lock p95 ms", "Avg Rows", "Avg KB")
+        diag_table = ttk.Treeview(diag_win, columns=columns, show="headings")
+        for col in columns:
+            diag_table.heading(col, text=col)
+            diag_table.column(col, width=180 if col == "Operation" else 80, anchor="w" if col == "Operation" else "e")
+        diag_table.pack(fill='both', expand=True, padx=10, pady=10)
+        retries_var = tk.StringVar()
+        ttk.Label(diag_win, textvariable=retries_var).pack(anchor="w", padx=10, pady=(0, 10))
+        
+        def refresh():
+            try:
+                if not diag_win.winfo_exists(): return
+            except tk.TclError: return
+            diag_table.delete(*diag_table.get_children())
+            for op, st in timing.snapshot().items():
+                diag_table.insert("", tk.END, values=(op, st['calls'], st['errors'], f"{st['p50_ms']:.1f}", f"{st['p95_ms']:.1f}", f"{st['p99_ms']:.1f}",
+                                                      f"{st['max_ms']:.1f}", f"{st['lock_p95_ms']:.1f}", f"{st['avg_rows']:.0f}", f"{st['avg_kb']:.1f}"))
+            retries = ", ".join(f"{name}={count}" for name, count in RETRY_COUNTS.items()) or "none"
+            retries_var.set(f"Lock retries since startup: {retries}   |   Percentiles cover the last {timing.window} calls per operation.")
+            diag_win.after(2000, refresh)
+        refresh()
 
     def on_close(self):
         if self.is_dirty and not messagebox.askyesno("Exit", "Are you sure you want to exit?"): return
+        pending = self.manager.journal.pending_count if self.manager and self.manager.journal else 0
+        if pending and not messagebox.askyesno("Exit", f"{pending} offline save(s) haven't reached the shared database yet.\nThey stay on this laptop and are sent the next time it starts.\n\nExit anyway?"): return
         if hasattr(self, '_auto_refresh_job'): self.root.after_cancel(self._auto_refresh_job)
+        if hasattr(self, '_dashboard_job'): self.root.after_cancel(self._dashboard_job)
+        if hasattr(self, '_archive_job'): self.root.after_cancel(self._archive_job)
+        if hasattr(self, '_audit_job'): self.root.after_cancel(self._audit_job)
+        if getattr(self, '_history_tail_job', None): self.root.after_cancel(self._history_tail_job)
+        if hasattr(self, '_log_drain_job'): self.root.after_cancel(self._log_drain_job)
+        if hasattr(self, '_wallboard_job'): self.root.after_cancel(self._wallboard_job)
+        if hasattr(self, '_offline_replay_job'): self.root.after_cancel(self._offline_replay_job)
+        if hasattr(self, 'gui_log_handler'): self.logger.removeHandler(self.gui_log_handler)
+        if hasattr(self, 'config_watcher'): self.config_watcher.stop()
         self.executor.shutdown(wait=False)
         self.ipc_executor.shutdown(wait=False)
-        self.manager.close()
+        if self.manager: self.manager.close()
+        else: self._manager_future.add_done_callback(lambda future: future.exception() or future.result().close())
         self.root.destroy()
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""
+INSTRUMENTATION.PY
+Opt-in per-operation timing for DataManager and the Discord Bot's database calls.
+Records wall time, lock-wait time (queueing for the write lock in data_manager.begin_write,
+failed 'locked' attempts and sqlite_retry sleeps), rows returned and approximate bytes
+fetched. Keeps a rolling window per operation in memory and periodically writes a
+percentile summary to the log.
+
+Nothing is wrapped unless [DIAGNOSTICS] enabled = true, so the disabled path costs nothing.
+"""
+import math
+import threading
+import time
+from collections import deque
+from functools import wraps
+from data_manager import lock_wait_seconds
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values: return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def _value_bytes(value):
+    if value is None: return 0
+    if isinstance(value, (str, bytes)): return len(value)
+    return 8
+
+def measure_result(result):
+    """Returns (rows, approx_bytes) for whatever a DataManager method handed back."""
+    if isinstance(result, list):
+        rows, nbytes = len(result), 0
+        for row in result:
+            nbytes += sum(_value_bytes(v) for v in (row.values() if isinstance(row, dict) else row))
+        return rows, nbytes
+    if isinstance(result, dict): return 1, sum(_value_bytes(v) for v in result.values())
+    if hasattr(result, "keys"): return 1, sum(_value_bytes(v) for v in result) # sqlite3.Row
+    return 0, 0
+
+class _Span:
+    """Context manager for ad-hoc timing (used by the Discord Bot around its own queries)."""
+    def __init__(self, instrumentation, op):
+        self.instrumentation = instrumentation
+        self.op = op
+        self.rows = 0
+        self.nbytes = 0
+
+    def record_rows(self, result):
+        rows, nbytes = measure_result(result)
+        self.rows += rows
+        self.nbytes += nbytes
+        return result
+
+    def __enter__(self):
+        self.wait_before = lock_wait_seconds()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.instrumentation.record(self.op, time.perf_counter() - self.started, lock_wait_seconds() - self.wait_before,
+                                    self.rows, self.nbytes, error=exc_type is not None)
+        return False
+
+class _NullSpan:
+    def __enter__(self): return self
+    def __exit__(self, exc_type, exc, tb): return False
+    def record_rows(self, result): return result
+
+NULL_SPAN = _NullSpan()
+
+class Instrumentation:
+    def __init__(self, window=1000, summary_seconds=300, emit=None):
+        """emit: callable taking one summary line (logger.info in the GUI, print in the bot)."""
+        self.window = window
+        self.summary_seconds = summary_seconds
+        self.emit = emit
+        self.started = time.time()
+        self._samples = {} # op -> deque of (wall, lock_wait, rows, bytes)
+        self._totals = {} # op -> [calls, errors]
+        self._lock = threading.Lock()
+        self._active = threading.local() # Depth of wrapped calls on this thread; only the outermost is recorded
+        self._next_summary = time.monotonic() + summary_seconds
+
+    def record(self, op, wall, lock_wait=0.0, rows=0, nbytes=0, error=False):
+        with self._lock:
+            samples = self._samples.get(op)
+            if samples is None:
+                samples = self._samples[op] = deque(maxlen=self.window)
+                self._totals[op] = [0, 0]
+            samples.append((wall, lock_wait, rows, nbytes))
+            totals = self._totals[op]
+            totals[0] += 1
+            if error: totals[1] += 1
+        if self.emit and time.monotonic() >= self._next_summary:
+            self._next_summary = time.monotonic() + self.summary_seconds
+            self.log_summary()
+
+    def span(self, op):
+        return _Span(self, op)
+
+    def snapshot(self):
+        """Percentiles over the rolling window, per operation, slowest p95 first."""
+        with self._lock:
+            data = {op: (list(samples), list(self._totals[op])) for op, samples in self._samples.items()}
+        stats = {}
+        for op, (samples, (calls, errors)) in data.items():
+            walls = sorted(s[0] for s in samples)
+            waits = sorted(s[1] for s in samples)
+            n = len(samples)
+            stats[op] = {
+                "calls": calls, "errors": errors, "window": n,
+                "p50_ms": percentile(walls, 50) * 1000, "p95_ms": percentile(walls, 95) * 1000,
+                "p99_ms": percentile(walls, 99) * 1000, "max_ms": walls[-1] * 1000,
+                "lock_p95_ms": percentile(waits, 95) * 1000,
+                "avg_rows": sum(s[2] for s in samples) / n, "avg_kb": sum(s[3] for s in samples) / n / 1024,
+            }
+        return dict(sorted(stats.items(), key=lambda kv: -kv[1]["p95_ms"]))
+
+    def summary_lines(self):
+        return [f"{op}: n={s['calls']} err={s['errors']} p50={s['p50_ms']:.1f}ms p95={s['p95_ms']:.1f}ms "
+                f"p99={s['p99_ms']:.1f}ms max={s['max_ms']:.1f}ms lock_p95={s['lock_p95_ms']:.1f}ms "
+                f"rows~{s['avg_rows']:.0f} kb~{s['avg_kb']:.1f}" for op, s in self.snapshot().items()]
+
+    def log_summary(self):
+        lines = self.summary_lines()
+        if not lines or not self.emit: return
+        self.emit(f"DB timing summary (last {self.window} calls per operation):")
+        for line in lines: self.emit(f"  {line}")
+
+    def instrument(self, manager):
+        """
+        Replaces the public methods of one DataManager instance with timed wrappers.
+        A public method called from inside another (add_call's duplicate check) counts toward the outer one only.
+        """
+        for name in dir(type(manager)):
+            if name.startswith("_") or name == "close": continue
+            method = getattr(manager, name)
+            if callable(method): setattr(manager, name, self._wrap(name, method))
+        manager.instrumentation = self
+        return manager
+
+    def _wrap(self, op, method):
+        record, active = self.record, self._active
+        @wraps(method)
+        def timed(*args, **kwargs):
+            if getattr(active, "depth", 0): return method(*args, **kwargs)
+            wait_before = lock_wait_seconds()
+            started = time.perf_counter()
+            active.depth = 1
+            try:
+                result = method(*args, **kwargs)
+            except Exception:
+                record(op, time.perf_counter() - started, lock_wait_seconds() - wait_before, error=True)
+                raise
+            finally:
+                active.depth = 0
+            wall = time.perf_counter() - started
+            rows, nbytes = measure_result(result)
+            record(op, wall, lock_wait_seconds() - wait_before, rows, nbytes)
+            return result
+        return timed
+
+def from_config(config, emit=None):
+    """Returns an Instrumentation if [DIAGNOSTICS] enabled = true, else None."""
+    if not config.getboolean('DIAGNOSTICS', 'enabled', fallback=False): return None
+    return Instrumentation(
+        window=config.getint('DIAGNOSTICS', 'window', fallback=1000),
+        summary_seconds=config.getint('DIAGNOSTICS', 'summary_minutes', fallback=5) * 60,
+        emit=emit,
+    )
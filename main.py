@@ -2,19 +2,29 @@
 MAIN.PY
 Entry point for the HQ Dispatch System. 
 Initializes background error logging, reads the config, and boots the Tkinter GUI.
+"main.py --wallboard" boots the read-only HQ status display instead (no login, no database).
+The shared database is opened on a background thread while Tk and the GUI load, and
+the heavy UI modules are only imported once logging is up, so every phase is timed.
 """
-import tkinter as tk
-from gui import DispatchCallApp
-from data_manager import DataManager
+from startup import PhaseTimer
+STARTUP_TIMER = PhaseTimer() # Started before anything heavy is imported
+
+from concurrent.futures import ThreadPoolExecutor
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import os
+import queue
 import sys
 import configparser
 import traceback
 
 def setup_logging():
-    """Sets up a rotating log file to catch background crashes silently."""
+    """
+    Sets up a rotating log file to catch background crashes silently.
+    Loggers only enqueue records; a QueueListener thread does the file writes (and rotation),
+    so no caller, the Tk thread included, ever waits on disk I/O to log.
+    """
     try:
         log_dir = "logs"
         if not os.path.exists(log_dir):
@@ -31,7 +41,12 @@ def setup_logging():
         # Keep the last 5 logs, max 1MB each
         handler = RotatingFileHandler(log_file, maxBytes=1024*1024, backupCount=5, encoding='utf-8')
         handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-        logger.addHandler(handler)
+        
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(QueueHandler(log_queue))
+        listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop) # Flushes whatever is still queued on the way out
         
         return logger
     except Exception as e:
@@ -44,21 +59,59 @@ if __name__ == "__main__":
         sys.exit(1)
         
     app_logger.info("Application starting up.")
+    STARTUP_TIMER.mark("logging")
     
     try:
         config = configparser.ConfigParser()
         config.read('config.ini')
+        STARTUP_TIMER.mark("config")
+        
+        if "--wallboard" in sys.argv[1:]:
+            import tkinter as tk
+            from wallboard import WallboardApp
+            root = tk.Tk()
+            WallboardApp(root, config, app_logger)
+            app_logger.info("Wallboard mode started.")
+            root.mainloop()
+            sys.exit(0)
+        
+        def open_data_manager():
+            # The database modules (and sqlite3) are imported here, on the DBOpen thread, off the cold-start path
+            from data_manager import DataManager
+            import instrumentation
+            import shards
+            # Load the database path from config.ini (Crucial for Network Drive SMB sharing)
+            # This event's database (dispatch_DC26.db with [DATABASE] shard_by_event, else the filename as-is)
+            db_file = shards.live_path(config)
+            # Cold partition for the history of long-closed calls (defaults to <database>_archive.db next to the DB)
+            archive_file = shards.archive_path(config, db_file)
+            data_manager = DataManager(db_file, archive_file, audit_key=config.get('AUDIT', 'signing_key', fallback='').strip(),
+                                       past_shards=shards.past_shards(config, db_file),
+                                       journal_filename=config.get('OFFLINE', 'journal_file', fallback='').strip() or None,
+                                       duplicate_window_minutes=config.getint('DUPLICATES', 'window_minutes', fallback=20))
+            # Opt-in DB timing ([DIAGNOSTICS] enabled = true). Off means DataManager is left untouched.
+            timing = instrumentation.from_config(config, emit=app_logger.info)
+            if timing:
+                timing.instrument(data_manager)
+                app_logger.info("DB timing instrumentation enabled.")
+            return data_manager
+        
+        # Connecting + schema checks over SMB run in parallel with Tk startup and the login prompt
+        db_opener = ThreadPoolExecutor(max_workers=1, thread_name_prefix="DBOpen")
+        data_manager_future = db_opener.submit(open_data_manager)
+        db_opener.shutdown(wait=False)
         
-        # Load the database path from config.ini (Crucial for Network Drive SMB sharing)
-        db_file = config.get('DATABASE', 'filename', fallback='dispatch.db')
-        data_manager = DataManager(db_file)
+        import tkinter as tk
+        from gui import DispatchCallApp
+        STARTUP_TIMER.mark("import_ui")
         
         # Hide the blank default Tkinter window, we use our custom one in gui.py
         root = tk.Tk()
         root.withdraw()
+        STARTUP_TIMER.mark("tk_root")
         
         # Boot the main application
-        app = DispatchCallApp(root, app_logger, data_manager)
+        app = DispatchCallApp(root, app_logger, data_manager_future, startup_timer=STARTUP_TIMER)
         
         # Only start the main UI loop if the user successfully logged in
         if app.current_user:
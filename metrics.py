@@ -0,0 +1,137 @@
+"""
+METRICS.PY
+Minimal in-memory metrics for the Discord Bot's /metrics endpoint (Prometheus text format 0.0.4).
+Counters, gauges and fixed-bucket histograms are updated where things happen and only
+rendered on scrape, so a scrape never touches the database or Discord.
+No prometheus_client dependency: the bot ships as a single PyInstaller exe.
+"""
+import bisect
+import threading
+import time
+from collections import deque
+
+# Seconds; covers a local IPC ping (~1ms) up to a 20s SQLite busy timeout
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, values):
+    if not names: return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+def _number(value):
+    if value == float("inf"): return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = "untyped"
+    def __init__(self, registry, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock() # Observed from the event loop and from to_thread DB work
+        registry.append(self)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+class _Value(_Metric):
+    """
+    Samples kept here, or produced by a function read at scrape time (for numbers the bot
+    already tracks elsewhere, e.g. API_CALLS). A function returns a number, or a dict of
+    label value (or tuple of them) -> number.
+    """
+    def __init__(self, registry, name, help_text, labels=(), function=None):
+        super().__init__(registry, name, help_text, labels)
+        self._values = {}
+        self.function = function
+
+    def render(self):
+        if self.function:
+            produced = self.function()
+            items = sorted(produced.items()) if isinstance(produced, dict) else [((), produced)]
+        else:
+            with self._lock: items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.label_names, key if isinstance(key, tuple) else (key,))} {_number(value)}"
+                                for key, value in items if value is not None]
+
+class Counter(_Value):
+    kind = "counter"
+    def inc(self, *label_values, amount=1):
+        with self._lock: self._values[label_values] = self._values.get(label_values, 0) + amount
+
+class Gauge(_Value):
+    kind = "gauge"
+    def set(self, value, *label_values):
+        with self._lock: self._values[label_values] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+    def __init__(self, registry, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {} # label values -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, seconds, *label_values):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.setdefault(label_values, [0] * (len(self.buckets) + 1) + [0.0])
+            series[index] += 1
+            series[-1] += seconds
+
+    def time(self, *label_values):
+        return _Timer(self, label_values)
+
+    def render(self):
+        with self._lock: items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = self.header()
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.label_names + ('le',), key + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {series[-1]!r}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+class _Timer:
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+        return False
+
+class RecentRate:
+    """Events in the last window_seconds (e.g. messages logged in the last minute)."""
+    def __init__(self, window_seconds=60):
+        self.window_seconds = window_seconds
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def mark(self):
+        now = time.monotonic()
+        with self._lock:
+            self._events.append(now)
+            self._prune(now)
+
+    def count(self):
+        with self._lock:
+            self._prune(time.monotonic())
+            return len(self._events)
+
+    def _prune(self, now):
+        cutoff = now - self.window_seconds
+        while self._events and self._events[0] < cutoff: self._events.popleft()
+
+def render(registry):
+    """The whole registry as one Prometheus text exposition."""
+    lines = []
+    for metric in registry: lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
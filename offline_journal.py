@@ -0,0 +1,132 @@
+"""
+OFFLINE_JOURNAL.PY
+Local write-ahead queue for when the shared database can't be reached.
+If the SMB share drops, add_call/modify_call commit here instead (a small SQLite file
+on this laptop's own disk) and return at once; new calls get provisional IDs such as
+DC26-P0003. Every later write queues behind them, so the share sees them in order.
+
+DataManager.replay_journal() pushes entries to the share oldest first once it answers
+again. Each queued call carries a unique OfflineKey, so a replay interrupted between the
+shared commit and the local delete can't create the call twice.
+"""
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+
+# sqlite3.OperationalError texts that mean "the share isn't answering" rather than a bad query.
+# "database is locked" is not one: that's another laptop writing, which sqlite_retry waits out.
+CONNECTIVITY_ERRORS = ("disk i/o error", "unable to open database", "network", "no such device")
+
+# What modify_call returns for a save queued here instead of written to the share
+JOURNALED = "journaled"
+
+def is_connectivity_error(exc):
+    return isinstance(exc, sqlite3.OperationalError) and any(text in str(exc).lower() for text in CONNECTIVITY_ERRORS)
+
+def is_provisional(report_id):
+    """Provisional IDs look like DC26-P0003: the usual prefix, then P and this laptop's journal number."""
+    parts = str(report_id).split("-")
+    return len(parts) == 2 and parts[1].startswith("P")
+
+class OfflineJournal:
+    def __init__(self, path, db_filename, call_id_prefix):
+        folder = os.path.dirname(path)
+        if folder: os.makedirs(folder, exist_ok=True)
+        self.database = os.path.abspath(db_filename) # Entries only ever replay into the database they were meant for
+        self.call_id_prefix = call_id_prefix
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            self.conn.execute("PRAGMA synchronous=FULL;") # Local disk; a queued call must survive a power cut
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS pending_writes (
+                    Seq INTEGER PRIMARY KEY AUTOINCREMENT, Database TEXT, Op TEXT, ReportID TEXT,
+                    Payload TEXT, Original TEXT, User TEXT, EnteredAt TEXT, OfflineKey TEXT,
+                    Status TEXT DEFAULT 'pending', Error TEXT
+                )
+            """)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS id_map (ProvisionalID TEXT PRIMARY KEY, ReportID TEXT)")
+        self.pending_count = self._count("pending")
+        self.failed_count = self._count("failed")
+
+    def _count(self, status):
+        return self.conn.execute("SELECT COUNT(*) FROM pending_writes WHERE Database = ? AND Status = ?", (self.database, status)).fetchone()[0]
+
+    def queue_add(self, call, user, entered_at):
+        """Returns the provisional ReportID shown until the call reaches the share."""
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO pending_writes (Database, Op, Payload, User, EnteredAt, OfflineKey) VALUES (?, 'add', ?, ?, ?, ?)",
+                (self.database, json.dumps(call), user, entered_at, f"{socket.gethostname()}:{uuid.uuid4().hex}")
+            )
+            report_id = f"{self.call_id_prefix}-P{cursor.lastrowid:04d}"
+            self.conn.execute("UPDATE pending_writes SET ReportID = ? WHERE Seq = ?", (report_id, cursor.lastrowid))
+        self.pending_count += 1
+        return report_id
+
+    def queue_modify(self, report_id, updated_call, user, original, entered_at):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO pending_writes (Database, Op, ReportID, Payload, Original, User, EnteredAt) VALUES (?, 'modify', ?, ?, ?, ?, ?)",
+                (self.database, self.resolve(report_id), json.dumps(updated_call), json.dumps(dict(original)) if original else None, user, entered_at)
+            )
+        self.pending_count += 1
+        return JOURNALED
+
+    def pending(self, limit=50):
+        """Oldest first, with provisional IDs already swapped for real ones where the add has replayed."""
+        rows = self.conn.execute("SELECT * FROM pending_writes WHERE Database = ? AND Status = 'pending' ORDER BY Seq LIMIT ?",
+                                 (self.database, limit)).fetchall()
+        entries = []
+        for row in rows:
+            entry = dict(row)
+            entry["Payload"] = json.loads(row["Payload"])
+            entry["Original"] = json.loads(row["Original"]) if row["Original"] else None
+            entries.append(entry)
+        return entries
+
+    def complete(self, entry, report_id=None):
+        """Drops a replayed entry. For an add, maps its provisional ID to report_id for the entries queued behind it."""
+        with self.conn:
+            self.conn.execute("DELETE FROM pending_writes WHERE Seq = ?", (entry["Seq"],))
+            if entry["Op"] == "add":
+                self.conn.execute("INSERT OR REPLACE INTO id_map (ProvisionalID, ReportID) VALUES (?, ?)", (entry["ReportID"], report_id))
+                self.conn.execute("UPDATE pending_writes SET ReportID = ? WHERE ReportID = ? AND Status = 'pending'", (report_id, entry["ReportID"]))
+        self.pending_count -= 1
+
+    def fail(self, entry, error):
+        """Parks an entry the share rejected for good (e.g. the call was removed), so it can't block the queue."""
+        with self.conn:
+            self.conn.execute("UPDATE pending_writes SET Status = 'failed', Error = ? WHERE Seq = ?", (str(error), entry["Seq"]))
+        self.pending_count -= 1
+        self.failed_count += 1
+
+    def resolve(self, report_id):
+        """Real ReportID for a provisional one that has replayed; anything else is returned unchanged."""
+        if not is_provisional(report_id): return report_id
+        row = self.conn.execute("SELECT ReportID FROM id_map WHERE ProvisionalID = ?", (report_id,)).fetchone()
+        return row[0] if row else report_id
+
+    def pending_calls(self):
+        """
+        Calls created offline and not yet replayed, as dicts shaped like a calls row, with the
+        modifies queued behind them applied, so the table and edit form can show them.
+        """
+        calls = {}
+        for row in self.conn.execute("SELECT * FROM pending_writes WHERE Database = ? AND Status = 'pending' ORDER BY Seq", (self.database,)):
+            payload = json.loads(row["Payload"])
+            if row["Op"] == "add":
+                entered = time.strptime(row["EnteredAt"], "%Y-%m-%d %H:%M:%S")
+                calls[row["ReportID"]] = dict(payload, ReportID=row["ReportID"], CallDate=time.strftime("%Y-%m-%d", entered),
+                                              CallTime=time.strftime("%H:%M", entered), CreatedEpoch=int(time.mktime(entered)),
+                                              CreatedBy=row["User"], ModifiedBy="", ResolutionStatus=False, ResolvedBy="", ResolutionTimestamp="",
+                                              AnsweredStatus=False, AnsweredBy="", AnsweredTimestamp="", Cancelled=payload.get("Cancelled", False), Version=0)
+            elif row["ReportID"] in calls:
+                calls[row["ReportID"]].update(payload, ModifiedBy=row["User"])
+        return list(calls.values())
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,164 @@
+"""
+ROLLUPS.PY
+Per-minute, per-Code counters for SLA and volume trends, kept in call_rollups.
+DataManager bumps them in the same transaction as the call change that caused them,
+so trend questions ("which hour had peak Blue calls", "how did time-to-resolve
+degrade between 2 and 4 pm") read O(minutes) rows instead of re-deriving every call.
+
+Events are recorded in the minute they happened. The open backlog is stored as
++1/-1 deltas (opened, closed, reopened, re-coded) and summed into a running total
+when read, so no past row ever has to be rewritten.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+SUM_COLUMNS = ("Opened", "Resolved", "Cancelled", "Reopened", "BacklogDelta", "AnsweredCount", "AnswerSeconds", "ResolveSeconds")
+MAX_COLUMNS = ("AnswerMaxSeconds", "ResolveMaxSeconds")
+COLUMNS = SUM_COLUMNS + MAX_COLUMNS
+
+_UPSERT = f"""
+    INSERT INTO call_rollups (Minute, Code, {', '.join(COLUMNS)}) VALUES (?, ?, {', '.join('?' * len(COLUMNS))})
+    ON CONFLICT(Minute, Code) DO UPDATE SET
+    {', '.join(f'{c} = {c} + excluded.{c}' for c in SUM_COLUMNS)},
+    {', '.join(f'{c} = MAX({c}, excluded.{c})' for c in MAX_COLUMNS)}
+"""
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true')
+
+def ensure_schema(conn):
+    """Creates call_rollups. Returns True if it didn't exist yet (the caller should rebuild it once)."""
+    existed = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'call_rollups'").fetchone()
+    with conn:
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS call_rollups (
+                Minute INTEGER NOT NULL, Code TEXT NOT NULL,
+                {', '.join(f'{c} INTEGER NOT NULL DEFAULT 0' for c in COLUMNS)},
+                PRIMARY KEY (Minute, Code)
+            ) WITHOUT ROWID
+        """)
+    return not existed
+
+def record(conn, epoch, code, **deltas):
+    """Adds deltas to the (minute, code) row. Runs inside the caller's transaction."""
+    conn.execute(_UPSERT, (int(epoch) // 60 * 60, code or "", *(deltas.get(c, 0) for c in COLUMNS)))
+
+def record_new_call(conn, created_epoch, code, cancelled=False):
+    record(conn, created_epoch, code, Opened=1, Cancelled=int(bool(cancelled)), BacklogDelta=0 if cancelled else 1)
+
+def record_change(conn, original, updated, now_epoch, answered_now=False):
+    """Rollup events for one modify_call: resolve/cancel/reopen transitions, re-codes and first answer."""
+    was_open = not (_flag(original.get('ResolutionStatus')) or _flag(original.get('Cancelled')))
+    now_open = not (_flag(updated.get('ResolutionStatus')) or _flag(updated.get('Cancelled')))
+    old_code, new_code = original.get('Code') or "", updated.get('Code') or ""
+    created = original.get('CreatedEpoch')
+    age = max(0, now_epoch - created) if created else 0
+
+    events = defaultdict(lambda: defaultdict(int))
+    # Backlog: the call leaves its old code's backlog if it was open and joins the new one if it still is
+    if was_open: events[old_code]["BacklogDelta"] -= 1
+    if now_open: events[new_code]["BacklogDelta"] += 1
+    if now_open and not was_open: events[new_code]["Reopened"] += 1
+    if _flag(updated.get('ResolutionStatus')) and not _flag(original.get('ResolutionStatus')):
+        events[new_code].update(Resolved=1, ResolveSeconds=age, ResolveMaxSeconds=age)
+    if _flag(updated.get('Cancelled')) and not _flag(original.get('Cancelled')):
+        events[new_code]["Cancelled"] += 1
+    if answered_now:
+        events[new_code].update(AnsweredCount=1, AnswerSeconds=age, AnswerMaxSeconds=age)
+
+    for code, deltas in events.items():
+        if any(deltas.values()): record(conn, now_epoch, code, **deltas)
+
+def rebuild(conn, history_source):
+    """
+    Recomputes every row from the calls table (and the audit log for cancel times).
+    Reflects each call's final state: a call resolved, reopened and resolved again counts once,
+    under the Code it has now. Reads and rewrites under one write lock, so no call saved
+    meanwhile is lost and readers never see it half-built.
+    """
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        totals = _totals_from_calls(conn, history_source)
+        conn.execute("DELETE FROM call_rollups")
+        conn.executemany(_UPSERT, [(minute, code, *(row[c] for c in COLUMNS)) for (minute, code), row in totals.items()])
+    return len(totals)
+
+def _totals_from_calls(conn, history_source):
+    cancel_times = {}
+    for call_id, timestamp in conn.execute(f"""
+        SELECT CallID, MAX(Timestamp) FROM {history_source}
+        WHERE Action = 'Call Modified' AND Details LIKE '%Cancelled updated.%' GROUP BY CallID
+    """):
+        try: cancel_times[call_id] = int(datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").timestamp())
+        except (TypeError, ValueError): pass
+
+    totals = defaultdict(lambda: dict.fromkeys(COLUMNS, 0))
+    def add(epoch, code, **deltas):
+        row = totals[(int(epoch) // 60 * 60, code or "")]
+        for column, value in deltas.items():
+            row[column] = max(row[column], value) if column in MAX_COLUMNS else row[column] + value
+
+    rows = conn.execute("""
+        SELECT ReportID, Code, CreatedEpoch, ResolutionStatus, ResolvedEpoch, Cancelled, AnsweredStatus, AnsweredEpoch
+        FROM calls WHERE (Deleted = 0 OR Deleted IS NULL) AND CreatedEpoch IS NOT NULL
+    """).fetchall()
+    for report_id, code, created, resolved, resolved_epoch, cancelled, answered, answered_epoch in rows:
+        add(created, code, Opened=1, BacklogDelta=1)
+        closed_at = None
+        if _flag(resolved) and resolved_epoch:
+            age = max(0, resolved_epoch - created)
+            add(resolved_epoch, code, Resolved=1, ResolveSeconds=age, ResolveMaxSeconds=age)
+            closed_at = resolved_epoch
+        if _flag(cancelled):
+            cancelled_at = cancel_times.get(report_id, created) # Created already cancelled: no history row
+            add(cancelled_at, code, Cancelled=1)
+            closed_at = min(closed_at, cancelled_at) if closed_at else cancelled_at
+        if closed_at: add(closed_at, code, BacklogDelta=-1)
+        if _flag(answered) and answered_epoch:
+            age = max(0, answered_epoch - created)
+            add(answered_epoch, code, AnsweredCount=1, AnswerSeconds=age, AnswerMaxSeconds=age)
+    return totals
+
+def query(conn, start_epoch, end_epoch, bucket_minutes=1, codes=None, by_code=False):
+    """
+    Buckets in [start_epoch, end_epoch), oldest first; only buckets with activity are returned.
+    Each dict has Bucket (epoch of the bucket start), Code (when by_code), the event counts,
+    Backlog (open calls at the end of the bucket), and average/max answer and resolve seconds.
+    """
+    bucket = max(1, int(bucket_minutes)) * 60
+    code_filter, params = "", []
+    if codes:
+        code_filter = f" AND Code IN ({', '.join('?' * len(codes))})"
+        params = list(codes)
+    group = "Bucket, Code" if by_code else "Bucket"
+
+    # Backlog before the range: one SUM over the minutes before start, still O(minutes)
+    baseline = defaultdict(int)
+    if by_code:
+        rows = conn.execute(f"SELECT Code, SUM(BacklogDelta) FROM call_rollups WHERE Minute < ?{code_filter} GROUP BY Code", [int(start_epoch)] + params)
+        baseline.update({code: total for code, total in rows})
+    else:
+        baseline[None] = conn.execute(f"SELECT COALESCE(SUM(BacklogDelta), 0) FROM call_rollups WHERE Minute < ?{code_filter}", [int(start_epoch)] + params).fetchone()[0]
+
+    cursor = conn.execute(f"""
+        SELECT (Minute / {bucket}) * {bucket} AS Bucket{', Code' if by_code else ''},
+               {', '.join(f'SUM({c})' for c in SUM_COLUMNS)}, {', '.join(f'MAX({c})' for c in MAX_COLUMNS)}
+        FROM call_rollups WHERE Minute >= ? AND Minute < ?{code_filter}
+        GROUP BY {group} ORDER BY {group}
+    """, [int(start_epoch), int(end_epoch)] + params)
+
+    results = []
+    for row in cursor.fetchall():
+        values = dict(zip(COLUMNS, row[2 if by_code else 1:]))
+        key = row[1] if by_code else None
+        baseline[key] += values["BacklogDelta"]
+        entry = {"Bucket": row[0]}
+        if by_code: entry["Code"] = row[1]
+        entry.update({c: values[c] for c in ("Opened", "Resolved", "Cancelled", "Reopened", "AnsweredCount")})
+        entry["Backlog"] = baseline[key]
+        entry["AvgAnswerSeconds"] = values["AnswerSeconds"] / values["AnsweredCount"] if values["AnsweredCount"] else None
+        entry["MaxAnswerSeconds"] = values["AnswerMaxSeconds"] if values["AnsweredCount"] else None
+        entry["AvgResolveSeconds"] = values["ResolveSeconds"] / values["Resolved"] if values["Resolved"] else None
+        entry["MaxResolveSeconds"] = values["ResolveMaxSeconds"] if values["Resolved"] else None
+        results.append(entry)
+    return results
@@ -0,0 +1,76 @@
+"""
+ROUTING.PY
+Shared Discord routing table for the GUI and the Discord Bot.
+Rules from the [ROUTING] section of config.ini are precompiled into a flat lookup
+table once, so deciding where (or whether) a call goes is a handful of dict hits
+instead of a DB round trip.
+
+Rule format (one per line, any rule name):
+    rule_name = Code[, Code] | Source[, Source] | InputMedium[, InputMedium] -> channel[, channel]
+Use * to match anything. A channel is either a numeric Discord channel ID or the
+name of another key in [DISCORD] (e.g. first_aid_channel).
+"""
+from itertools import product
+
+WILDCARD = "*"
+
+# Used when config.ini has no [ROUTING] section (the original hard-coded behavior)
+DEFAULT_RULES = {"first_aid": "Blue, Yellow | * | * -> first_aid_channel"}
+
+class RoutingTable:
+    def __init__(self, rules):
+        """rules: iterable of (codes, sources, mediums, channel_ids) tuples."""
+        self.rule_count = 0
+        self._table = {} # (code, source, medium) -> {channel_id: None}, insertion-ordered
+        for codes, sources, mediums, channel_ids in rules:
+            self.rule_count += 1
+            for key in product(codes, sources, mediums):
+                targets = self._table.setdefault(key, {})
+                for channel_id in channel_ids: targets[channel_id] = None
+        self._memo = {}
+
+    @staticmethod
+    def _norm(value):
+        return str(value or "").strip().casefold()
+
+    def channels_for(self, code, source="", medium=""):
+        """Returns a tuple of channel IDs (primary first) for this call, or () if it never routes."""
+        key = (self._norm(code), self._norm(source), self._norm(medium))
+        cached = self._memo.get(key)
+        if cached is not None: return cached
+
+        targets = {}
+        for lookup in product((key[0], WILDCARD), (key[1], WILDCARD), (key[2], WILDCARD)):
+            for channel_id in self._table.get(lookup, ()): targets[channel_id] = None
+        result = tuple(targets)
+        self._memo[key] = result
+        return result
+
+    @classmethod
+    def from_config(cls, config):
+        """Compiles the [ROUTING] section. Raises ValueError naming the first bad rule."""
+        if config.has_section('ROUTING'):
+            raw_rules = {name: value for name, value in config.items('ROUTING')}
+        else:
+            raw_rules = DEFAULT_RULES
+        discord_keys = {k.lower(): v for k, v in config.items('DISCORD')} if config.has_section('DISCORD') else {}
+
+        rules = []
+        for name, value in raw_rules.items():
+            try:
+                match, targets = value.split('->', 1)
+                fields = match.split('|')
+                if len(fields) != 3: raise ValueError("expected 'Code | Source | InputMedium -> channel'")
+                codes, sources, mediums = ([cls._norm(v) for v in field.split(',') if v.strip()] for field in fields)
+
+                channel_ids = []
+                for target in (t.strip() for t in targets.split(',') if t.strip()):
+                    resolved = target if target.isdigit() else discord_keys.get(target.lower(), "").strip()
+                    if not resolved.isdigit(): raise ValueError(f"unknown channel '{target}'")
+                    channel_ids.append(int(resolved))
+
+                if not (codes and sources and mediums and channel_ids): raise ValueError("rule has an empty field")
+                rules.append((codes, sources, mediums, channel_ids))
+            except ValueError as e:
+                raise ValueError(f"[ROUTING] {name}: {e}")
+        return cls(rules)
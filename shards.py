@@ -0,0 +1,71 @@
+"""
+SHARDS.PY
+One database file per event, keyed by the ReportID prefix (DC25, DC26, ...).
+With [DATABASE] shard_by_event on, [DATABASE] filename is only the naming base:
+the live file is dispatch_DC26.db, created on the first start in a new year, so
+every query, backup and SMB round trip only carries this event's calls.
+
+Past events stay next to it (dispatch_DC25.db, ...) and DataManager attaches them
+read-only on demand for cross-event search and reports. A database from before
+sharding (dispatch.db itself) is kept as one more past shard, "legacy".
+"""
+import os
+import re
+from datetime import datetime
+from urllib.parse import quote
+
+LEGACY = "legacy"
+
+def current_prefix():
+    return f"DC{datetime.now().strftime('%y')}" # Same rule as DataManager.call_id_prefix
+
+def enabled(config):
+    return config.getboolean('DATABASE', 'shard_by_event', fallback=False)
+
+def shard_path(base, prefix):
+    root, ext = os.path.splitext(base)
+    return f"{root}_{prefix}{ext or '.db'}"
+
+def live_path(config):
+    """The database this laptop (and the Discord Bot) reads and writes. Filesystem-free, so safe on the UI thread."""
+    base = config.get('DATABASE', 'filename', fallback='dispatch.db')
+    return shard_path(base, current_prefix()) if enabled(config) else base
+
+def archive_path(config, db_file):
+    """
+    History archive for db_file: [ARCHIVE] filename, or <database>_archive.db next to it.
+    Each shard always gets its own derived archive, so one event never archives into another's file.
+    """
+    if not config.getboolean('ARCHIVE', 'enabled', fallback=True): return None
+    configured = config.get('ARCHIVE', 'filename', fallback='').strip()
+    if configured and not enabled(config): return configured
+    return f"{os.path.splitext(db_file)[0]}_archive.db"
+
+def past_shards(config, live=None):
+    """{prefix or LEGACY: (database, archive or None)} for every event file except the live one."""
+    if not enabled(config): return {}
+    base = config.get('DATABASE', 'filename', fallback='dispatch.db')
+    live = os.path.abspath(live or live_path(config))
+    folder = os.path.dirname(base) or "."
+    root, ext = os.path.splitext(os.path.basename(base))
+    pattern = re.compile(re.escape(root) + r"_(DC\d\d)" + re.escape(ext or '.db') + "$")
+
+    found = {}
+    for name in (os.listdir(folder) if os.path.isdir(folder) else []):
+        match = pattern.match(name)
+        path = os.path.join(folder, name)
+        if match and os.path.abspath(path) != live: found[match.group(1)] = path
+    if os.path.exists(base): found[LEGACY] = base
+
+    configured = config.get('ARCHIVE', 'filename', fallback='').strip()
+    result = {}
+    for key in sorted(found, key=lambda k: (k != LEGACY, k), reverse=True): # Newest event first, legacy last
+        archive = configured if key == LEGACY and configured else f"{os.path.splitext(found[key])[0]}_archive.db"
+        result[key] = (found[key], archive if os.path.exists(archive) else None)
+    return result
+
+def readonly_uri(path):
+    """SQLite URI opening path read-only. Handles drive letters and \\\\server\\share paths."""
+    path = os.path.abspath(path).replace("\\", "/")
+    if not path.startswith("/"): path = "/" + path # C:/... -> /C:/...
+    return f"file://{quote(path, safe='/:')}?mode=ro"
@@ -0,0 +1,54 @@
+"""
+STARTUP.PY
+Cold start helpers for the GUI.
+PhaseTimer breaks boot time down into named phases (logged once the first live table
+is on screen). The snapshot functions keep a small local copy of the last table the
+dispatcher saw, so the window can paint it (marked stale) before the first round trip
+to the network database has finished.
+"""
+import json
+import os
+import time
+
+SNAPSHOT_VERSION = 1
+
+class PhaseTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []
+
+    def mark(self, phase):
+        """Closes the current phase under this name."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def total(self):
+        return self._last - self.started
+
+    def summary(self):
+        parts = ", ".join(f"{phase}={seconds * 1000:.0f}ms" for phase, seconds in self.phases)
+        return f"{parts} (total {self.total() * 1000:.0f}ms)"
+
+def save_snapshot(path, db_filename, active_only, rows):
+    """Atomically writes the last fetched table to a local file (never the network share)."""
+    folder = os.path.dirname(path)
+    if folder: os.makedirs(folder, exist_ok=True)
+    payload = {"version": SNAPSHOT_VERSION, "saved_epoch": time.time(), "db": os.path.abspath(db_filename),
+               "active_only": active_only, "rows": rows}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+def load_snapshot(path, db_filename, max_age_hours=12):
+    """Returns the saved snapshot dict, or None if missing, unreadable, too old or for another database."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("db") != os.path.abspath(db_filename): return None
+    if time.time() - snapshot.get("saved_epoch", 0) > max_age_hours * 3600: return None
+    return snapshot
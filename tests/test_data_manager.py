@@ -0,0 +1,308 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import configparser
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_manager import DataManager, CallConflictError, PossibleDuplicateError, CallRecord, merge_edits, lock_wait_seconds
+import instrumentation
+import offline_journal
+import shards
+
+def new_call(**fields):
+    call = {
+        "InputMedium": "Radio",
+        "Source": "Safety",
+        "Caller": "SEC-1",
+        "Location": "Main Hall B",
+        "Code": "Green",
+        "Description": "Test call",
+        "ResolutionStatus": False,
+        "ResolvedBy": "",
+        "Cancelled": False
+    }
+    call.update(fields)
+    return call
+
+class DataManagerTestCase(unittest.TestCase):
+    """Every test gets its own database (and offline journal) in a temp folder."""
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="dispatch_test_")
+        self.manager = self.open_manager()
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def open_manager(self):
+        return DataManager(os.path.join(self.folder, "dispatch.db"), journal_filename=os.path.join(self.folder, "journal.db"))
+
+    def load(self, report_id):
+        return dict(self.manager.get_call_by_id(report_id))
+
+class TestCalls(DataManagerTestCase):
+    def test_add_call(self):
+        first = self.manager.add_call(new_call(), "test_user")
+        second = self.manager.add_call(new_call(), "test_user")
+        prefix = self.manager.call_id_prefix
+        self.assertEqual((first, second), (f"{prefix}-0001", f"{prefix}-0002"))
+        call = self.load(first)
+        self.assertEqual(call["CreatedBy"], "test_user")
+        self.assertEqual(call["Location"], "Main Hall B")
+        self.assertIsNotNone(call["CreatedEpoch"])
+        self.assertEqual([row["Action"] for row in self.manager.get_history_for_call(first)], ["Call Created"])
+
+    def test_modify_call_logs_changed_fields(self):
+        report_id = self.manager.add_call(new_call(), "test_user")
+        original = self.load(report_id)
+        self.assertTrue(self.manager.modify_call(report_id, new_call(Location="Hall C", Description="Moved"), "other_user", original))
+        call = self.load(report_id)
+        self.assertEqual((call["Location"], call["ModifiedBy"], call["Version"]), ("Hall C", "other_user", 1))
+        details = self.manager.get_history_for_call(report_id)[0]["Details"]
+        self.assertIn("Location updated.", details)
+        self.assertIn("Description was updated.", details)
+
+    def test_resolve_call(self):
+        report_id = self.manager.add_call(new_call(), "test_user")
+        self.manager.modify_call(report_id, new_call(ResolutionStatus=True, ResolvedBy="resolved_by_user"), "test_user", self.load(report_id))
+        call = self.load(report_id)
+        self.assertTrue(call["ResolutionStatus"])
+        self.assertEqual(call["ResolvedBy"], "resolved_by_user")
+        self.assertIsNotNone(call["ResolvedEpoch"])
+
+    def test_stale_save_raises_conflict(self):
+        report_id = self.manager.add_call(new_call(), "test_user")
+        original = self.load(report_id)
+        self.manager.modify_call(report_id, new_call(Code="Blue"), "laptop_a", original)
+        with self.assertRaises(CallConflictError) as caught:
+            self.manager.modify_call(report_id, new_call(Location="Hall C"), "laptop_b", original)
+        self.assertEqual(caught.exception.changed_fields, ["Code"])
+        merged = merge_edits(new_call(Location="Hall C"), original, caught.exception.current)
+        self.assertEqual((merged["Code"], merged["Location"]), ("Blue", "Hall C"))
+
+    def test_get_all_calls(self):
+        open_id = self.manager.add_call(new_call(), "test_user")
+        closed_id = self.manager.add_call(new_call(), "test_user")
+        self.manager.add_call(new_call(Cancelled=True), "test_user")
+        self.manager.modify_call(closed_id, new_call(ResolutionStatus=True, ResolvedBy="x"), "test_user", self.load(closed_id))
+        self.assertEqual(len(self.manager.get_all_calls()), 3)
+        active = self.manager.get_all_calls(active_only=True, columns=["ReportID", "Code"])
+        self.assertEqual([call["ReportID"] for call in active], [open_id])
+        self.assertIsInstance(active[0], CallRecord)
+        self.assertEqual(dict(active[0]), {"ReportID": open_id, "Code": "Green"})
+        descending = self.manager.get_all_calls("ReportID", "DESC")
+        self.assertEqual(descending[-1]["ReportID"], open_id)
+
+    def test_waiting_for_another_writer_counts_as_lock_wait(self):
+        other_laptop = sqlite3.connect(self.manager.db_filename, isolation_level=None, check_same_thread=False)
+        other_laptop.execute("BEGIN IMMEDIATE")
+        threading.Timer(0.3, other_laptop.execute, ("COMMIT",)).start()
+        before = lock_wait_seconds()
+        report_id = self.manager.add_call(new_call(), "test_user") # Blocks in SQLite's busy handler until the other write commits
+        waited = lock_wait_seconds() - before
+        self.assertFalse(offline_journal.is_provisional(report_id))
+        self.assertTrue(0.25 <= waited < 5, waited)
+        other_laptop.close()
+
+    def test_lock_contention_is_retried_not_journaled(self):
+        self.manager.conn.execute("PRAGMA busy_timeout=0;") # Fail fast on the lock, so sqlite_retry has to step in
+        other_laptop = sqlite3.connect(self.manager.db_filename, isolation_level=None, check_same_thread=False)
+        other_laptop.execute("BEGIN IMMEDIATE")
+        commit = threading.Timer(0.3, other_laptop.execute, ("COMMIT",))
+        commit.start()
+        report_id = self.manager.add_call(new_call(), "test_user")
+        commit.join()
+        other_laptop.close()
+        self.assertFalse(offline_journal.is_provisional(report_id))
+        self.assertEqual(self.manager.journal.pending_count, 0)
+        self.assertEqual(self.load(report_id)["ReportID"], report_id)
+
+    def test_dashboard_metrics(self):
+        self.manager.add_call(new_call(Code="Blue"), "test_user")
+        self.manager.add_call(new_call(Code="Red"), "test_user")
+        metrics = self.manager.get_dashboard_metrics({"Medical": ["Blue", "Yellow"]})
+        self.assertEqual(metrics["categories"], {"Medical": 1})
+        self.assertEqual((metrics["open_total"], metrics["total_volume"]), (2, 2))
+
+class TestAuditAndHistory(DataManagerTestCase):
+    def test_audit_chain_detects_tampering(self):
+        report_id = self.manager.add_call(new_call(), "test_user")
+        self.manager.modify_call(report_id, new_call(Code="Blue"), "test_user", self.load(report_id))
+        self.assertTrue(self.manager.verify_audit_chain(full=True)["ok"])
+        with self.manager.conn:
+            self.manager.conn.execute("UPDATE call_history SET User = 'someone_else' WHERE Action = 'Call Created'")
+        self.assertFalse(self.manager.verify_audit_chain(full=True)["ok"])
+
+    def test_incremental_check_detects_tampering_with_the_checkpointed_row(self):
+        report_id = self.manager.add_call(new_call(), "test_user")
+        self.manager.modify_call(report_id, new_call(Code="Blue"), "test_user", self.load(report_id))
+        self.assertTrue(self.manager.verify_audit_chain()["ok"]) # Signs a checkpoint at the newest row
+        with self.manager.conn: # RowHash left as it was
+            self.manager.conn.execute("UPDATE call_history SET Details = 'Nothing changed' WHERE HistoryID = (SELECT MAX(HistoryID) FROM call_history)")
+        result = self.manager.verify_audit_chain()
+        self.assertFalse(result["ok"])
+        self.assertIn("signed checkpoint", result["problem"])
+
+    def test_history_paging(self):
+        report_id = self.manager.add_call(new_call(), "test_user")
+        for i in range(5):
+            self.manager.modify_call(report_id, new_call(Description=f"Update {i}"), "test_user", self.load(report_id))
+        page = self.manager.get_history_for_call(report_id, limit=4)
+        self.assertEqual(len(page), 4)
+        rest = self.manager.get_history_for_call(report_id, limit=4, before_id=page[-1]["HistoryID"])
+        self.assertEqual(len(rest), 2)
+        self.assertEqual(rest[-1]["Action"], "Call Created")
+        self.assertEqual(len(self.manager.get_full_audit_log()), 6)
+
+    def test_rollups_count_opened_and_resolved(self):
+        report_id = self.manager.add_call(new_call(Code="Blue"), "test_user")
+        self.manager.add_call(new_call(Code="Blue"), "test_user")
+        self.manager.modify_call(report_id, new_call(Code="Blue", ResolutionStatus=True, ResolvedBy="x"), "test_user", self.load(report_id))
+        totals = self.manager.get_rollups(0, bucket_minutes=60 * 24 * 365 * 100)
+        self.assertEqual(len(totals), 1)
+        self.assertEqual((totals[0]["Opened"], totals[0]["Resolved"], totals[0]["Backlog"]), (2, 1, 1))
+
+class TestHistoryArchive(DataManagerTestCase):
+    def open_manager(self):
+        return DataManager(os.path.join(self.folder, "dispatch.db"), os.path.join(self.folder, "dispatch_archive.db"))
+
+    def test_archives_calls_resolved_before_the_cutoff(self):
+        old_id, recent_id, open_id = (self.manager.add_call(new_call(), "test_user") for _ in range(3))
+        for report_id in (old_id, recent_id):
+            self.manager.modify_call(report_id, new_call(ResolutionStatus=True, ResolvedBy="x"), "test_user", self.load(report_id))
+        with self.manager.conn:
+            self.manager.conn.execute("UPDATE calls SET ResolvedEpoch = ResolvedEpoch - 10 * 3600 WHERE ReportID = ?", (old_id,))
+        self.manager.modify_call(open_id, new_call(Code="Blue"), "test_user", self.load(open_id))
+        last_change, old_history = self.manager.check_if_updated(), [dict(row) for row in self.manager.get_history_for_call(old_id)]
+
+        self.assertEqual(self.manager.archive_closed_history(6), len(old_history))
+        hot = {row[0] for row in self.manager.conn.execute("SELECT DISTINCT CallID FROM main.call_history")}
+        self.assertEqual(hot, {recent_id, open_id})
+        self.assertEqual(self.manager.check_if_updated(), last_change) # Nothing new, so no refresh
+        self.assertEqual([dict(row) for row in self.manager.get_history_for_call(old_id)], old_history) # Read back from the archive
+        self.assertTrue(self.manager.verify_audit_chain(full=True)["ok"])
+
+        self.manager.modify_call(open_id, new_call(Code="Red"), "test_user", self.load(open_id))
+        self.assertGreater(self.manager.check_if_updated(), last_change)
+
+class TestInstrumentation(DataManagerTestCase):
+    def test_nested_public_calls_are_timed_once(self):
+        timing = instrumentation.Instrumentation().instrument(self.manager).instrumentation
+        report_id = self.manager.add_call(new_call(), "test_user", allow_duplicates=False) # Runs find_duplicates inside
+        self.manager.modify_call(report_id, new_call(Code="Blue"), "test_user") # Reads the row with get_call_by_id inside
+        self.manager.get_call_by_id(report_id)
+        self.assertEqual({op: stats["calls"] for op, stats in timing.snapshot().items()},
+                         {"add_call": 1, "modify_call": 1, "get_call_by_id": 1})
+
+class TestOfflineJournal(DataManagerTestCase):
+    def test_saves_are_journaled_and_replayed_in_order(self):
+        outage = sqlite3.OperationalError("disk I/O error")
+        with mock.patch.object(self.manager, "_insert_call", side_effect=outage):
+            provisional = self.manager.add_call(new_call(Location="Lobby"), "test_user")
+        self.assertTrue(offline_journal.is_provisional(provisional))
+        # Queued behind the add, so it never reaches the share first
+        saved = self.manager.modify_call(provisional, new_call(Location="Lobby", Code="Blue"), "test_user")
+        self.assertEqual(saved, offline_journal.JOURNALED)
+        self.assertEqual(self.manager.journal.pending_count, 2)
+        self.assertEqual(self.manager.get_call_by_id(provisional)["Code"], "Blue")
+
+        replayed = self.manager.replay_journal()
+        self.assertEqual([op for op, _, _ in replayed], ["add", "modify"])
+        report_id = replayed[0][1]
+        self.assertFalse(offline_journal.is_provisional(report_id))
+        self.assertEqual(self.manager.journal.pending_count, 0)
+        self.assertEqual(self.load(report_id)["Code"], "Blue")
+        self.assertEqual(self.manager.journal.resolve(provisional), report_id)
+        self.assertTrue(self.manager.verify_audit_chain(full=True)["ok"])
+
+class TestEntryHelpers(DataManagerTestCase):
+    def test_suggestions_rank_by_use_and_survive_restart(self):
+        for location in ["Main Hall B", "Main Hall B", "Main Hall A", "Artist Alley"]:
+            self.manager.add_call(new_call(Location=location), "test_user")
+        self.assertEqual(self.manager.suggest("Location", "ma"), ["Main Hall B", "Main Hall A"])
+        self.assertEqual(self.manager.suggest("Location", "hall"), ["Main Hall B", "Main Hall A"])
+        self.manager.close()
+        self.manager = self.open_manager()
+        self.assertEqual(self.manager.suggest("Location", "main hall"), ["Main Hall B", "Main Hall A"])
+        self.assertEqual(self.manager.suggest("Caller", "sec"), ["SEC-1"])
+
+    def test_possible_duplicate_blocks_add_until_confirmed(self):
+        first = self.manager.add_call(new_call(Code="Blue", Description="Attendee fainted near the stage"), "laptop_a")
+        duplicate = new_call(Code="Blue", Location="main hl b", Description="person fainted by stage")
+        with self.assertRaises(PossibleDuplicateError) as caught:
+            self.manager.add_call(duplicate, "laptop_b", allow_duplicates=False)
+        self.assertEqual([match["ReportID"] for match in caught.exception.matches], [first])
+        self.assertEqual(len(self.manager.get_all_calls()), 1)
+        self.manager.add_call(duplicate, "laptop_b", allow_duplicates=True)
+        self.assertEqual(len(self.manager.get_all_calls()), 2)
+
+    def test_duplicate_check_skips_the_share_while_saves_are_queued(self):
+        with mock.patch.object(self.manager, "_insert_call", side_effect=sqlite3.OperationalError("disk I/O error")):
+            provisional = self.manager.add_call(new_call(Code="Blue", Description="Attendee fainted near the stage"), "test_user")
+        with mock.patch.object(self.manager, "conn") as share:
+            with self.assertRaises(PossibleDuplicateError) as caught:
+                self.manager.add_call(new_call(Code="Blue", Description="fainted near stage"), "test_user", allow_duplicates=False)
+            share.execute.assert_not_called()
+        self.assertEqual([match["ReportID"] for match in caught.exception.matches], [provisional])
+
+    def test_closed_or_unrelated_calls_are_not_duplicates(self):
+        report_id = self.manager.add_call(new_call(Code="Blue", Description="Attendee fainted near the stage"), "test_user")
+        self.assertEqual(self.manager.find_duplicates(new_call(Location="Artist Alley", Description="Attendee fainted")), [])
+        self.manager.modify_call(report_id, new_call(Code="Blue", Description="Attendee fainted near the stage", ResolutionStatus=True, ResolvedBy="x"),
+                                 "test_user", self.load(report_id))
+        self.assertEqual(self.manager.find_duplicates(new_call(Code="Blue", Description="Attendee fainted near the stage")), [])
+
+class TestEventShards(DataManagerTestCase):
+    """self.manager is the pre-sharding dispatch.db; the live database is this event's shard next to it."""
+    def setUp(self):
+        super().setUp()
+        self.prefix = shards.current_prefix()
+        self.last_year = f"DC{int(self.prefix[2:]) - 1:02d}"
+        self.legacy_ids = [self.manager.add_call(new_call(Location="Loading Dock"), "test_user") for _ in range(3)]
+
+        old_event = DataManager(shards.shard_path(os.path.join(self.folder, "dispatch.db"), self.last_year))
+        old_event.call_id_prefix = self.last_year
+        self.old_id = old_event.add_call(new_call(Location="Loading Dock", Description="Last year"), "test_user")
+        old_event.close()
+
+        self.config = configparser.ConfigParser()
+        self.config.read_dict({"DATABASE": {"filename": os.path.join(self.folder, "dispatch.db"), "shard_by_event": "true"}})
+        live = shards.live_path(self.config)
+        self.live = DataManager(live, past_shards=shards.past_shards(self.config, live))
+
+    def tearDown(self):
+        self.live.close()
+        super().tearDown()
+
+    def test_past_shards_newest_first(self):
+        self.assertEqual(self.live.db_filename, os.path.join(self.folder, f"dispatch_{self.prefix}.db"))
+        self.assertEqual(list(self.live.past_shards), [self.last_year, shards.LEGACY])
+
+    def test_new_shard_continues_legacy_numbering(self):
+        self.assertEqual(self.legacy_ids[-1], f"{self.prefix}-0003")
+        self.assertEqual(self.live.add_call(new_call(), "test_user"), f"{self.prefix}-0004")
+
+    def test_calls_route_to_their_event(self):
+        live_id = self.live.add_call(new_call(), "test_user")
+        self.assertIsNone(self.live._shard_for_call(live_id))
+        self.assertEqual(self.live._shard_for_call(self.old_id), self.last_year)
+        self.assertEqual(self.live._shard_for_call(self.legacy_ids[0]), shards.LEGACY)
+        self.assertEqual([row["Action"] for row in self.live.get_history_for_call(self.old_id)], ["Call Created"])
+        self.assertEqual([row["Action"] for row in self.live.get_history_for_call(self.legacy_ids[0])], ["Call Created"])
+
+    def test_search_past_events(self):
+        results = self.live.search_past_events("loading dock")
+        self.assertEqual([(row["Event"], row["ReportID"]) for row in results],
+                         [(self.last_year, self.old_id)] + [(shards.LEGACY, report_id) for report_id in reversed(self.legacy_ids)])
+        self.assertEqual(self.live.search_past_events("100%"), [])
+        with self.assertRaises(sqlite3.OperationalError): # Past events are attached read-only
+            with self.live.conn:
+                self.live.conn.execute(f"UPDATE shard_{self.last_year}.calls SET Code = 'Red'")
+
+if __name__ == '__main__':
+    unittest.main()
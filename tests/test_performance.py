@@ -0,0 +1,237 @@
+"""
+Performance regression tests for DataManager and the main table's refresh logic.
+Each benchmark's median time is compared with tests/perf_baselines.json and fails when
+it is more than DISPATCH_PERF_TOLERANCE times the baseline (default 3), plus 2 ms so
+sub-millisecond timings don't fail on noise. Databases are built in a temp folder.
+
+Record new baselines on the machine that matters (an HQ laptop) before an event:
+    DISPATCH_UPDATE_BASELINES=1 python -m pytest -q tests/test_performance.py
+"""
+import itertools
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_manager import DataManager
+import gui
+from gui import DispatchCallApp
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf_baselines.json")
+UPDATE_BASELINES = os.environ.get("DISPATCH_UPDATE_BASELINES") == "1"
+TOLERANCE = float(os.environ.get("DISPATCH_PERF_TOLERANCE", "3.0"))
+SLACK_SECONDS = 0.002
+
+TABLE_SIZES = (1000, 5000, 20000)
+TABLE_COLUMNS = gui.CALL_TABLE_QUERY_COLUMNS # What the main table's refresh fetches
+HIGH_PRIORITY = ["White / Mayday", "Silver", "Black", "Red", "Blue", "Adam"]
+CODES = ["No_Code", "Green", "Yellow", "Blue", "Red", "Brown", "Orange", "Purple", "Adam"]
+LOCATIONS = ["Hall A", "Hall B", "Main Stage", "Artist Alley", "Dealers Room", "Lobby", "Loading Dock", "Food Court"]
+
+def load_baselines():
+    if not os.path.exists(BASELINE_FILE): return {}
+    with open(BASELINE_FILE, encoding="utf-8") as file:
+        return json.load(file).get("benchmarks", {})
+
+BASELINES = load_baselines()
+MEASURED = {}
+
+def median_seconds(func, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+def new_call(rng, **fields):
+    call = {"InputMedium": "Radio", "Source": "Safety", "Caller": f"UNIT{rng.randint(1, 40)}", "Location": rng.choice(LOCATIONS),
+            "Code": rng.choice(CODES), "Description": f"Incident near the {rng.choice(LOCATIONS)}. " * rng.randint(1, 6),
+            "ResolutionStatus": False, "ResolvedBy": "", "Cancelled": False}
+    call.update(fields)
+    return call
+
+def build_db(path, calls):
+    """Bulk-loads calls (80% resolved) the way table_query_bench does; history is not needed for the table."""
+    manager = DataManager(path)
+    rng = random.Random(calls)
+    now = datetime.now()
+    rows = []
+    for i in range(1, calls + 1):
+        resolved = rng.random() < 0.8
+        call = new_call(rng)
+        rows.append((f"{manager.call_id_prefix}-{i:04d}", now.strftime("%Y-%m-%d"), now.strftime("%H:%M"), "", False, "",
+                     now.strftime("%Y-%m-%d %H:%M:%S") if resolved else "", resolved, "dispatcher1" if resolved else "",
+                     call["InputMedium"], call["Source"], call["Caller"], call["Location"], call["Code"], call["Description"],
+                     "dispatcher2", "", False, "", False, False, int(now.timestamp()) - rng.randint(0, 36000)))
+    with manager.conn:
+        manager.conn.executemany("""
+            INSERT INTO calls (ReportID, CallDate, CallTime, AnsweredTimestamp, AnsweredStatus, AnsweredBy, ResolutionTimestamp,
+                ResolutionStatus, ResolvedBy, InputMedium, Source, Caller, Location, Code, Description, CreatedBy, ModifiedBy,
+                RedFlag, ReportNumber, Deleted, Cancelled, CreatedEpoch)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+    return manager
+
+class FakeTreeview:
+    """Records what the refresh asks of the ttk.Treeview, at no cost, so only the view model is timed."""
+    def __init__(self):
+        self.rows = {}
+        self.count = 0
+    def insert(self, parent, index, values=(), tags=()):
+        self.count += 1
+        self.rows[f"I{self.count}"] = values
+        return f"I{self.count}"
+    def item(self, tree_id, values=(), tags=()): self.rows[tree_id] = values
+    def move(self, tree_id, parent, index): pass
+    def delete(self, tree_id): del self.rows[tree_id]
+    def bind(self, *args): pass
+    def get_children(self): return tuple(self.rows)
+    def selection_set(self, *args): pass
+    def focus(self, *args): pass
+    def see(self, *args): pass
+
+def table_view_model():
+    """Just enough of DispatchCallApp for _on_update_table_data_fetched to run without a Tk window."""
+    app = SimpleNamespace(high_priority_codes=HIGH_PRIORITY, columns=dict(gui.CALL_TABLE_COLUMNS), sort_keys=[("ReportID", False)],
+                          search_var=SimpleNamespace(get=lambda: ""), table=FakeTreeview(), root=mock.Mock(), manager=None,
+                          _table_row_cache={}, _table_item_ids={}, _table_shown={}, _table_order=[], _table_calls=None,
+                          is_first_load=True, is_dirty=False, known_calls=set(), load_selected_call=None)
+    for name in ("_sanitize_for_tkinter", "_format_table_row", "_render_table_rows", "_on_update_table_data_fetched"):
+        setattr(app, name, getattr(DispatchCallApp, name).__get__(app))
+    return app
+
+class PerformanceTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp(prefix="dispatch_perf_")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder, ignore_errors=True)
+
+    def check(self, name, seconds):
+        MEASURED[name] = seconds
+        if UPDATE_BASELINES: return
+        baseline = BASELINES.get(name)
+        if baseline is None: self.skipTest(f"No baseline for {name}; record one with DISPATCH_UPDATE_BASELINES=1")
+        limit = baseline * TOLERANCE + SLACK_SECONDS
+        self.assertLessEqual(seconds, limit, f"{name} took {seconds * 1000:.2f} ms; baseline {baseline * 1000:.2f} ms, limit {limit * 1000:.2f} ms")
+
+class TestDataManagerPerformance(PerformanceTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.managers = {size: build_db(os.path.join(cls.folder, f"table_{size}.db"), size) for size in TABLE_SIZES}
+
+        # Real saves, so the history rows carry a valid audit chain
+        cls.history = DataManager(os.path.join(cls.folder, "history.db"))
+        rng = random.Random(7)
+        cls.history_ids = [cls.history.add_call(new_call(rng), "dispatcher1") for _ in range(300)]
+        for report_id in cls.history_ids:
+            for step in range(3):
+                original = dict(cls.history.get_call_by_id(report_id))
+                cls.history.modify_call(report_id, new_call(rng, Code=original["Code"], Description=f"Update {step}"), "dispatcher2", original)
+
+    @classmethod
+    def tearDownClass(cls):
+        for manager in list(cls.managers.values()) + [cls.history]: manager.close()
+        super().tearDownClass()
+
+    def test_add_call(self):
+        manager, rng = self.managers[5000], random.Random(1)
+        self.check("add_call", median_seconds(lambda: manager.add_call(new_call(rng), "dispatcher1"), 30))
+
+    def test_modify_call(self):
+        manager, rng = self.managers[5000], random.Random(2)
+        report_ids = iter([row["ReportID"] for row in manager.get_all_calls(active_only=True, columns=["ReportID"])])
+        def modify():
+            report_id = next(report_ids)
+            original = dict(manager.get_call_by_id(report_id))
+            started = time.perf_counter()
+            manager.modify_call(report_id, new_call(rng, Code=original["Code"]), "dispatcher2", original)
+            return time.perf_counter() - started
+        self.check("modify_call", statistics.median(modify() for _ in range(30)))
+
+    def test_get_all_calls(self):
+        for size in TABLE_SIZES:
+            with self.subTest(calls=size):
+                manager = self.managers[size]
+                self.check(f"get_all_calls_{size}", median_seconds(lambda: manager.get_all_calls("ReportID", "ASC", False, TABLE_COLUMNS), 5))
+
+    def test_get_active_calls(self):
+        manager = self.managers[20000]
+        self.check("get_all_calls_active_20000", median_seconds(lambda: manager.get_all_calls("ReportID", "ASC", True, TABLE_COLUMNS), 5))
+
+    def test_history_for_call(self):
+        report_ids = iter(self.history_ids * 2)
+        self.check("get_history_for_call", median_seconds(lambda: self.history.get_history_for_call(next(report_ids)), 100))
+
+    def test_verify_audit_chain(self):
+        self.check("verify_audit_chain_full", median_seconds(lambda: self.history.verify_audit_chain(full=True), 5))
+
+    def test_export_report(self):
+        manager, app, filename = self.managers[5000], SimpleNamespace(), os.path.join(self.folder, "report.csv")
+        with mock.patch.object(gui, "messagebox"):
+            export = lambda: DispatchCallApp._on_export_data_fetched(app, True, manager.get_all_calls("ReportID", "ASC"), filename)
+            self.check("export_report_5000", median_seconds(export, 3))
+
+    def test_export_audit_log(self):
+        app, filename = SimpleNamespace(manager=self.history), os.path.join(self.folder, "audit.csv")
+        with mock.patch.object(gui, "messagebox"):
+            def export():
+                verification, rows = DispatchCallApp._fetch_verified_audit_log(app)
+                DispatchCallApp._on_export_data_fetched(app, True, rows, filename)
+            self.check("export_audit_log", median_seconds(export, 3))
+
+class TestTableRefreshPerformance(PerformanceTestCase):
+    """The per-row refresh in _on_update_table_data_fetched, on 5000 fetched calls."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        manager = build_db(os.path.join(cls.folder, "refresh.db"), 5000)
+        cls.calls = manager.get_all_calls("ReportID", "ASC", False, TABLE_COLUMNS)
+        manager.close()
+
+    def refresh(self, app, calls):
+        app._on_update_table_data_fetched(True, calls, "preserve", None, False, None, None, False)
+
+    def test_cold_refresh(self):
+        def cold():
+            self.refresh(table_view_model(), self.calls)
+        self.check("table_refresh_cold_5000", median_seconds(cold, 3))
+
+    def test_unchanged_refresh(self):
+        app = table_view_model()
+        self.refresh(app, self.calls)
+        self.assertEqual(len(app.table.rows), 5000)
+        self.check("table_refresh_unchanged_5000", median_seconds(lambda: self.refresh(app, self.calls), 5))
+
+    def test_refresh_with_changed_rows(self):
+        app = table_view_model()
+        self.refresh(app, self.calls)
+        changed = list(self.calls)
+        for index in range(0, len(changed), 100): # 1% of the rows edited since the last refresh
+            call = dict(changed[index], Description="Edited")
+            changed[index] = type(changed[index])(tuple(call[key] for key in TABLE_COLUMNS))
+        versions = itertools.cycle([changed, self.calls]) # Alternating, every refresh sees 1% of rows changed
+        self.check("table_refresh_changed_5000", median_seconds(lambda: self.refresh(app, next(versions)), 5))
+
+def tearDownModule():
+    if not UPDATE_BASELINES or not MEASURED: return
+    baselines = dict(BASELINES, **{name: round(seconds, 6) for name, seconds in MEASURED.items()})
+    with open(BASELINE_FILE, "w", encoding="utf-8") as file:
+        json.dump({"benchmarks": dict(sorted(baselines.items()))}, file, indent=2)
+        file.write("\n")
+
+if __name__ == '__main__':
+    unittest.main()
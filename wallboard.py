@@ -0,0 +1,161 @@
+"""
+WALLBOARD.PY
+Read-only HQ status display (main.py --wallboard) and the snapshot it reads.
+Dispatcher GUIs take turns publishing one small JSON file next to the database
+(open calls + dashboard counters). Wallboards only ever read that file, never
+dispatch.db, so any number of them adds no locks and no queries to the share.
+
+Publishing is self-electing without clocks: each GUI checks the file's mtime every
+publish_seconds (with jitter) and only writes if nobody has since its last look.
+One laptop ends up publishing; if it closes, another takes over one tick later.
+"""
+import json
+import os
+import random
+import socket
+import time
+import tkinter as tk
+from tkinter import ttk
+
+SNAPSHOT_VERSION = 1
+# Only what the board shows, oldest first (the SLA board reads top-down)
+BOARD_COLUMNS = ["ReportID", "CallTime", "Code", "Location", "Source", "Caller", "CreatedEpoch"]
+
+def snapshot_path(config):
+    """[WALLBOARD] snapshot_file, defaulting to wallboard.json next to the database."""
+    configured = config.get('WALLBOARD', 'snapshot_file', fallback='').strip()
+    if configured: return configured
+    db_file = config.get('DATABASE', 'filename', fallback='dispatch.db')
+    return os.path.join(os.path.dirname(db_file), "wallboard.json")
+
+def _mtime(path):
+    try: return os.stat(path).st_mtime
+    except OSError: return None
+
+class Publisher:
+    """Used by a dispatcher GUI from its DB thread; publish_if_due() is cheap when another laptop is publishing."""
+    def __init__(self, path, interval_seconds):
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self._last_seen_mtime = "unseen" # Never matches on the first look, so a GUI waits one tick before taking over
+
+    def next_delay_ms(self):
+        return int(self.interval_seconds * random.uniform(1.0, 1.25) * 1000)
+
+    def publish_if_due(self, manager, categories, high_priority_codes):
+        """Returns True if this laptop wrote the snapshot."""
+        seen = _mtime(self.path)
+        if seen != self._last_seen_mtime and seen is not None:
+            self._last_seen_mtime = seen # Someone published since our last look
+            return False
+        metrics = manager.get_dashboard_metrics(categories)
+        calls = manager.get_all_calls("CreatedEpoch", "ASC", True, BOARD_COLUMNS)
+        payload = {"version": SNAPSHOT_VERSION, "published_epoch": time.time(), "publisher": socket.gethostname(),
+                   "categories": list(categories), "high_priority": list(high_priority_codes), "metrics": metrics,
+                   "calls": [list(call) for call in calls], "columns": BOARD_COLUMNS}
+        tmp_path = f"{self.path}.{socket.gethostname()}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        try:
+            os.replace(tmp_path, self.path)
+        except PermissionError: # A wallboard has it open (Windows); try again next tick
+            os.remove(tmp_path)
+            return False
+        self._last_seen_mtime = _mtime(self.path)
+        return True
+
+def load(path):
+    """Returns the published snapshot dict, or None if it's missing, mid-replace or from another version."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return snapshot if snapshot.get("version") == SNAPSHOT_VERSION else None
+
+class WallboardApp:
+    """No login, no edit widgets: dashboard counters and the open-call SLA board, refreshed from the snapshot file."""
+    def __init__(self, root, config, logger):
+        self.root = root
+        self.logger = logger
+        self.path = snapshot_path(config)
+        self.poll_ms = max(1, config.getint('WALLBOARD', 'refresh_seconds', fallback=5)) * 1000
+        self.stale_seconds = config.getint('WALLBOARD', 'stale_seconds', fallback=60)
+        self.sla_minutes = 30
+        self._last_mtime = None
+        self._last_change = time.monotonic()
+        self.snapshot = None
+
+        self.root.title("HQ Dispatch Wallboard")
+        self.root.configure(background="#111111")
+        if config.getboolean('WALLBOARD', 'fullscreen', fallback=True): self.root.attributes("-fullscreen", True)
+        self.root.bind("<Escape>", lambda e: self.root.attributes("-fullscreen", False))
+
+        style = ttk.Style(self.root)
+        style.configure("Board.Treeview", font=("TkDefaultFont", 16), rowheight=34)
+        style.configure("Board.Treeview.Heading", font=("TkDefaultFont", 14, "bold"))
+
+        self.counters_frame = tk.Frame(self.root, background="#111111")
+        self.counters_frame.pack(fill="x", padx=20, pady=(20, 10))
+        self.counter_labels = []
+
+        self.columns = {"ReportID": ("Call ID", 140), "CallTime": ("Time", 90), "TimeOpen": ("Open", 110), "Code": ("Code", 200),
+                        "Location": ("Location", 320), "Source": ("Source", 160), "Caller": ("Caller", 200)}
+        self.table = ttk.Treeview(self.root, columns=list(self.columns), show="headings", style="Board.Treeview")
+        for col, (heading, width) in self.columns.items():
+            self.table.heading(col, text=heading)
+            self.table.column(col, width=width, anchor="center")
+        self.table.tag_configure("sla_critical", background="#8B0000", foreground="white")
+        self.table.tag_configure("high_priority", background="#3a5f80", foreground="white")
+        self.table.tag_configure("open", background="#222222", foreground="white")
+        self.table.pack(fill="both", expand=True, padx=20)
+
+        self.status_var = tk.StringVar(value=f"Waiting for the first snapshot from a dispatch laptop ({self.path})...")
+        self.status_label = tk.Label(self.root, textvariable=self.status_var, font=("TkDefaultFont", 12), background="#111111", foreground="#aaaaaa", anchor="w")
+        self.status_label.pack(fill="x", padx=20, pady=10)
+
+        self._poll()
+
+    def _poll(self):
+        mtime = _mtime(self.path)
+        if mtime is not None and mtime != self._last_mtime:
+            snapshot = load(self.path)
+            if snapshot:
+                self._last_mtime = mtime
+                self._last_change = time.monotonic()
+                self.snapshot = snapshot
+        if self.snapshot: self._render()
+        self._poll_job = self.root.after(self.poll_ms, self._poll)
+
+    def _render(self):
+        snapshot = self.snapshot
+        metrics = snapshot["metrics"]
+        counters = [f"{label}: {metrics['categories'].get(label, 0)}" for label in snapshot["categories"]]
+        counters += [f"Open Calls: {metrics['open_total']}", f"Peak SLA: {metrics['peak_sla_minutes']} min", f"Shift Volume: {metrics['total_volume']}"]
+        if len(self.counter_labels) != len(counters):
+            for label in self.counter_labels: label.destroy()
+            self.counter_labels = [tk.Label(self.counters_frame, font=("TkDefaultFont", 20, "bold"), background="#111111") for _ in counters]
+            for column, label in enumerate(self.counter_labels): label.grid(row=0, column=column, padx=20, sticky="w")
+        for index, (label, text) in enumerate(zip(self.counter_labels, counters)):
+            label.config(text=text, foreground="#ff5555" if index < len(snapshot["categories"]) else "white")
+
+        fields = {name: i for i, name in enumerate(snapshot["columns"])}
+        high_priority = set(snapshot["high_priority"])
+        now = time.time()
+        self.table.delete(*self.table.get_children())
+        for call in snapshot["calls"]:
+            created = call[fields["CreatedEpoch"]]
+            minutes_open = int((now - created) / 60) if created else 0
+            code = call[fields["Code"]] or ""
+            tag = "sla_critical" if minutes_open >= self.sla_minutes else "high_priority" if code in high_priority else "open"
+            values = [f"{minutes_open} min" if col == "TimeOpen" else call[fields[col]] or "" for col in self.columns]
+            self.table.insert("", tk.END, values=values, tags=(tag,))
+
+        age = time.monotonic() - self._last_change
+        published = time.strftime("%H:%M:%S", time.localtime(snapshot["published_epoch"]))
+        if age > self.stale_seconds:
+            self.status_var.set(f"STALE: no update for {int(age)}s (last from {snapshot['publisher']} at {published}). Is a dispatch laptop running?")
+            self.status_label.config(foreground="#ff5555")
+        else:
+            self.status_var.set(f"Updated {published} by {snapshot['publisher']}  |  {len(snapshot['calls'])} open calls  |  Esc exits fullscreen")
+            self.status_label.config(foreground="#aaaaaa")